@@ -8,50 +8,104 @@
 ============================================================
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from modules.intent_detector   import detect_intent, detect_clinical_specialty
-from modules.firestore_service import get_doctors_by_specialization, warm_up
-from modules.llama_service     import ask_user_mode, ask_doctor_mode
-from modules.safety_filter     import is_emergency, has_restricted_content
+from modules.intent_classifier import load_configured as load_intent_classifier, MIN_CONFIDENCE, NONE_LABEL
+from modules.firestore_service import get_doctors_by_specialization, warm_up, normalize_city, shard_status, \
+                                      reload_city
+from modules.llama_service     import ask_user_mode, ask_doctor_mode, OLLAMA_URL, OLLAMA_MODELS
+from modules.ollama_warm       import start as start_ollama_warm, readiness as ollama_readiness
+from modules.safety_filter     import is_emergency, has_restricted_content, RestrictedContentScanner
+from modules.osm_index         import nearby_facilities, nearest_emergency, facility_from_element, \
+                                      load_index, index_status
+from modules.geo_index         import haversine_km
+from modules.admission         import check_rate, retry_after_header, stats as admission_stats
+from modules.llm_scheduler     import SchedulerRejected
+from modules.deadline          import Deadline, CHAT_BUDGET_SEC, PLACES_BUDGET_SEC
+from modules.responses         import json_response, fragment, encode, Raw, stats as response_stats
+from modules.usage             import stats as usage_stats
+from modules.hedging           import stats as hedging_stats
+from modules.cascade           import stats as cascade_stats
+from modules.profiling         import profiled, note, recent as recent_profiles, profile_path, \
+                                      stats as profiling_stats
+from modules                   import smalltalk, memdiag, session_store as sessions
 import requests as req
+import hmac
+import select
+import socket
 import time
-import math
+import os
 
 app = Flask(__name__)
 CORS(app, origins="https://sehatmand.netlify.app")
 
-# ── Server-side conversation memory ──────────────────────
-SESSIONS     = {}
-SESSION_TTL  = 1800   # 30 minutes
-MAX_HISTORY  = 10     # keep last 10 turns
+# Proxies in front of the app (Railway's edge = 1). ProxyFix takes the client
+# address from the X-Forwarded-For hop they appended, counted from the right;
+# the leftmost hops are whatever the client sent and are never trusted.
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "1"))
+if TRUSTED_PROXIES > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+
+# ── Admin access (profiling, diagnostics) ──────────────
+# Admin endpoints and the X-Profile header need X-Admin-Token: <ADMIN_TOKEN>;
+# with ADMIN_TOKEN unset they are disabled.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def _is_admin() -> bool:
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _profile_requested() -> bool:
+    return request.headers.get("X-Profile") == "1" and _is_admin()
+
 
+# Only admins can force a profile; sampling (PROFILE_SAMPLE_EVERY) works without a token
+PROFILE_TRIGGER = _profile_requested if ADMIN_TOKEN else None
 
-def _get_history(session_id: str) -> list:
-    if session_id and session_id in SESSIONS:
-        return SESSIONS[session_id]["history"]
-    return []
+# Load the Ollama fallback model now (also under gunicorn, which never runs
+# __main__) instead of on the first request after Groq goes down
+start_ollama_warm(OLLAMA_URL, OLLAMA_MODELS)
 
+# RSS sampling (and tracemalloc snapshots) per worker when MEMDIAG=1
+memdiag.start()
 
-def _save_history(session_id: str, user_msg: str, assistant_msg: str):
-    if not session_id:
-        return
-    if session_id not in SESSIONS:
-        SESSIONS[session_id] = {"history": [], "last_active": time.time()}
+# Facility index in memory before the first request: the emergency path
+# only reads what is loaded and never waits for disk or Overpass
+load_index()
 
-    SESSIONS[session_id]["history"].append({"role": "user",      "content": user_msg})
-    SESSIONS[session_id]["history"].append({"role": "assistant", "content": assistant_msg})
-    SESSIONS[session_id]["last_active"] = time.time()
 
-    if len(SESSIONS[session_id]["history"]) > MAX_HISTORY * 2:
-        SESSIONS[session_id]["history"] = SESSIONS[session_id]["history"][-(MAX_HISTORY * 2):]
+# ── Intent detection ─────────────────────────────────────
+# Keyword rules by default; with INTENT_CLASSIFIER=<model.npz> the learned
+# classifier answers and the rules only cover its low-confidence calls.
+INTENT_MODEL = load_intent_classifier()
 
 
-def _cleanup_sessions():
-    now     = time.time()
-    expired = [sid for sid, s in SESSIONS.items() if now - s["last_active"] > SESSION_TTL]
-    for sid in expired:
-        del SESSIONS[sid]
+def _detect_intent(message: str) -> dict:
+    if INTENT_MODEL is not None:
+        result = INTENT_MODEL.detect_intent(message)
+        if result["confidence"] >= MIN_CONFIDENCE:
+            # The specialty head has its own confidence: a sure intent with an
+            # unsure specialty keeps the intent and takes the rules' specialty
+            if result["specialization"] and result["specialty_confidence"] < MIN_CONFIDENCE:
+                spec = detect_intent(message)["specialization"]
+                if spec is None and result["type"] == "specialist":
+                    spec = "general practitioner (gp)"
+                result = {**result, "specialization": spec}
+            return result
+    return detect_intent(message)
+
+
+def _detect_clinical_specialty(message: str):
+    if INTENT_MODEL is not None:
+        label, conf = INTENT_MODEL.rank([message], "clinical", k=1)[0][0]
+        if conf >= MIN_CONFIDENCE:
+            return None if label == NONE_LABEL else label
+    return detect_clinical_specialty(message)
 
 
 EMERGENCY_RESPONSE = {
@@ -67,9 +121,13 @@ EMERGENCY_RESPONSE = {
     "doctors"   : [],
     "specialist": None,
 }
+# Static part encoded once; only "mode" (and "hospitals") is added per request
+EMERGENCY_FIELDS = {k: Raw(encode(v)) for k, v in EMERGENCY_RESPONSE.items()}
+EMERGENCY_HOSPITALS = 3
+EMERGENCY_BUDGET_MS = float(os.getenv("EMERGENCY_BUDGET_MS", "5"))
 
 
-def _format_doctor_context(doctors: list, specialist: str) -> str:
+def _format_doctor_context(doctors: list, specialist: str, city: str) -> str:
     if not doctors:
         return ""
     lines = []
@@ -81,49 +139,79 @@ def _format_doctor_context(doctors: list, specialist: str) -> str:
             f" | {d['hospital_name'].title()}"
             f" | Phone: {phone}"
             f" | PMDC: {pmdc}"
+            + (f" | {d['distance_km']} km away" if "distance_km" in d else "")
         )
-    return f"{specialist.title()} doctors in Karachi:\n" + "\n".join(lines)
+    return f"{specialist.title()} doctors in {city.title()}:\n" + "\n".join(lines)
 
 
-# ── Haversine distance (km) ───────────────────────────────
-def _haversine(lat1, lon1, lat2, lon2):
-    R = 6371
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = (math.sin(dlat / 2) ** 2
-         + math.cos(math.radians(lat1))
-         * math.cos(math.radians(lat2))
-         * math.sin(dlon / 2) ** 2)
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+def _user_location(data: dict):
+    """(lat, lng) from an optional chat body location, None if missing or invalid."""
+    try:
+        lat, lng = float(data["lat"]), float(data["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
 
 
-# ════════════════════════════════════════════════════════
-#  FREE HOSPITAL SEARCH — GET /api/places/nearby
-#  Uses OpenStreetMap Overpass API (100% free, no key needed)
-#
-#  Query params:
-#    lat    — user latitude  (required)
-#    lng    — user longitude (required)
-#    radius — search radius in metres (optional, default 5000)
-# ════════════════════════════════════════════════════════
-@app.route("/api/places/nearby", methods=["GET"])
-def places_nearby():
-    lat    = request.args.get("lat")
-    lng    = request.args.get("lng")
-    radius = request.args.get("radius", "5000")
+def _find_doctors(specialist, city, location, deadline):
+    lat, lng = location or (None, None)
+    return get_doctors_by_specialization(specialist, city=city, deadline=deadline, lat=lat, lng=lng)
 
-    if not lat or not lng:
-        return jsonify({"error": "lat and lng are required"}), 400
-
-    try:
-        lat_f = float(lat)
-        lng_f = float(lng)
-        rad_f = float(radius)
-    except ValueError:
-        return jsonify({"error": "lat, lng, radius must be numbers"}), 400
-
-    print(f"[OSM] Searching hospitals near ({lat_f:.4f}, {lng_f:.4f}) r={rad_f}m")
 
+def _doctors_field(doctors, location):
+    # Without a location the list is the shard's shared one (same object per
+    # specialization), encoded once via fragment(). Distance-ranked lists are
+    # built per request and encoded inline, so they never fill the fragment cache.
+    if not doctors:
+        return []
+    return doctors if location else fragment(doctors)
+
+
+def _place_result(fac: dict, dist_km: float) -> dict:
+    # Google Places-compatible shape so Flutter code doesn't change
+    return {
+        "place_id"   : fac["id"],
+        "name"       : fac["name"],
+        "vicinity"   : fac["address"],
+        "phone"      : fac["phone"],
+        "geometry"   : {
+            "location": {"lat": fac["lat"], "lng": fac["lng"]}
+        },
+        "distance_km": round(dist_km, 2),
+        # OSM doesn't provide open/closed hours in most cases
+        "opening_hours": {"open_now": None},
+        "rating"     : None,
+    }
+
+
+def _emergency_hospitals(lat, lng) -> list:
+    """Nearest hospitals / ERs from the in-memory OSM index, same shape as /api/places/nearby."""
+    t0      = time.perf_counter()
+    results = [{**_place_result(fac, dist), "emergency": fac["emergency"]}
+               for dist, fac in nearest_emergency(lat, lng, k=EMERGENCY_HOSPITALS)]
+    ms      = (time.perf_counter() - t0) * 1000
+    note(emergency_hospitals=len(results), emergency_ms=round(ms, 2))
+    if ms > EMERGENCY_BUDGET_MS:
+        print(f"[Emergency] ⚠️ Nearest hospitals took {ms:.1f}ms (budget {EMERGENCY_BUDGET_MS:.0f}ms)")
+    return results
+
+
+# Try multiple Overpass mirrors in case one is down
+OVERPASS_MIRRORS = [
+    "https://overpass-api.de/api/interpreter",
+    "https://overpass.kumi.systems/api/interpreter",
+    "https://maps.mail.ru/osm/tools/overpass/api/interpreter",
+]
+OVERPASS_FALLBACK = os.getenv("OVERPASS_FALLBACK", "1") == "1"
+
+
+OVERPASS_TIMEOUT = 20   # per mirror, further capped by the request deadline
+
+
+def _overpass_search(lat_f, lng_f, rad_f, deadline):
+    """Live Overpass lookup. Returns ([(distance_km, facility), ...], error)."""
     # ── Overpass QL query ─────────────────────────────────
     # Simple fast query — no regex (regex causes server timeouts)
     overpass_query = (
@@ -142,27 +230,25 @@ def places_nearby():
         f");out center tags;"
     )
 
-    # Try multiple Overpass mirrors in case one is down
-    overpass_mirrors = [
-        "https://overpass-api.de/api/interpreter",
-        "https://overpass.kumi.systems/api/interpreter",
-        "https://maps.mail.ru/osm/tools/overpass/api/interpreter",
-    ]
-
     resp = None
     last_error = None
 
-    for mirror in overpass_mirrors:
+    for mirror in OVERPASS_MIRRORS:
+        if deadline.remaining() < 1:
+            last_error = f"Time budget of {deadline.budget:.0f}s exhausted"
+            print(f"[OSM] ⏱️ {last_error} — skipping remaining mirrors")
+            break
         try:
             print(f"[OSM] Trying mirror: {mirror}")
             resp = req.post(
                 mirror,
                 data   = overpass_query.encode("utf-8"),
-                timeout= 20,
+                timeout= deadline.timeout(OVERPASS_TIMEOUT),
                 headers= {"Content-Type": "application/x-www-form-urlencoded"},
             )
             resp.raise_for_status()
             print(f"[OSM] Success from {mirror} | HTTP {resp.status_code}")
+            note(overpass_mirror=mirror)
             break  # success — stop trying mirrors
         except req.exceptions.Timeout:
             last_error = f"Timeout on {mirror}"
@@ -173,173 +259,264 @@ def places_nearby():
         resp = None
 
     if resp is None:
-        return jsonify({"error": f"All OpenStreetMap mirrors failed. Last error: {last_error}"}), 504
+        return None, f"All OpenStreetMap mirrors failed. Last error: {last_error}"
 
     try:
-        osm_data     = resp.json()
-        raw_elements = osm_data.get("elements", [])
+        raw_elements = resp.json().get("elements", [])
     except Exception as e:
         print(f"[OSM] JSON parse error: {e} | body: {resp.text[:300]}")
-        return jsonify({"error": f"Invalid response from OpenStreetMap: {str(e)}"}), 500
+        return None, f"Invalid response from OpenStreetMap: {str(e)}"
 
     print(f"[OSM] Raw elements returned: {len(raw_elements)}")
 
+    found = []
+    for el in raw_elements:
+        fac = facility_from_element(el)
+        if fac:
+            found.append((haversine_km(lat_f, lng_f, fac["lat"], fac["lng"]), fac))
+    found.sort(key=lambda x: x[0])
+    return found, None
+
+
+# ════════════════════════════════════════════════════════
+#  FREE HOSPITAL SEARCH — GET /api/places/nearby
+#  Answered from the local OSM index (build_osm_index.py);
+#  live Overpass API only as a fallback when the point is
+#  outside the extract or no index is built yet.
+#
+#  Query params:
+#    lat    — user latitude  (required)
+#    lng    — user longitude (required)
+#    radius — search radius in metres (optional, default 5000)
+# ════════════════════════════════════════════════════════
+@app.route("/api/places/nearby", methods=["GET"])
+@profiled("places", forced=PROFILE_TRIGGER)
+def places_nearby():
+    deadline = Deadline(PLACES_BUDGET_SEC)
+
+    lat    = request.args.get("lat")
+    lng    = request.args.get("lng")
+    radius = request.args.get("radius", "5000")
+
+    if not lat or not lng:
+        return jsonify({"error": "lat and lng are required"}), 400
+
+    try:
+        lat_f = float(lat)
+        lng_f = float(lng)
+        rad_f = float(radius)
+    except ValueError:
+        return jsonify({"error": "lat, lng, radius must be numbers"}), 400
+
+    print(f"[OSM] Searching hospitals near ({lat_f:.4f}, {lng_f:.4f}) r={rad_f}m")
+
+    found  = nearby_facilities(lat_f, lng_f, rad_f)
+    source = "local"
+
+    if found is None:
+        if not OVERPASS_FALLBACK:
+            return jsonify({"error": "Location is outside the offline hospital index"}), 503
+        found, error = _overpass_search(lat_f, lng_f, rad_f, deadline)
+        source = "overpass"
+        if found is None:
+            return jsonify({"error": error}), 504
+
     results = []
     seen_names = set()
 
-    for el in raw_elements:
-        tags = el.get("tags", {})
-        name = tags.get("name") or tags.get("name:en") or tags.get("name:ur")
-        if not name:
-            continue  # skip unnamed places
-
+    for dist_km, fac in found:   # already sorted by distance
         # Deduplicate by name
-        name_key = name.lower().strip()
+        name_key = fac["name"].lower().strip()
         if name_key in seen_names:
             continue
         seen_names.add(name_key)
 
-        # Coordinates — nodes have lat/lon directly; ways have "center"
-        if el["type"] == "node":
-            el_lat = el.get("lat", lat_f)
-            el_lng = el.get("lon", lng_f)
-        else:
-            center = el.get("center", {})
-            el_lat = center.get("lat", lat_f)
-            el_lng = center.get("lon", lng_f)
-
-        dist_km = _haversine(lat_f, lng_f, el_lat, el_lng)
-
-        # Build address from tags
-        address_parts = []
-        for key in ["addr:street", "addr:suburb", "addr:city"]:
-            val = tags.get(key)
-            if val:
-                address_parts.append(val)
-        address = ", ".join(address_parts) if address_parts else tags.get("addr:full", "")
-
-        phone = tags.get("phone") or tags.get("contact:phone") or ""
-
-        results.append({
-            "place_id"   : str(el["id"]),
-            "name"       : name,
-            "vicinity"   : address,
-            "phone"      : phone,
-            "geometry"   : {
-                "location": {"lat": el_lat, "lng": el_lng}
-            },
-            "distance_km": round(dist_km, 2),
-            # OSM doesn't provide open/closed hours in most cases
-            "opening_hours": {"open_now": None},
-            "rating"     : None,
-        })
-
-    # Sort by distance
-    results.sort(key=lambda x: x["distance_km"])
-    results = results[:20]  # cap at 20
-
-    print(f"[OSM] Returning {len(results)} hospitals")
+        results.append(_place_result(fac, dist_km))
+        if len(results) == 20:  # cap at 20
+            break
+
+    print(f"[OSM] Returning {len(results)} hospitals ({source})")
+    note(source=source, results=len(results))
 
     # Return in Google Places-compatible format so Flutter code doesn't change
-    return jsonify({
+    return json_response({
         "status" : "OK" if results else "ZERO_RESULTS",
         "results": results,
-    }), 200
+    })
+
+
+def _client_ip() -> str:
+    # remote_addr is already the proxy-reported client (ProxyFix above)
+    return request.remote_addr or "unknown"
+
+
+def _client_connected() -> bool:
+    # gunicorn exposes the client socket; a readable socket that returns
+    # b"" on peek means the client hung up while we were queued.
+    sock = request.environ.get("gunicorn.socket")
+    if sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return not readable or sock.recv(1, socket.MSG_PEEK) != b""
+    except (OSError, ValueError):
+        return False
+
+
+def _request_class(default: str) -> str:
+    # Offline triage jobs tag themselves so they never compete with live chats
+    return "batch" if request.headers.get("X-Request-Class") == "batch" else default
+
+
+def _too_many(retry_after: float, reason: str):
+    resp = jsonify({"error": f"Too many requests — {reason}. Please try again shortly."})
+    resp.headers["Retry-After"] = retry_after_header(retry_after)
+    return resp, 429
 
 
 # ════════════════════════════════════════════════════════
 #  CHAT — POST /api/chat
 # ════════════════════════════════════════════════════════
 @app.route("/api/chat", methods=["POST"])
+@profiled("chat", forced=PROFILE_TRIGGER)
 def chat():
-    _cleanup_sessions()
+    deadline = Deadline(CHAT_BUDGET_SEC)   # shared by every stage below
+    sessions.cleanup()
 
     data       = request.get_json()
     message    = (data.get("message") or "").strip()
     mode       = (data.get("mode") or "user").strip().lower()
     session_id = (data.get("session_id") or "").strip()
+    city       = normalize_city(data.get("city"))   # optional, defaults to Karachi
+    location   = _user_location(data)                # optional, ranks doctors by distance
 
     if not message:
         return jsonify({"error": "Message cannot be empty"}), 400
     if mode not in ("user", "doctor"):
         mode = "user"
+    note(mode=mode, city=city, located=location is not None)
 
-    # ── Emergency check ───────────────────────────────────
+    # ── Emergency check (never rate limited) ──────────────
     if is_emergency(message):
-        resp = EMERGENCY_RESPONSE.copy()
-        resp["mode"] = mode
-        return jsonify(resp), 200
-
-    history = _get_history(session_id)
-    print(f"[Session] id={session_id or 'none'} | history_turns={len(history)//2}")
-
-    # ════════════════════════════════════════════════════
-    #  USER MODE
-    # ════════════════════════════════════════════════════
-    if mode == "user":
-        intent     = detect_intent(message)
-        doctors    = []
-        specialist = None
-        context    = ""
-
-        print(f"[Intent] type={intent['type']} | spec={intent.get('specialization')}")
-
-        if intent["type"] == "specialist":
-            specialist = intent.get("specialization")
-            raw_docs   = get_doctors_by_specialization(specialist)
-            if raw_docs:
-                doctors = raw_docs
-                context = _format_doctor_context(doctors, specialist)
-
-        reply = ask_user_mode(message, history=history, doctor_context=context)
-
-        if has_restricted_content(reply):
-            reply = (
-                "I'm sorry, I cannot provide this specific medical information. "
-                "Please consult a qualified doctor."
-            )
+        fields = {**EMERGENCY_FIELDS, "mode": mode}
+        if location:
+            fields["hospitals"] = _emergency_hospitals(*location)
+        return json_response(fields)
 
-        _save_history(session_id, message, reply)
-
-        return jsonify({
-            "reply"     : reply,
-            "type"      : intent["type"],
-            "specialist": specialist,
-            "doctors"   : doctors,
-            "mode"      : "user",
-        }), 200
-
-    # ════════════════════════════════════════════════════
-    #  DOCTOR MODE
-    # ════════════════════════════════════════════════════
-    else:
-        specialist = detect_clinical_specialty(message)
-        doctors    = []
-        context    = ""
-
-        if specialist:
-            raw_docs = get_doctors_by_specialization(specialist)
-            if raw_docs:
-                doctors = raw_docs
-                context = _format_doctor_context(doctors, specialist)
-
-        reply = ask_doctor_mode(message, history=history, doctor_context=context)
-
-        if has_restricted_content(reply):
-            reply = (
-                "For clinical assessment please examine the patient directly "
-                "and consult a senior physician."
-            )
+    # ── Rate limiting (per session + per IP) ──────────────
+    retry_after = check_rate(session_id, _client_ip())
+    if retry_after:
+        return _too_many(retry_after, "rate limit exceeded")
+
+    try:
+        # One turn per session at a time: a second quick message waits for the
+        # first to be saved, so it sees (and extends) the updated history
+        with sessions.turn(session_id, timeout=deadline.remaining()):
+            history = sessions.history(session_id)
+            print(f"[Session] id={session_id or 'none'} | history_turns={len(history)//2}")
+            if mode == "user":
+                return _chat_user(message, session_id, history, deadline, city, location)
+            return _chat_doctor(message, session_id, history, deadline, city, location)
+    except sessions.TurnBusy:
+        return _too_many(2, "your previous message is still being answered")
+    except SchedulerRejected as e:
+        print(f"[Scheduler] ⏭️ Dropped ({e.reason})")
+        if e.reason == "client_gone":
+            return "", 499
+        return _too_many(e.retry_after, "server is busy")
 
-        _save_history(session_id, message, reply)
 
-        return jsonify({
-            "reply"     : reply,
-            "type"      : "clinical",
-            "specialist": specialist,
-            "doctors"   : doctors,
-            "mode"      : "doctor",
-        }), 200
+# ════════════════════════════════════════════════════════
+#  USER MODE
+# ════════════════════════════════════════════════════════
+def _chat_user(message, session_id, history, deadline, city, location):
+    intent     = _detect_intent(message)
+    doctors    = []
+    specialist = None
+    context    = ""
+
+    print(f"[Intent] type={intent['type']} | spec={intent.get('specialization')}")
+    note(intent=intent["type"], specialist=intent.get("specialization"))
+
+    # Greetings / thanks / goodbyes: template reply, no LLM call
+    if intent["type"] == "general_chat" and smalltalk.FAST_PATH_ENABLED:
+        reply = smalltalk.reply(message)
+        if reply:
+            note(provider="template")
+            sessions.append_turn(session_id, message, reply)
+            return json_response({
+                "reply"     : reply,
+                "type"      : "general_chat",
+                "specialist": None,
+                "doctors"   : [],
+                "mode"      : "user",
+            })
+
+    if intent["type"] == "specialist":
+        specialist = intent.get("specialization")
+        raw_docs   = _find_doctors(specialist, city, location, deadline)
+        if raw_docs:
+            doctors = raw_docs
+            context = _format_doctor_context(doctors, specialist, city)
+
+    # Scanner aborts the generation as soon as a restricted phrase appears
+    scanner = RestrictedContentScanner()
+    reply   = ask_user_mode(message, history=history, doctor_context=context, scanner=scanner,
+                            priority=_request_class(intent["type"]), is_alive=_client_connected,
+                            deadline=deadline, intent=intent["type"])
+
+    if scanner.violated or has_restricted_content(reply):
+        reply = (
+            "I'm sorry, I cannot provide this specific medical information. "
+            "Please consult a qualified doctor."
+        )
+
+    sessions.append_turn(session_id, message, reply)
+
+    return json_response({
+        "reply"     : reply,
+        "type"      : intent["type"],
+        "specialist": specialist,
+        "doctors"   : _doctors_field(doctors, location),
+        "mode"      : "user",
+    })
+
+
+# ════════════════════════════════════════════════════════
+#  DOCTOR MODE
+# ════════════════════════════════════════════════════════
+def _chat_doctor(message, session_id, history, deadline, city, location):
+    specialist = _detect_clinical_specialty(message)
+    doctors    = []
+    context    = ""
+    note(intent="clinical", specialist=specialist)
+
+    if specialist:
+        raw_docs = _find_doctors(specialist, city, location, deadline)
+        if raw_docs:
+            doctors = raw_docs
+            context = _format_doctor_context(doctors, specialist, city)
+
+    scanner = RestrictedContentScanner()
+    reply   = ask_doctor_mode(message, history=history, doctor_context=context, scanner=scanner,
+                              priority=_request_class("clinical"), is_alive=_client_connected,
+                              deadline=deadline, specialty=specialist)
+
+    if scanner.violated or has_restricted_content(reply):
+        reply = (
+            "For clinical assessment please examine the patient directly "
+            "and consult a senior physician."
+        )
+
+    sessions.append_turn(session_id, message, reply)
+
+    return json_response({
+        "reply"     : reply,
+        "type"      : "clinical",
+        "specialist": specialist,
+        "doctors"   : _doctors_field(doctors, location),
+        "mode"      : "doctor",
+    })
 
 
 # ════════════════════════════════════════════════════════
@@ -349,8 +526,7 @@ def chat():
 def clear_session():
     data       = request.get_json()
     session_id = (data.get("session_id") or "").strip()
-    if session_id and session_id in SESSIONS:
-        del SESSIONS[session_id]
+    sessions.clear(session_id)
     return jsonify({"status": "cleared"}), 200
 
 
@@ -361,11 +537,115 @@ def clear_session():
 def health():
     return jsonify({
         "status"         : "running",
-        "active_sessions": len(SESSIONS),
+        "active_sessions": sessions.count(),
+        "sessions"       : sessions.stats(),
         "hospital_search": "OpenStreetMap (free, no API key needed)",
+        "osm_index"      : index_status(),
+        "doctor_shards"  : shard_status(),
+        "admission"      : admission_stats(),
+        "responses"      : response_stats(),
+        "hedging"        : hedging_stats(),
+        "ollama"         : ollama_readiness(),
+        "cascade"        : cascade_stats(),
     }), 200
 
-import os
+
+# ════════════════════════════════════════════════════════
+#  READINESS — GET /api/ready
+#  503 until the Ollama fallback model is loaded and its
+#  time to first token is under OLLAMA_READY_TTFT_MS, so
+#  the load balancer only routes to warm pods
+# ════════════════════════════════════════════════════════
+@app.route("/api/ready", methods=["GET"])
+def ready():
+    status = ollama_readiness()
+    return jsonify({"ready": status["ready"], "ollama": status}), 200 if status["ready"] else 503
+
+
+# ════════════════════════════════════════════════════════
+#  TOKEN USAGE — GET /api/usage
+#  Prompt/completion tokens per mode/intent and provider,
+#  with the prompt split into system/history/doctor_context/user
+# ════════════════════════════════════════════════════════
+@app.route("/api/usage", methods=["GET"])
+def usage():
+    return jsonify({**usage_stats(), "smalltalk_fast_path": smalltalk.stats()}), 200
+
+# ════════════════════════════════════════════════════════
+#  PROFILES — GET /api/admin/profiles (X-Admin-Token)
+#  Newest request profiles; ?min_ms=2000&limit=20
+#  GET /api/admin/profiles/<name>.prof downloads one
+# ════════════════════════════════════════════════════════
+@app.route("/api/admin/profiles", methods=["GET"])
+def admin_profiles():
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        min_ms = float(request.args.get("min_ms", "0"))
+        limit  = int(request.args.get("limit", "20"))
+    except ValueError:
+        return jsonify({"error": "min_ms and limit must be numbers"}), 400
+    return jsonify({**profiling_stats(), "profiles": recent_profiles(limit, min_ms)}), 200
+
+
+@app.route("/api/admin/profiles/<name>", methods=["GET"])
+def admin_profile_file(name):
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    path = profile_path(name)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path.resolve(), mimetype="application/octet-stream", as_attachment=True)
+
+
+# ════════════════════════════════════════════════════════
+#  MEMORY — GET /api/admin/memory (X-Admin-Token)
+#  This worker's RSS history, tracked structure sizes and
+#  tracemalloc top allocators; ?snapshot=1 diffs against the
+#  last snapshot, ?lines=1 adds the top source lines.
+#  POST /api/admin/memory/tracemalloc {"on": true|false}
+# ════════════════════════════════════════════════════════
+@app.route("/api/admin/memory", methods=["GET"])
+def admin_memory():
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    out = memdiag.report(snapshot=request.args.get("snapshot") == "1")
+    if request.args.get("lines") == "1":
+        out["top_lines"] = memdiag.top_lines()
+    return jsonify(out), 200
+
+
+@app.route("/api/admin/memory/tracemalloc", methods=["POST"])
+def admin_memory_tracing():
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    memdiag.set_tracing(bool((request.get_json(silent=True) or {}).get("on")))
+    return jsonify(memdiag.report()["tracemalloc"]), 200
+
+
+# ════════════════════════════════════════════════════════
+#  DOCTOR DATA RELOAD — POST /api/admin/doctors/reload
+#  Body: { "city": "lahore", "source": "disk"|"firestore" }
+#  Swaps in a new snapshot without a restart; the other
+#  workers follow within DOCTORS_WATCH_SEC
+# ════════════════════════════════════════════════════════
+@app.route("/api/admin/doctors/reload", methods=["POST"])
+def admin_reload_doctors():
+    if not _is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    data   = request.get_json(silent=True) or {}
+    city   = normalize_city(data.get("city"))
+    source = data.get("source", "disk")
+    if source not in ("disk", "firestore"):
+        return jsonify({"error": "source must be 'disk' or 'firestore'"}), 400
+    try:
+        snapshot = reload_city(city, source)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    return jsonify({"city": city, **snapshot}), 200
+
 
 if __name__ == "__main__":
     print("=" * 55)
@@ -0,0 +1,102 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — Intent classifier vs keyword rules
+  Latency (per message, single vs batch) and agreement on
+  intent type / specialization / clinical specialty.
+
+USAGE:
+  python bench_intent_classifier.py --model intent_model.npz
+  python bench_intent_classifier.py --model intent_model.npz --data labelled.csv --show 20
+
+Without --data the messages are freshly generated from the
+keyword maps with a different seed than training used.
+With --data (text,intent,specialty,clinical) accuracy of
+both paths against the labels is reported as well.
+============================================================
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from modules.intent_detector import detect_intent, detect_clinical_specialty
+from modules.intent_classifier import IntentClassifier, NONE_LABEL
+from train_intent_classifier import generate, load_labelled
+
+
+def _timed(fn, *args):
+    t0  = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - t0) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the intent classifier against the keyword rules")
+    parser.add_argument("--model", default="intent_model.npz")
+    parser.add_argument("--data",  help="labelled CSV (text,intent,specialty,clinical)")
+    parser.add_argument("--seed",  type=int, default=1234)
+    parser.add_argument("--show",  type=int, default=10, help="disagreements to print")
+    args = parser.parse_args()
+
+    model = IntentClassifier.load(args.model)
+    rows  = load_labelled(args.data) if args.data else generate(args.seed)
+    user  = [r for r in rows if r[1] is not None]
+    clin  = [r for r in rows if r[3] is not None]
+    texts = [r[0] for r in user]
+    ctext = [r[0] for r in clin]
+    print(f"📂 {len(user)} user-mode and {len(clin)} doctor-mode messages\n")
+
+    # ── Latency ───────────────────────────────────────────
+    kw_user, kw_us = _timed(lambda: [detect_intent(t) for t in texts])
+    _, one_us      = _timed(lambda: [model.detect_intent(t) for t in texts[:200]])
+    ml_user, ml_us = _timed(model.detect_intent_batch, texts)
+    kw_clin, _     = _timed(lambda: [detect_clinical_specialty(t) for t in ctext])
+    ml_clin, _     = _timed(model.detect_clinical_specialty_batch, ctext)
+
+    n = max(len(texts), 1)
+    print("⏱️  Latency per message")
+    print(f"   keyword rules        : {kw_us / n:8.1f} µs")
+    print(f"   classifier (single)  : {one_us / max(min(len(texts), 200), 1):8.1f} µs")
+    print(f"   classifier (batch)   : {ml_us / n:8.1f} µs   ({len(texts)} messages, one matmul per 512)\n")
+
+    # ── Agreement / accuracy ──────────────────────────────
+    def norm_spec(s):
+        return s if s and s != NONE_LABEL else None
+
+    same_type = sum(k["type"] == m["type"] for k, m in zip(kw_user, ml_user))
+    same_spec = sum(k["specialization"] == m["specialization"] for k, m in zip(kw_user, ml_user))
+    same_clin = sum(k == m for k, m in zip(kw_clin, ml_clin))
+    print("🤝 Agreement with keyword rules")
+    print(f"   intent type          : {same_type / n:.3f}")
+    print(f"   specialization       : {same_spec / n:.3f}")
+    print(f"   clinical specialty   : {same_clin / max(len(ctext), 1):.3f}\n")
+
+    print("🎯 Accuracy against labels (keyword / classifier)")
+    for name, got_kw, got_ml, want in (
+        ("intent type",    [k["type"] for k in kw_user], [m["type"] for m in ml_user], [r[1] for r in user]),
+        ("specialization", [k["specialization"] for k in kw_user], [m["specialization"] for m in ml_user],
+                           [norm_spec(r[2]) for r in user]),
+        ("clinical",       kw_clin, ml_clin, [norm_spec(r[3]) for r in clin]),
+    ):
+        pairs = [(a, b, w) for a, b, w in zip(got_kw, got_ml, want) if name != "specialization" or w]
+        if not pairs:
+            continue
+        kw_acc = sum(a == w for a, _, w in pairs) / len(pairs)
+        ml_acc = sum(b == w for _, b, w in pairs) / len(pairs)
+        print(f"   {name:<20} : {kw_acc:.3f} / {ml_acc:.3f}   (n={len(pairs)})")
+
+    shown = 0
+    print("\n🔍 Disagreements (keyword → classifier)")
+    for text, k, m in zip(texts, kw_user, ml_user):
+        if shown >= args.show:
+            break
+        if (k["type"], k["specialization"]) != (m["type"], m["specialization"]):
+            print(f"   '{text}': {k['type']}/{k['specialization']} → "
+                  f"{m['type']}/{m['specialization']} ({m['confidence']:.2f}; {m['ranked'][:2]})")
+            shown += 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — Prompt profile benchmark
+  Compares the intent-tiered prompt profiles with the
+  original full prompts, per message type.
+
+USAGE:
+  python bench_prompt_profiles.py                 # prompt sizes only (offline)
+  python bench_prompt_profiles.py --live 3        # + 3 real calls per type and variant
+  python bench_prompt_profiles.py --live 3 --json bench_profiles.json
+
+Offline numbers use the ~4 chars/token estimate from
+modules/usage.py. --live calls Groq (Ollama as fallback)
+and reports provider token counts and wall-clock latency.
+Edit prompt_profiles.json, re-run, compare.
+============================================================
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from modules.intent_detector import detect_intent, detect_clinical_specialty
+from modules.llama_service import USER_SYSTEM, DOCTOR_SYSTEM, _call_groq, _call_ollama
+from modules.prompt_profiles import PROFILES, USER_INTENT_PROFILE, trim_history
+from modules.usage import CallUsage, estimate_tokens
+
+# (mode, message) — one per profile
+SAMPLES = [
+    ("user",   "I have had a mild headache and runny nose since yesterday, what should I do?"),
+    ("user",   "mujhe skin par rash hai, kis doctor ko dikhaun?"),
+    ("user",   "I feel very anxious and lonely these days"),
+    ("user",   "hello, how are you?"),
+    ("doctor", "Patient has had a productive cough and fever for 5 days"),
+    ("doctor", "I keep getting chest tightness when I climb stairs"),
+]
+
+SAMPLE_DOCTORS = ("Cardiologist doctors in Karachi:\n"
+                  "1. Dr Ahmed Raza | Akbar Hospital Karachi | Phone: 923012345678 | PMDC: 12345-P\n"
+                  "2. Dr Sana Khan | Liaquat National Hospital | Phone: 923001112223 | PMDC: 54321-P")
+
+# A full session (MAX_HISTORY = 10 turns in modules/session_store.py) of typical length
+SAMPLE_HISTORY = [
+    {"role": "user" if i % 2 == 0 else "assistant",
+     "content": "x" * (120 if i % 2 == 0 else 1400)}
+    for i in range(20)
+]
+
+
+def _variants(mode, message):
+    if mode == "doctor":
+        specialty = detect_clinical_specialty(message)
+        label     = f"doctor/{'referral' if specialty else 'clinical'}"
+        profile   = PROFILES["doctor_referral" if specialty else "doctor_clinical"]
+        legacy    = {"system": DOCTOR_SYSTEM, "history_turns": 10, "max_tokens": 700}
+        context   = SAMPLE_DOCTORS if specialty else ""
+    else:
+        intent  = detect_intent(message)["type"]
+        label   = f"user/{intent}"
+        profile = PROFILES[USER_INTENT_PROFILE.get(intent, "user_general")]
+        legacy  = {"system": USER_SYSTEM, "history_turns": 10, "max_tokens": 700}
+        context = SAMPLE_DOCTORS if intent == "specialist" else ""
+    return label, context, {"legacy": legacy, "profile": profile}
+
+
+def _prompt_tokens(variant, context, message):
+    history = trim_history(SAMPLE_HISTORY, variant["history_turns"])
+    return (estimate_tokens(variant["system"])
+            + sum(estimate_tokens(m["content"]) for m in history)
+            + estimate_tokens(context) + estimate_tokens(message))
+
+
+def _live(variant, mode, context, message, runs):
+    history  = trim_history(SAMPLE_HISTORY, variant["history_turns"])
+    content  = message + (f"\n\n[Doctor List]\n{context}" if context else "")
+    messages = history + [{"role": "user", "content": content}]
+    latencies, completions, prompts = [], [], []
+    for _ in range(runs):
+        usage = CallUsage(mode, "bench", variant["system"], history, context, message)
+        t0    = time.perf_counter()
+        reply = (_call_groq(variant["system"], messages, usage=usage, max_tokens=variant["max_tokens"])
+                 or _call_ollama(variant["system"], messages, usage=usage, max_tokens=variant["max_tokens"]))
+        if not reply or not usage.calls:
+            continue
+        latencies.append((time.perf_counter() - t0) * 1000)
+        prompts.append(usage.calls[-1]["prompt_tokens"])
+        completions.append(usage.calls[-1]["completion_tokens"])
+    if not latencies:
+        return None
+    return {
+        "runs"             : len(latencies),
+        "prompt_tokens"    : round(statistics.mean(prompts)),
+        "completion_tokens": round(statistics.mean(completions)),
+        "p50_ms"           : round(statistics.median(latencies)),
+        "max_ms"           : round(max(latencies)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prompt profiles against the full prompts")
+    parser.add_argument("--live", type=int, default=0, metavar="N", help="real calls per type and variant")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'type':<18}{'variant':<9}{'prompt~':>9}{'cap':>6}"
+          + (f"{'prompt':>9}{'compl':>7}{'p50 ms':>9}{'max ms':>9}" if args.live else ""))
+    print("-" * (42 + (34 if args.live else 0)))
+    for mode, message in SAMPLES:
+        label, context, variants = _variants(mode, message)
+        for name, variant in variants.items():
+            row = {
+                "type"            : label,
+                "variant"         : name,
+                "prompt_estimate" : _prompt_tokens(variant, context, message),
+                "max_tokens"      : variant["max_tokens"],
+            }
+            line = f"{label:<18}{name:<9}{row['prompt_estimate']:>9}{row['max_tokens']:>6}"
+            if args.live:
+                row["live"] = _live(variant, mode, context, message, args.live)
+                live = row["live"]
+                line += (f"{live['prompt_tokens']:>9}{live['completion_tokens']:>7}"
+                         f"{live['p50_ms']:>9}{live['max_ms']:>9}" if live else "   (no provider reachable)")
+            results.append(row)
+            print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — Offline hospital index builder
+  Input : OpenStreetMap extract for the service area
+          (.osm.pbf, or an Overpass JSON dump)
+  Output: osm_facilities_index.json (read by /api/places/nearby)
+
+USAGE:
+  python build_osm_index.py pakistan-latest.osm.pbf
+  python build_osm_index.py karachi_health.json --every 86400
+
+  --every N  rebuild every N seconds (run under a process
+             manager / cron); the API reloads the new file on
+             its own, no restart needed.
+
+Overpass JSON dump for Karachi (run once, save the output):
+  [out:json][timeout:180];
+  area["name"="Karachi"]->.a;
+  (nwr["amenity"~"^(hospital|clinic|doctors|health_post)$"](area.a);
+   nwr["healthcare"](area.a););
+  out center tags;
+============================================================
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from modules.osm_index import build_index, INDEX_FILE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline health-facility index")
+    parser.add_argument("source", help=".osm.pbf extract or Overpass JSON dump")
+    parser.add_argument("--out",   default=INDEX_FILE, help=f"output file (default {INDEX_FILE})")
+    parser.add_argument("--every", type=int, default=0, help="rebuild every N seconds")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            build_index(args.source, args.out)
+        except Exception as e:
+            print(f"[OSM Index] ❌ Build failed: {e}")
+            if not args.every:
+                sys.exit(1)
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,39 +2,55 @@
 ============================================================
   SEHAT MAND PAKISTAN — Step 1: Doctors Dataset Cleaning
   Input : Excel file (All-Karachi-Drs-List-With-Number-and-Pmdc)
-  Output: cleaned_doctors.csv
+          or a CSV export of the same PMDC list
+  Output: cleaned_doctors.csv (+ cleaned_doctors.parquet)
+          + one cleaned_doctors_<city>.csv per TARGET_CITIES entry
+          + dedupe_clusters.csv (fuzzy duplicates merged, for review)
+
+USAGE:
+  python clean_doctor_dataset.py                 # default Excel file
+  python clean_doctor_dataset.py --input pmdc_nationwide.csv
+  python clean_doctor_dataset.py --force         # ignore the hash check
+  python clean_doctor_dataset.py --no-fuzzy      # exact duplicates only
+
+  or from Python:
+  from clean_doctor_dataset import run_pipeline
+  run_pipeline("pmdc_nationwide.xlsx")
+
+The input is read in chunks and every cleaning step is a
+vectorised pandas `.str` operation, so memory stays flat for
+nationwide lists. If the input file's SHA-256 matches the last
+run (clean_state.json) and the outputs exist, the run is skipped.
+Parquet output needs pyarrow (pip install pyarrow); without it
+only the CSV is written.
+After the exact (city, name, phone) dedupe, dedupe_doctors.py
+merges spelling variants of the same doctor and adds the stable
+doctor_id column that upload_to_firestore.py uses as document ID.
 ============================================================
 """
 
-import pandas as pd
-import re
+import argparse
+import hashlib
+import json
 import os
+import time
+from contextlib import contextmanager
 
-# ──────────────────────────────────────────────
-# CONFIG — change paths if needed
-# ──────────────────────────────────────────────
-INPUT_FILE  = "784588866-All-Karachi-Drs-List-With-Number-and-Pmdc-1-1.xlsx"
-OUTPUT_FILE = "cleaned_doctors.csv"
-TARGET_CITY = "KARACHI"
-
-# ──────────────────────────────────────────────
-# STEP 1: Load Excel with correct header
-# ──────────────────────────────────────────────
-# The Excel has 2 junk rows at top before real headers
-print("📂 Loading Excel file...")
-df = pd.read_excel(INPUT_FILE, skiprows=1)
-
-# Row 0 in loaded df is actual column names
-df.columns = df.iloc[0]
-df = df[1:].reset_index(drop=True)
+import pandas as pd
 
-print(f"   Total rows loaded: {len(df)}")
-print(f"   Columns: {df.columns.tolist()}\n")
+from dedupe_doctors import dedupe, REPORT_FILE
 
 # ──────────────────────────────────────────────
-# STEP 2: Keep only needed columns
+# CONFIG — change paths if needed
 # ──────────────────────────────────────────────
-keep_cols = {
+INPUT_FILE   = "784588866-All-Karachi-Drs-List-With-Number-and-Pmdc-1-1.xlsx"
+OUTPUT_FILE  = "cleaned_doctors.csv"
+STATE_FILE   = "clean_state.json"
+TARGET_CITIES = [c.strip().upper() for c in
+                 os.getenv("TARGET_CITIES", "KARACHI,LAHORE,ISLAMABAD").split(",") if c.strip()]
+CHUNK_SIZE   = 50_000
+
+KEEP_COLS = {
     "Doctor Name"         : "name",
     "Practice Place Name" : "hospital_name",
     "Specialty"           : "specialization",
@@ -43,58 +59,8 @@ keep_cols = {
     "PMDC"                : "pmdc"
 }
 
-df = df[list(keep_cols.keys())].rename(columns=keep_cols)
-print(f"✅ Columns selected and renamed: {df.columns.tolist()}\n")
-
-# ──────────────────────────────────────────────
-# STEP 3: Filter Karachi only
-# ──────────────────────────────────────────────
-df["city"] = df["city"].astype(str).str.strip().str.upper()
-df = df[df["city"] == TARGET_CITY].reset_index(drop=True)
-print(f"📍 After Karachi filter: {len(df)} doctors\n")
-
-# ──────────────────────────────────────────────
-# STEP 4: Clean text columns — lowercase + strip
-# ──────────────────────────────────────────────
-text_cols = ["name", "hospital_name", "specialization", "city"]
-
-for col in text_cols:
-    df[col] = df[col].astype(str).str.strip().str.lower()
-
-print("✅ Text columns: lowercased and stripped\n")
-
-# ──────────────────────────────────────────────
-# STEP 5: Clean phone numbers
-# - Remove trailing slashes
-# - Ensure starts with 92 (Pakistan country code)
-# - Drop clearly invalid entries (too short)
-# ──────────────────────────────────────────────
-def clean_phone(val):
-    val = str(val).strip()
-    val = val.replace("/", "").replace(" ", "").replace("-", "")
-    # Remove .0 from numeric conversion artifacts
-    val = re.sub(r"\.0$", "", val)
-    # If starts with 923 and is 12 digits → valid Pakistani mobile
-    if re.match(r"^923\d{9}$", val):
-        return val
-    # If starts with 03 → convert to 923 format
-    if re.match(r"^03\d{9}$", val):
-        return "92" + val[1:]
-    # Too short or junk
-    if len(val) < 10:
-        return None
-    return val
-
-df["phone"] = df["phone"].apply(clean_phone)
-invalid_phones = df["phone"].isna().sum()
-print(f"📞 Phone cleaning done. Invalid/missing phones: {invalid_phones}\n")
-
-# ──────────────────────────────────────────────
-# STEP 6: Normalize specializations
-# - Fix typos (Speciality names in dataset have known typos)
-# - Collapse duplicates caused by leading spaces
-# ──────────────────────────────────────────────
-specialty_map = {
+# Known typos in the dataset's Specialty column
+SPECIALTY_MAP = {
     "genral practitinor (gp)"          : "general practitioner (gp)",
     "genral physician"                  : "general physician",
     "genral practitinor (gp), genral physician" : "general practitioner (gp)",
@@ -110,53 +76,237 @@ specialty_map = {
     "general surgery"                   : "general surgeon",
 }
 
-def normalize_specialty(val):
-    if pd.isna(val) or str(val).strip() in ["", "nan"]:
-        return None
-    val = str(val).strip().lower()
-    return specialty_map.get(val, val)   # use map if exists, else keep cleaned value
+MISSING = ["", "nan", "none", "null"]
 
-df["specialization"] = df["specialization"].apply(normalize_specialty)
-print(f"✅ Specializations normalized\n")
-print("   Top specializations after cleaning:")
-print(df["specialization"].value_counts().head(15).to_string())
-print()
 
 # ──────────────────────────────────────────────
-# STEP 7: Handle nulls
-# - Drop rows where name is null/empty
-# - hospital_name → fill null with "clinic not specified"
-# - specialization → fill null with "general practitioner (gp)"
-# - pmdc → fill null with empty string (optional field)
+# Stage timing
 # ──────────────────────────────────────────────
-before = len(df)
-df = df[df["name"].notna() & (df["name"].str.strip() != "") & (df["name"] != "nan")]
-print(f"🗑️  Dropped {before - len(df)} rows with missing doctor name\n")
+@contextmanager
+def _stage(timings: dict, name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - t0
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
 
-df["hospital_name"]  = df["hospital_name"].fillna("clinic not specified")
-df["specialization"] = df["specialization"].fillna("general practitioner (gp)")
-df["pmdc"]           = df["pmdc"].fillna("").astype(str).str.strip()
 
 # ──────────────────────────────────────────────
-# STEP 8: Remove exact duplicates
+# STEP 1: Read input in chunks
+# The Excel has 2 junk rows at top before the real header row
 # ──────────────────────────────────────────────
-before = len(df)
-df = df.drop_duplicates(subset=["name", "phone"]).reset_index(drop=True)
-print(f"♻️  Removed {before - len(df)} duplicate rows (same name + phone)\n")
+def _cell(v):
+    return int(v) if isinstance(v, float) and v.is_integer() else v
+
+
+def _read_excel_chunks(path, chunksize):
+    from openpyxl import load_workbook
+
+    wb   = load_workbook(path, read_only=True, data_only=True)
+    rows = wb.active.iter_rows(values_only=True)
+
+    header = None
+    for row in rows:
+        if "Doctor Name" in row:
+            header = [str(c).strip() if c is not None else f"_col{i}" for i, c in enumerate(row)]
+            break
+    if header is None:
+        raise ValueError(f"No 'Doctor Name' header row found in {path}")
+
+    wanted = [header.index(c) for c in KEEP_COLS]
+    buf = []
+    for row in rows:
+        # openpyxl returns whole numbers as floats (923001234567.0) — keep them integral
+        buf.append([_cell(row[i]) if i < len(row) else None for i in wanted])
+        if len(buf) >= chunksize:
+            yield pd.DataFrame(buf, columns=list(KEEP_COLS), dtype=object)
+            buf = []
+    if buf:
+        yield pd.DataFrame(buf, columns=list(KEEP_COLS), dtype=object)
+    wb.close()
+
 
+def read_chunks(path, chunksize=CHUNK_SIZE):
+    if path.lower().endswith((".csv", ".csv.gz")):
+        yield from pd.read_csv(path, usecols=list(KEEP_COLS), dtype=str, chunksize=chunksize)
+    else:
+        yield from _read_excel_chunks(path, chunksize)
+
+
+# ──────────────────────────────────────────────
+# STEP 2–7: Vectorised cleaning (per chunk)
 # ──────────────────────────────────────────────
-# STEP 9: Final check + Save
+def _as_text(s: pd.Series) -> pd.Series:
+    # Every column as lower-case stripped text; missing → NA
+    s = s.astype(object).where(s.notna(), "").astype(str).str.strip().str.lower()
+    return s.mask(s.isin(MISSING))
+
+
+def clean_phones(s: pd.Series) -> pd.Series:
+    """
+    - Remove slashes, spaces, dashes and '.0' float artifacts
+    - 03XXXXXXXXX → 923XXXXXXXXX (Pakistan country code)
+    - Drop clearly invalid entries (too short)
+    """
+    s = _as_text(s).fillna("")
+    s = s.str.replace(r"[/ \-]", "", regex=True).str.replace(r"\.0$", "", regex=True)
+    s = s.mask(s.str.match(r"^03\d{9}$"), "92" + s.str[1:])
+    return s.mask(s.str.len() < 10)
+
+
+def normalize_specialties(s: pd.Series) -> pd.Series:
+    s = _as_text(s)
+    # Dict lookup in one vectorised map; values not in SPECIALTY_MAP are kept
+    mapped = s.map(SPECIALTY_MAP)
+    return mapped.where(mapped.notna(), s)
+
+
+def city_output_path(output_file: str, city: str) -> str:
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_{city.lower().replace(' ', '_')}{ext}"
+
+
+def clean_chunk(df: pd.DataFrame, timings: dict, cities=TARGET_CITIES) -> pd.DataFrame:
+    with _stage(timings, "select"):
+        df = df[list(KEEP_COLS)].rename(columns=KEEP_COLS)
+        df = df[df["city"].astype(str).str.strip().str.upper().isin(cities)]
+
+    with _stage(timings, "text"):
+        for col in ["name", "hospital_name", "city"]:
+            df[col] = _as_text(df[col])
+        df = df[df["name"].notna()]
+
+    with _stage(timings, "phone"):
+        df["phone"] = clean_phones(df["phone"])
+
+    with _stage(timings, "specialty"):
+        df["specialization"] = normalize_specialties(df["specialization"])
+
+    with _stage(timings, "nulls"):
+        # Missing values are NA here (_as_text), so an empty hospital really
+        # becomes "clinic not specified" — the pre-pipeline script turned it
+        # into the string "nan" first and wrote that out
+        df["hospital_name"]  = df["hospital_name"].fillna("clinic not specified")
+        df["specialization"] = df["specialization"].fillna("general practitioner (gp)")
+        df["pmdc"]           = df["pmdc"].astype(object).where(df["pmdc"].notna(), "").astype(str).str.strip()
+
+    return df
+
+
 # ──────────────────────────────────────────────
-print("=" * 50)
-print("📊 FINAL DATASET SUMMARY")
-print("=" * 50)
-print(f"  Total doctors (Karachi): {len(df)}")
-print(f"  Null values remaining:\n{df.isnull().sum().to_string()}")
-print(f"  Unique specializations: {df['specialization'].nunique()}")
-print()
-
-df.to_csv(OUTPUT_FILE, index=False)
-print(f"✅ Cleaned dataset saved → {OUTPUT_FILE}")
-print()
-print("📋 Sample rows:")
-print(df[["name", "hospital_name", "specialization", "phone", "pmdc"]].head(5).to_string())
\ No newline at end of file
+# Pipeline
+# ──────────────────────────────────────────────
+def _load_state():
+    if os.path.exists(STATE_FILE):
+        try:
+            with open(STATE_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {}
+
+
+def _write_parquet(df, path, timings):
+    with _stage(timings, "write_parquet"):
+        try:
+            df.to_parquet(path, index=False)
+            return path
+        except ImportError:
+            print("⚠️  Parquet skipped — install pyarrow to enable it")
+            return None
+
+
+def run_pipeline(input_file=INPUT_FILE, output_file=OUTPUT_FILE,
+                 chunksize=CHUNK_SIZE, force=False, fuzzy=True) -> dict:
+    """Cleans `input_file` → `output_file` (+ .parquet). Returns a run summary."""
+    timings = {}
+    parquet_file = os.path.splitext(output_file)[0] + ".parquet"
+
+    with _stage(timings, "hash"):
+        digest = file_sha256(input_file)
+
+    state = _load_state()
+    if (not force and state.get("input_sha256") == digest
+            and state.get("cities") == TARGET_CITIES and state.get("fuzzy", False) == fuzzy
+            and os.path.exists(output_file)):
+        print(f"⏭️  {input_file} unchanged since last run — skipping (use --force to rerun)")
+        return {"skipped": True, "rows": state.get("rows"), "timings": timings}
+
+    print(f"📂 Loading {input_file} in chunks of {chunksize}...")
+    parts, total_in = [], 0
+    with _stage(timings, "read"):
+        chunks = read_chunks(input_file, chunksize)
+    while True:
+        with _stage(timings, "read"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        total_in += len(chunk)
+        parts.append(clean_chunk(chunk, timings))
+
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=list(KEEP_COLS.values()))
+    print(f"   Total rows loaded: {total_in}")
+    print(f"📍 After city filter ({', '.join(c.title() for c in TARGET_CITIES)}) + cleaning: {len(df)} doctors")
+
+    # STEP 8: Remove exact duplicates (across chunks, within a city)
+    with _stage(timings, "dedupe"):
+        before = len(df)
+        df = df.drop_duplicates(subset=["city", "name", "phone"]).reset_index(drop=True)
+    print(f"♻️  Removed {before - len(df)} duplicate rows (same city + name + phone)")
+
+    # STEP 8b: Fuzzy duplicates (spelling variants) → one row per doctor_id
+    if fuzzy:
+        with _stage(timings, "fuzzy_dedupe"):
+            df, clusters = dedupe(df)
+            clusters.to_csv(REPORT_FILE, index=False)
+        print(f"📝 Merged clusters for review → {REPORT_FILE}")
+
+    # STEP 9: Save — combined file plus one partition per city
+    city_files = []
+    with _stage(timings, "write_csv"):
+        df.to_csv(output_file, index=False)
+        for city, part in df.groupby("city", sort=True):
+            path = city_output_path(output_file, city)
+            part.to_csv(path, index=False)
+            city_files.append(path)
+    parquet_out = _write_parquet(df, parquet_file, timings)
+
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"input_sha256": digest, "input": input_file, "cities": TARGET_CITIES, "rows": len(df),
+                   "fuzzy": fuzzy,
+                   "outputs": [p for p in (output_file, parquet_out, *city_files) if p]}, f, indent=2)
+
+    print("=" * 50)
+    print("📊 FINAL DATASET SUMMARY")
+    print("=" * 50)
+    print(f"  Total doctors          : {len(df)}")
+    for city, n in df["city"].value_counts().sort_index().items():
+        print(f"    {city:<20} {n}")
+    print(f"  Invalid/missing phones : {df['phone'].isna().sum()}")
+    print(f"  Unique specializations : {df['specialization'].nunique()}")
+    print(f"✅ Cleaned dataset saved → {output_file}" + (f" + {parquet_out}" if parquet_out else ""))
+    print()
+    print("⏱️  Stage timings:")
+    for name, sec in timings.items():
+        print(f"   {name:<14} {sec:8.3f}s")
+
+    return {"skipped": False, "rows": len(df), "timings": timings}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the PMDC doctors list")
+    parser.add_argument("--input",     default=INPUT_FILE)
+    parser.add_argument("--output",    default=OUTPUT_FILE)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--force",     action="store_true", help="rerun even if the input is unchanged")
+    parser.add_argument("--no-fuzzy",  action="store_true", help="skip the fuzzy dedupe stage")
+    args = parser.parse_args()
+    run_pipeline(args.input, args.output, args.chunksize, args.force, fuzzy=not args.no_fuzzy)
@@ -0,0 +1,355 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — Step 1b: Fuzzy doctor deduplication
+  Input : cleaned_doctors.csv (or a DataFrame from
+          clean_doctor_dataset.run_pipeline)
+  Output: deduplicated rows with a stable doctor_id
+          + dedupe_clusters.csv (merged clusters, for review)
+
+USAGE:
+  python dedupe_doctors.py                          # report only
+  python dedupe_doctors.py --write                  # rewrite the CSV with doctor_id
+  python dedupe_doctors.py --input cleaned_doctors.csv --report clusters.csv
+
+  clean_doctor_dataset.py runs this stage automatically
+  (--no-fuzzy to skip it).
+
+How it stays near-linear for nationwide lists:
+  1. Blocking — rows are only compared when they share a
+     normalised PMDC number, a phone number or a phonetic
+     name key (always within the same city). Each block is
+     sorted by name and every row is compared with the next
+     WINDOW rows, so a huge block ("muhammad ali") costs
+     WINDOW comparisons per row, not one per pair.
+  2. Similarity — MinHash signatures of name / hospital
+     character trigrams, computed for all rows at once with
+     NumPy; candidate pairs are scored in one vector op.
+  3. Clustering — union-find over accepted pairs, strongest
+     first; two different PMDC numbers never end up in the
+     same cluster. A cluster is one doctor at one practice
+     place (the API keeps one hospital per record), so a
+     doctor listed at two hospitals stays two records.
+  4. Stable IDs — from the cluster's PMDC number, else phone
+     + name key, else city + name key (each with the hospital
+     key), so the Firestore document ID survives re-runs and
+     name spelling fixes, and namesakes no longer overwrite
+     each other.
+============================================================
+"""
+
+import argparse
+import functools
+import hashlib
+import re
+import sys
+import time
+import zlib
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+import pandas as pd
+
+from modules.hospital_geo import GENERIC_WORDS
+
+INPUT_FILE   = "cleaned_doctors.csv"
+REPORT_FILE  = "dedupe_clusters.csv"
+WINDOW       = 20        # neighbours compared per row inside a block
+NUM_PERM     = 64        # MinHash permutations (similarity resolution ~1/64)
+SIG_CHUNK    = 20_000    # rows hashed per NumPy batch (bounds memory)
+PAIR_CHUNK   = 200_000   # pairs scored per NumPy batch
+MERSENNE     = (1 << 31) - 1
+
+# Accept a pair when the hospitals match (spelling may differ; an unknown
+# hospital is fine for PMDC / phone matches), the PMDC numbers do not
+# conflict, and one of these holds:
+HOSPITAL_MIN   = 0.50    # trigram similarity without "clinic", "medical", city names, ...
+PMDC_NAME_MIN  = 0.40    # same PMDC number, names at least loosely alike
+PHONE_NAME_MIN = 0.60    # same phone (clinics share numbers → need a close name)
+NAME_MIN       = 0.75    # same phonetic name key, close spelling
+
+TITLES = {"dr", "doctor", "prof", "professor", "mr", "mrs", "ms", "miss", "assoc", "asst"}
+_PHONETIC = [("ph", "f"), ("kh", "k"), ("gh", "g"), ("sh", "s"), ("ch", "c"), ("th", "t"),
+             ("dh", "d"), ("bh", "b"), ("ck", "k"), ("q", "k"), ("w", "v"), ("z", "j")]
+_WORD_RE   = re.compile(r"[a-z]+")
+_VOWELS_RE = re.compile(r"[aeiouyh]")
+_REPEAT_RE = re.compile(r"(.)\1+")
+
+
+# ──────────────────────────────────────────────
+# Normalisation / blocking keys
+# ──────────────────────────────────────────────
+def _tokens(name) -> list:
+    return [t for t in _WORD_RE.findall(str(name).lower()) if t not in TITLES]
+
+
+@functools.lru_cache(maxsize=200_000)
+def _phonetic_word(w: str) -> str:
+    """Roman-Urdu friendly skeleton: muhammad / mohammad / mohd → 'md'."""
+    for a, b in _PHONETIC:
+        w = w.replace(a, b)
+    head, tail = w[:1], _VOWELS_RE.sub("", w[1:])
+    head = "a" if head in "aeiouy" else head
+    return _REPEAT_RE.sub(r"\1", head + tail)
+
+
+def phonetic_key(name) -> str:
+    """Order-independent: 'ali muhammad' and 'muhammad ali' share a key."""
+    return " ".join(sorted(_phonetic_word(t) for t in _tokens(name)))
+
+
+def hospital_text(name) -> str:
+    """Distinctive hospital words only; "" when the hospital is unknown."""
+    if re.search(r"not specified|not provided", str(name).lower()):
+        return ""
+    return " ".join(t for t in _tokens(name) if t not in GENERIC_WORDS and len(t) > 1)
+
+
+def normalize_pmdc(s: pd.Series) -> pd.Series:
+    s = s.astype(object).where(s.notna(), "").astype(str).str.upper().str.replace(r"[^0-9A-Z]", "", regex=True)
+    return s.mask(s.isin(["", "NAN", "NONE", "NULL", "0"]) | ~s.str.contains(r"\d"), "")
+
+
+def normalize_phone(s: pd.Series) -> pd.Series:
+    s = s.astype(object).where(s.notna(), "").astype(str).str.replace(r"\D", "", regex=True)
+    return s.str[-10:].mask(s.str.len() < 10, "")
+
+
+# ──────────────────────────────────────────────
+# MinHash (vectorised)
+# ──────────────────────────────────────────────
+def _grams(text) -> list:
+    grams = []
+    for t in _tokens(text):
+        padded = f"<{t}>"
+        grams += [zlib.crc32(padded[i:i + 3].encode()) for i in range(max(len(padded) - 2, 1))]
+    return grams or [0]
+
+
+def minhash(texts, num_perm=NUM_PERM, seed=13) -> np.ndarray:
+    """(num_perm, len(texts)) uint32 signatures; equal share ≈ trigram Jaccard."""
+    rng  = np.random.default_rng(seed)
+    a    = rng.integers(1, MERSENNE, num_perm, dtype=np.uint64)[:, None]
+    b    = rng.integers(0, MERSENNE, num_perm, dtype=np.uint64)[:, None]
+    uniq, inverse = np.unique(np.asarray(texts, dtype=object).astype(str), return_inverse=True)
+    sig  = np.empty((num_perm, len(uniq)), dtype=np.uint32)
+    for start in range(0, len(uniq), SIG_CHUNK):
+        grams   = [_grams(t) for t in uniq[start:start + SIG_CHUNK]]
+        flat    = np.fromiter((g for row in grams for g in row), dtype=np.uint64)
+        offsets = np.cumsum([0] + [len(row) for row in grams[:-1]])
+        hashed  = (a * flat[None, :] + b) % MERSENNE
+        sig[:, start:start + len(grams)] = np.minimum.reduceat(hashed, offsets, axis=1)
+    return sig[:, inverse]
+
+
+def pair_similarity(sig, left, right) -> np.ndarray:
+    out = np.empty(len(left), dtype=np.float32)
+    for start in range(0, len(left), PAIR_CHUNK):
+        l, r = left[start:start + PAIR_CHUNK], right[start:start + PAIR_CHUNK]
+        out[start:start + len(l)] = (sig[:, l] == sig[:, r]).mean(axis=0)
+    return out
+
+
+# ──────────────────────────────────────────────
+# Candidate pairs (sorted neighbourhood per block)
+# ──────────────────────────────────────────────
+def candidate_pairs(block_keys: pd.Series, sort_keys: pd.Series, window=WINDOW) -> np.ndarray:
+    """(m, 2) row pairs sharing a non-empty block key, each row vs its next `window`."""
+    valid = np.flatnonzero(block_keys.to_numpy() != "")
+    if len(valid) < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    frame = pd.DataFrame({"b": block_keys.to_numpy()[valid], "s": sort_keys.to_numpy()[valid], "row": valid})
+    frame = frame.sort_values(["b", "s", "row"], kind="stable")
+    codes = pd.factorize(frame["b"])[0]
+    rows  = frame["row"].to_numpy()
+    out   = []
+    for d in range(1, min(window, len(rows) - 1) + 1):
+        same = codes[:-d] == codes[d:]
+        if not same.any():
+            break   # blocks are contiguous: no pair at distance d → none further
+        out.append(np.stack([rows[:-d][same], rows[d:][same]], axis=1))
+    return np.concatenate(out) if out else np.empty((0, 2), dtype=np.int64)
+
+
+# ──────────────────────────────────────────────
+# Clustering
+# ──────────────────────────────────────────────
+def _cluster(n, left, right, score, pmdc):
+    """
+    Union-find, strongest pair first. Returns (root per row, partner row,
+    accepted-pair index) — the last two describe the edge that joined each
+    row, -1 for rows that stayed alone.
+    """
+    parent  = list(range(n))
+    pmdc_of = {i: v for i, v in enumerate(pmdc) if v}
+    partner = np.full(n, -1, dtype=np.int64)
+    edge    = np.full(n, -1, dtype=np.int64)
+    left_l, right_l = left.tolist(), right.tolist()
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for k in np.argsort(-score, kind="stable").tolist():
+        a, b   = left_l[k], right_l[k]
+        ra, rb = find(a), find(b)
+        if ra == rb:
+            continue
+        pa, pb = pmdc_of.get(ra), pmdc_of.get(rb)
+        if pa and pb and pa != pb:
+            continue   # two registration numbers → two doctors
+        parent[rb] = ra
+        if pb and not pa:
+            pmdc_of[ra] = pb
+        for row, other in ((a, b), (b, a)):
+            if edge[row] < 0:
+                partner[row], edge[row] = other, k
+    return np.array([find(i) for i in range(n)], dtype=np.int64), partner, edge
+
+
+def _map_unique(s: pd.Series, fn) -> pd.Series:
+    """fn once per distinct value (names repeat a lot across a national list)."""
+    values = s.astype(str)
+    return values.map({v: fn(v) for v in values.unique()})
+
+
+def _first_present(values, present, order, by_root, roots) -> np.ndarray:
+    """Per cluster in `roots`: first value (in rank `order`) whose `present` flag is set, else NaN."""
+    series = pd.Series(np.where(present, np.asarray(values, dtype=object), None))
+    return series.loc[order.index].groupby(by_root, sort=True).first().reindex(roots).to_numpy()
+
+
+def _stable_ids(city, pmdc, phone, name_key, hospital_key) -> np.ndarray:
+    identity = np.where(pmdc != "", "pmdc:" + pmdc + ":" + hospital_key,
+               np.where(phone != "", "phone:" + phone + ":" + name_key + ":" + hospital_key,
+                        "name:" + city + ":" + name_key + ":" + hospital_key))
+    return np.array(["dr_" + hashlib.sha1(i.encode("utf-8")).hexdigest()[:16] for i in identity], dtype=object)
+
+
+def dedupe(df: pd.DataFrame, window=WINDOW, verbose=True):
+    """
+    Returns (deduplicated df with a doctor_id column, cluster report df).
+    Within a cluster the row with PMDC + phone wins; its missing phone /
+    PMDC are filled from the others and specializations are combined.
+    """
+    t0   = time.perf_counter()
+    df   = df.reset_index(drop=True)
+    n    = len(df)
+    city = df["city"].astype(str).str.lower()
+    pmdc = normalize_pmdc(df["pmdc"])
+    phone     = normalize_phone(df["phone"])
+    name_key  = _map_unique(df["name"], phonetic_key)
+    hosp_text = _map_unique(df["hospital_name"], hospital_text)
+    hosp_key  = _map_unique(hosp_text, phonetic_key)
+    sort_name = df["name"].astype(str)
+
+    blocks = {
+        "pmdc" : (city + "|" + pmdc).mask(pmdc == "", ""),
+        "phone": (city + "|" + phone).mask(phone == "", ""),
+        "name" : (city + "|" + name_key).mask(name_key == "", ""),
+    }
+    pairs = np.concatenate([candidate_pairs(k, sort_name, window) for k in blocks.values()])
+    if len(pairs):
+        pairs = np.unique(np.sort(pairs, axis=1), axis=0)
+    left, right = (pairs[:, 0], pairs[:, 1]) if len(pairs) else (np.array([], int), np.array([], int))
+
+    name_sim = pair_similarity(minhash(df["name"].tolist()), left, right)
+    hosp_sim = pair_similarity(minhash(hosp_text.tolist()), left, right)
+
+    p, ph, nk   = pmdc.to_numpy(), phone.to_numpy(), name_key.to_numpy()
+    known       = hosp_text.to_numpy() != ""
+    same_pmdc   = (p[left] != "") & (p[left] == p[right])
+    pmdc_clash  = (p[left] != "") & (p[right] != "") & (p[left] != p[right])
+    same_phone  = (ph[left] != "") & (ph[left] == ph[right])
+    same_name   = (nk[left] != "") & (nk[left] == nk[right])
+    by_pmdc     = same_pmdc & (name_sim >= PMDC_NAME_MIN)
+    by_phone    = same_phone & (name_sim >= PHONE_NAME_MIN)
+    by_name     = same_name & (name_sim >= NAME_MIN)
+    same_place  = (known[left] & known[right] & (hosp_sim >= HOSPITAL_MIN)) | \
+                  ((~known[left] | ~known[right]) & (same_pmdc | same_phone))
+    accept      = ~pmdc_clash & same_place & (by_pmdc | by_phone | by_name)
+
+    reason = np.where(by_pmdc, "pmdc", np.where(by_phone, "phone", "name"))[accept]
+    left, right        = left[accept], right[accept]
+    name_sim, hosp_sim = name_sim[accept], hosp_sim[accept]
+    score  = name_sim + 0.5 * hosp_sim + 2.0 * same_pmdc[accept] + 1.0 * same_phone[accept]
+    root, partner, edge = _cluster(n, left, right, score, p)
+
+    # ── Canonical row per cluster: PMDC + phone first, then longest hospital ──
+    rank   = (p != "") * 2 + (ph != "") + df["hospital_name"].astype(str).str.len().to_numpy() / 1e4
+    order  = pd.DataFrame({"root": root, "rank": rank}).sort_values(["root", "rank"], ascending=[True, False],
+                                                                    kind="stable")
+    by_root = order["root"].to_numpy()
+    canon   = order.index[~order["root"].duplicated()].to_numpy()          # one row per cluster
+    size    = np.bincount(root, minlength=n)[root]
+
+    out = df.loc[canon].copy()
+    # Missing phone / PMDC: first present value in rank order within the cluster
+    for col, key in (("phone", ph), ("pmdc", p)):
+        out[col] = _first_present(df[col], key != "", order, by_root, root[canon])
+    multi = np.flatnonzero(size[order.index] > 1)
+    if len(multi):
+        rows  = order.index[multi]
+        specs = (df.loc[rows, "specialization"].fillna("").astype(str)
+                 .groupby(by_root[multi], sort=False)
+                 .agg(lambda v: ", ".join(dict.fromkeys(x.strip() for s in v for x in s.split(",") if x.strip()))))
+        is_multi = size[canon] > 1
+        out.loc[out.index[is_multi], "specialization"] = specs.loc[root[canon][is_multi]].to_numpy()
+
+    # ── Stable IDs (collisions → deterministic suffix) ──
+    # groupby().first() gives NaN for a cluster with no PMDC / phone → ""
+    cluster_pmdc  = pd.Series(_first_present(p, p != "", order, by_root, root[canon])).fillna("")
+    cluster_phone = pd.Series(_first_present(ph, ph != "", order, by_root, root[canon])).fillna("")
+    ids = _stable_ids(city.to_numpy()[canon].astype(str),
+                      cluster_pmdc.to_numpy().astype(str),
+                      cluster_phone.to_numpy().astype(str),
+                      nk[canon].astype(str), hosp_key.to_numpy()[canon].astype(str))
+    out.insert(0, "doctor_id", ids)
+    out = out.sort_values(["doctor_id", "name", "hospital_name"], kind="stable")
+    dup = out.groupby("doctor_id").cumcount()
+    out["doctor_id"] = out["doctor_id"].where(dup == 0, out["doctor_id"] + "-" + (dup + 1).astype(str))
+    out = out.sort_index()
+
+    # ── Review report: every row of every merged cluster ──
+    rows   = np.flatnonzero(size > 1)
+    id_of  = pd.Series(out["doctor_id"].to_numpy(), index=root[out.index.to_numpy()])
+    e      = edge[rows]
+    report = df.loc[rows, ["name", "hospital_name", "specialization", "phone", "pmdc"]].copy()
+    report.insert(0, "row", rows)
+    report.insert(0, "kept", np.isin(rows, canon))
+    report.insert(0, "cluster_size", size[rows])
+    report.insert(0, "doctor_id", id_of.loc[root[rows]].to_numpy())
+    report["matched_on"]   = np.where(e >= 0, reason[np.maximum(e, 0)] if len(reason) else "", "")
+    report["matched_row"]  = partner[rows]
+    report["name_sim"]     = np.round(name_sim[np.maximum(e, 0)], 2) if len(e) else []
+    report["hospital_sim"] = np.round(hosp_sim[np.maximum(e, 0)], 2) if len(e) else []
+    report = report.sort_values(["doctor_id", "kept", "row"], ascending=[True, False, True])
+
+    if verbose:
+        print(f"🧬 Fuzzy dedupe: {n} rows → {len(out)} doctors "
+              f"({n - len(out)} merged into {len(np.unique(root[rows]))} clusters) | "
+              f"{len(pairs)} candidate pairs, {len(left)} accepted "
+              f"({', '.join(f'{k}: {int((reason == k).sum())}' for k in ('pmdc', 'phone', 'name'))}) "
+              f"| {time.perf_counter() - t0:.2f}s")
+    return out.reset_index(drop=True), report.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fuzzy-deduplicate the cleaned doctors list")
+    parser.add_argument("--input",  default=INPUT_FILE)
+    parser.add_argument("--report", default=REPORT_FILE)
+    parser.add_argument("--window", type=int, default=WINDOW)
+    parser.add_argument("--write",  action="store_true", help="rewrite --input with doctor_id, duplicates removed")
+    args = parser.parse_args()
+
+    frame = pd.read_csv(args.input, dtype=str)
+    if "doctor_id" in frame.columns:
+        frame = frame.drop(columns="doctor_id")
+    deduped, clusters = dedupe(frame, args.window)
+    clusters.to_csv(args.report, index=False)
+    print(f"📝 {clusters['doctor_id'].nunique() if len(clusters) else 0} clusters for review → {args.report}")
+    if args.write:
+        deduped.to_csv(args.input, index=False)
+        print(f"✅ {args.input} rewritten with doctor_id ({len(deduped)} rows)")
@@ -0,0 +1,70 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — Offline hospital geocoder
+  Input : cleaned_doctors.csv + osm_facilities_index.json
+  Output: hospital_geo_<city>.json (read by firestore_service
+          to rank specialists by distance to the user)
+
+USAGE:
+  python geocode_hospitals.py
+  python geocode_hospitals.py --city lahore --threshold 0.7
+
+Run after build_osm_index.py and clean_doctor_dataset.py.
+Every hospital name is matched against OSM facility names;
+unmatched hospitals are listed so the threshold (or the OSM
+extract) can be tuned. To pick up a new file without a
+restart, rebuild the city's snapshot:
+  POST /api/admin/doctors/reload  (X-Admin-Token)
+  {"city": "lahore", "source": "disk"}
+The new shard rereads hospital_geo_<city>.json, and the
+touched cache file makes every other worker swap within
+DOCTORS_WATCH_SEC.
+============================================================
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pandas as pd
+
+from modules.osm_index import INDEX_FILE
+from modules.hospital_geo import geocode_hospitals, save_hospital_geo, MATCH_THRESHOLD, UNMATCHABLE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocode doctor hospitals against the OSM index")
+    parser.add_argument("--csv",       default="cleaned_doctors.csv")
+    parser.add_argument("--index",     default=INDEX_FILE)
+    parser.add_argument("--city",      help="only geocode this city")
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD)
+    parser.add_argument("--show-unmatched", type=int, default=20, metavar="N")
+    args = parser.parse_args()
+
+    with open(args.index, "r", encoding="utf-8") as f:
+        facilities = json.load(f).get("facilities", [])
+    print(f"📂 {len(facilities)} OSM facilities from {args.index}")
+
+    df = pd.read_csv(args.csv, dtype=str).fillna("")
+    if args.city:
+        df = df[df["city"] == args.city.strip().lower()]
+
+    for city, group in df.groupby("city"):
+        names   = {n.strip().lower() for n in group["hospital_name"]} - UNMATCHABLE
+        matched = geocode_hospitals(names, facilities, args.threshold)
+        save_hospital_geo(city, matched, len(names))
+
+        # Doctors covered matters more than hospitals covered
+        located = group["hospital_name"].str.strip().str.lower().isin(matched.keys()).sum()
+        print(f"   👨‍⚕️ {located}/{len(group)} doctors now have a location")
+        missing = sorted(names - matched.keys())
+        for name in missing[:args.show_unmatched]:
+            print(f"   ❓ {name}")
+        if len(missing) > args.show_unmatched:
+            print(f"   ... and {len(missing) - args.show_unmatched} more")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — admission.py
+  Admission control in front of the LLM stage
+  1. check_rate()        → token bucket per session + per IP
+  2. stats()             → counters for /api/health, including
+                           the LLM scheduler's queue (llm_scheduler.py)
+  All limits are per worker process (gunicorn forks).
+============================================================
+"""
+
+import math, os, threading, time
+from modules import llm_scheduler
+
+SESSION_RATE_PER_MIN = float(os.getenv("RATE_LIMIT_SESSION_PER_MIN", "10"))
+SESSION_BURST        = float(os.getenv("RATE_LIMIT_SESSION_BURST",   "5"))
+IP_RATE_PER_MIN      = float(os.getenv("RATE_LIMIT_IP_PER_MIN",      "30"))
+IP_BURST             = float(os.getenv("RATE_LIMIT_IP_BURST",        "15"))
+
+BUCKET_IDLE_SEC      = 600   # forget buckets of clients idle this long
+
+_stats = {
+    "rejected_rate": 0,
+}
+
+
+# ── Token buckets ─────────────────────────────────────────
+_buckets      = {}   # key → [tokens, last_refill]
+_bucket_lock  = threading.Lock()
+_last_prune   = [time.time()]
+
+
+def _refill(key, rate_per_min, burst, now):
+    b = _buckets.get(key)
+    if b is None:
+        b = _buckets[key] = [burst, now]
+    else:
+        b[0] = min(burst, b[0] + (now - b[1]) * rate_per_min / 60)
+        b[1] = now
+    return b
+
+
+def _wait_for_token(b, rate_per_min):
+    return (1 - b[0]) * 60 / rate_per_min if rate_per_min > 0 else 60.0
+
+
+def _prune(now):
+    if now - _last_prune[0] < BUCKET_IDLE_SEC:
+        return
+    _last_prune[0] = now
+    for key in [k for k, b in _buckets.items() if now - b[1] > BUCKET_IDLE_SEC]:
+        del _buckets[key]
+
+
+def check_rate(session_id: str, ip: str) -> float:
+    """
+    Takes one token from the session bucket and the IP bucket.
+    Returns 0 when admitted, else seconds until a retry can succeed.
+    """
+    now    = time.time()
+    limits = [(f"ip:{ip}", IP_RATE_PER_MIN, IP_BURST)]
+    if session_id:
+        limits.append((f"sid:{session_id}", SESSION_RATE_PER_MIN, SESSION_BURST))
+
+    with _bucket_lock:
+        _prune(now)
+        buckets = [(_refill(key, rate, burst, now), rate) for key, rate, burst in limits]
+        short   = [_wait_for_token(b, rate) for b, rate in buckets if b[0] < 1]
+        if short:
+            _stats["rejected_rate"] += 1
+            return max(short)
+        for b, _ in buckets:
+            b[0] -= 1
+    return 0.0
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def stats() -> dict:
+    return {**_stats, **llm_scheduler.stats()}
@@ -0,0 +1,107 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — cascade.py
+  Small → large Ollama model cascade
+  1. complexity()   → cheap score from message length, intent
+                      type, history length and clinical
+                      keyword hits
+  2. choose()       → "small" below CASCADE_THRESHOLD,
+                      "large" otherwise
+  3. insufficient() → why a small-model reply should be
+                      escalated (empty, too short, unsure)
+                      or None
+  4. stats()        → per-tier calls, latency p50/p95 and
+                      escalation rate, for GET /api/health
+  OLLAMA_SMALL_MODEL (e.g. llama3.2:3b) turns it on; the
+  large tier is OLLAMA_MODEL. Groq calls are not affected.
+  All state is per worker process.
+============================================================
+"""
+
+import os, re, threading, time
+from collections import deque
+
+from modules.intent_detector import CLINICAL_SPECIALTY_MAP
+
+SMALL_MODEL       = os.getenv("OLLAMA_SMALL_MODEL", "")
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "2.0"))
+CASCADE_MIN_CHARS = int(os.getenv("CASCADE_MIN_CHARS", "80"))   # shorter small-model replies escalate
+WINDOW            = 200    # latency samples kept per tier
+
+# Base score per intent; doctor-mode turns start high enough to skip the small model
+INTENT_WEIGHT = {
+    "general_chat": 0.0, "general": 0.5, "emotional": 1.0, "specialist": 1.0,
+    "clinical": 2.0, "referral": 2.0,
+}
+
+_CLINICAL_RE = re.compile(r"\b(" + "|".join(sorted(
+    {re.escape(kw) for kws in CLINICAL_SPECIALTY_MAP.values() for kw in kws}, key=len, reverse=True)) + r")\b")
+_UNSURE_RE   = re.compile(
+    r"\b(i('m| am) not sure|i (don't|do not) know|i('m| am) unable to|i cannot (help|answer)|"
+    r"as an ai|mujhe (nahi|nahin) pata)\b")
+
+_lock  = threading.Lock()
+_ms    = {"small": deque(maxlen=WINDOW), "large": deque(maxlen=WINDOW)}
+_stats = {"small": 0, "large": 0, "escalated": 0, "reasons": {}}
+
+
+def enabled() -> bool:
+    return bool(SMALL_MODEL)
+
+
+def complexity(message: str, intent: str, history: list) -> float:
+    msg   = message.lower()
+    score = INTENT_WEIGHT.get(intent, 1.0)
+    score += min(len(msg.split()) / 40, 2.0)            # 40 words ≈ +1
+    score += min(len(history) / 12, 1.0)                # 6 earlier turns ≈ +1
+    score += 0.5 * min(len(_CLINICAL_RE.findall(msg)), 4)
+    return round(score, 2)
+
+
+def choose(score: float) -> str:
+    return "small" if score < CASCADE_THRESHOLD else "large"
+
+
+def insufficient(reply, score):
+    """Reason to escalate a small-model reply, or None when it is good enough."""
+    if not reply:
+        return "failed"
+    if _UNSURE_RE.search(reply.lower()):
+        return "unsure"
+    # Plain small talk may legitimately get a one-liner
+    if score >= INTENT_WEIGHT["general"] and len(reply) < CASCADE_MIN_CHARS:
+        return "too_short"
+    return None
+
+
+def record(tier, t0, escalated=None):
+    with _lock:
+        _stats[tier] += 1
+        _ms[tier].append((time.perf_counter() - t0) * 1000)
+        if escalated:
+            _stats["escalated"] += 1
+            _stats["reasons"][escalated] = _stats["reasons"].get(escalated, 0) + 1
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))])
+
+
+def stats() -> dict:
+    with _lock:
+        out = {
+            "enabled"        : enabled(),
+            "small_model"    : SMALL_MODEL or None,
+            "threshold"      : CASCADE_THRESHOLD,
+            "escalated"      : _stats["escalated"],
+            "escalation_rate": round(_stats["escalated"] / _stats["small"], 3) if _stats["small"] else 0.0,
+            "reasons"        : dict(_stats["reasons"]),
+        }
+        for tier in ("small", "large"):
+            out[tier] = {"calls" : _stats[tier],
+                         "p50_ms": _percentile(_ms[tier], 50),
+                         "p95_ms": _percentile(_ms[tier], 95)}
+    return out
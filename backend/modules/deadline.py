@@ -0,0 +1,44 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — deadline.py
+  Per-request time budget, created in the route handler and
+  passed down to every blocking call (Firestore, Overpass,
+  scheduler queue, Groq, Ollama). Each call gets only the
+  remaining budget instead of its own fixed timeout.
+============================================================
+"""
+
+import os, time
+
+CHAT_BUDGET_SEC   = float(os.getenv("CHAT_BUDGET_SEC",   "25"))   # app waits 30 s
+PLACES_BUDGET_SEC = float(os.getenv("PLACES_BUDGET_SEC", "20"))   # app waits 25 s
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    def __init__(self, budget_sec: float):
+        self.budget = budget_sec
+        self.at     = time.time() + budget_sec   # absolute, comparable to time.time()
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - time.time())
+
+    def expired(self) -> bool:
+        return time.time() >= self.at
+
+    def timeout(self, cap: float) -> float:
+        """Timeout for the next call: its own cap or what is left, whichever is smaller."""
+        return min(cap, self.remaining())
+
+    def check(self, stage: str):
+        if self.expired():
+            print(f"[Deadline] ⏱️ Budget of {self.budget:.0f}s exhausted at {stage}")
+            raise DeadlineExceeded(stage)
+
+
+def timeout_for(deadline, cap: float) -> float:
+    """Same as deadline.timeout(cap) but accepts deadline=None (scripts, warm-up)."""
+    return cap if deadline is None else deadline.timeout(cap)
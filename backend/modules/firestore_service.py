@@ -3,12 +3,50 @@
   firestore_service.py — RAILWAY VERSION
   Firestore REST (NO AUTH)
   Uses FIREBASE_PROJECT_ID from environment variables
+
+  Doctor data is sharded by city:
+    Firestore : cities/{city}/doctors/{doc_id}
+    Disk      : doctors_cache_{city}.json
+    Memory    : one shard per city, loaded on first use and
+                evicted after CITY_IDLE_SEC without queries
+    Geo       : hospital_geo_{city}.json (geocode_hospitals.py)
+                → nearest specialists when lat/lng are given
+    Cold city : no shard and no disk cache → the lookup is
+                answered by one runQuery (specialty filter,
+                field mask, limit) while the full snapshot
+                loads in a background thread
+    Hot swap  : every shard is a versioned snapshot (hash of
+                its cache file). A new doctors_cache_{city}.json
+                (reload_city() / admin endpoint, or a copied
+                file) is noticed within DOCTORS_WATCH_SEC by
+                every worker; the new shard is built next to
+                the old one and swapped in with one assignment,
+                so in-flight requests finish on the old one
+    Max age   : a shard whose data is older than
+                SHARD_MAX_AGE_SEC is refetched from Firestore
+                in the background; the rewritten cache file
+                carries it to the other workers
 ============================================================
 """
 
-import json, os, time, requests
-
-CACHE_FILE = "doctors_cache.json"
+import hashlib, json, os, threading, time, requests
+from modules.deadline import timeout_for, DeadlineExceeded
+from modules.geo_index import GridIndex
+from modules.hospital_geo import load_hospital_geo
+from modules import memdiag
+
+CACHE_FILE       = "doctors_cache.json"          # legacy single-city (Karachi) cache
+CITY_CACHE_FILE  = "doctors_cache_{city}.json"
+LEGACY_CITY      = "karachi"                     # served from the old flat 'doctors' collection
+DEFAULT_CITY     = "karachi"
+SUPPORTED_CITIES = [c.strip().lower() for c in
+                    os.getenv("SUPPORTED_CITIES", "karachi,lahore,islamabad").split(",") if c.strip()]
+CITY_IDLE_SEC    = int(os.getenv("CITY_IDLE_SEC", "1800"))
+COLD_QUERY       = os.getenv("FIRESTORE_COLD_QUERY", "1") == "1"
+COLD_QUERY_LIMIT = 20    # fetched per cold query; _prioritize picks `limit` (phone numbers first)
+LOAD_RETRY_SEC   = 60    # wait before retrying a failed background snapshot load
+DOCTORS_WATCH_SEC = float(os.getenv("DOCTORS_WATCH_SEC", "30"))   # cache file mtime check; 0 = off
+SHARD_MAX_AGE_SEC = float(os.getenv("SHARD_MAX_AGE_SEC", "21600"))  # Firestore refetch after 6 h; 0 = off
 
 # ── Load project ID from ENV (Railway safe) ───────────────
 PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
@@ -23,6 +61,9 @@ FIRESTORE_BASE = (
     f"projects/{PROJECT_ID}/databases/(default)/documents"
 )
 
+def _collection_path(city):
+    return f"cities/{city}/doctors"
+
 # ── Value parser ──────────────────────────────────────────
 def _parse_value(v):
     if "stringValue"  in v: return v["stringValue"]
@@ -39,58 +80,270 @@ def _parse_value(v):
 def _parse_doc(doc):
     return {k: _parse_value(v) for k, v in doc.get("fields", {}).items()}
 
-# ── In-memory cache ───────────────────────────────────────
-_cache = {}
-_cache_ttl = 300
+def normalize_city(city):
+    # str(): "city" comes straight from request JSON and may be a number
+    return str(city or DEFAULT_CITY).strip().lower()
+
+# ── In-memory shards ──────────────────────────────────────
+# city → {"docs", "by_spec", "queries", "geo", "near", "loaded_at", "last_used"}
+_shards      = {}
+_shard_locks = {city: threading.Lock() for city in SUPPORTED_CITIES}
+_loading     = set()   # cities whose snapshot is loading in the background
+_load_failed = {}      # city → time of the last failed background load
+_cold        = {}      # (city, kw, limit) → cold query result, dropped once the shard is ready
+_checked     = {}      # city → last cache file mtime check
+_swapping    = set()   # cities whose next snapshot is being built in the background
+memdiag.track("doctor_shards", lambda: _shards)
+memdiag.track("cold_queries", lambda: _cold)
+
+def _snapshot_version(raw: bytes) -> str:
+    # Content hash: every worker reports the same version for the same file
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+def _build_shard(docs, city, source=None):
+    """source: {"version", "path", "mtime"} of the snapshot the docs came from."""
+    source = source or {"version": _snapshot_version(json.dumps(docs, ensure_ascii=False).encode("utf-8")),
+                        "path": None, "mtime": None}
+    # Distinct specialization string → doc positions. Queries scan the few
+    # hundred distinct strings instead of every doctor in the city.
+    by_spec = {}
+    for i, d in enumerate(docs):
+        by_spec.setdefault(str(d.get("specialization", "")).lower(), []).append(i)
+    now = time.time()
+    return {
+        "docs"     : docs,
+        "by_spec"  : by_spec,
+        # Results per (specialization, limit) for this shard. The same list object
+        # is returned every time so responses.fragment() can reuse its encoded
+        # JSON — callers must not mutate it.
+        "queries"  : {},
+        # hospital_name → (lat, lng), and per specialization a GridIndex over the
+        # located hospitals that have such doctors (built on first geo query)
+        "geo"      : load_hospital_geo(city),
+        "near"     : {},
+        "version"  : source["version"],
+        "source"   : source["path"] or "firestore",
+        "mtime"    : source["mtime"],
+        "loaded_at": now,
+        "last_used": now,
+    }
 
-def _get_cache(key):
-    if key in _cache:
-        data, ts = _cache[key]
-        if time.time() - ts < _cache_ttl:
-            return data
-    return None
+def _swap(city, shard, reason):
+    # One reference assignment: requests that already hold the old shard
+    # finish on it, the next _get_shard() sees the new one
+    old = _shards.get(city)
+    if old is not None:
+        shard["last_used"] = old["last_used"]
+    _shards[city] = shard
+    print(f"[Firestore] 🔄 '{city}' snapshot {old['version'] if old else '—'} → {shard['version']} "
+          f"({len(shard['docs'])} doctors, {reason})")
+
+def _evict_idle(now):
+    # list(): loader threads and reload_city() add shards concurrently
+    for city in [c for c, s in list(_shards.items()) if now - s["last_used"] > CITY_IDLE_SEC]:
+        print(f"[Firestore] 🧹 Evicting idle '{city}' shard")
+        _shards.pop(city, None)
+
+def _get_shard(city, deadline=None):
+    """The city's shard, or None — also while a cold city loads in the background."""
+    now = time.time()
+    _evict_idle(now)
+
+    shard = _shards.get(city)
+    if shard is None:
+        if city not in _shard_locks or city in _loading:
+            return None
+        with _shard_locks[city]:          # one loader per city, others wait for it
+            shard = _shards.get(city)
+            if shard is None:
+                docs, source = _read_cache(city)
+                if not docs and COLD_QUERY and PROJECT_ID:
+                    _load_in_background(city)
+                    return None
+                if not docs:
+                    docs   = _fetch_all_docs(city=city, deadline=deadline)
+                    source = _save_to_disk(docs, city) if docs else None
+                if not docs:
+                    return None
+                shard = _shards[city] = _build_shard(docs, city, source)
+                print(f"[Firestore] ✅ '{city}' shard ready — {len(docs)} doctors (v{shard['version']})")
+    else:
+        _watch(city, shard, now)
+        _refresh_stale(city, shard, now)
+    shard["last_used"] = now
+    return shard
+
+def _watch(city, shard, now):
+    """Swap in a new snapshot (in the background) when the city's cache file changed on disk."""
+    if DOCTORS_WATCH_SEC <= 0 or now - _checked.get(city, 0) < DOCTORS_WATCH_SEC or city in _swapping:
+        return
+    _checked[city] = now
+    path = next((p for p in _cache_paths(city) if os.path.exists(p)), None)
+    try:
+        mtime = os.path.getmtime(path) if path else None
+    except OSError:
+        return
+    if mtime is None or (path == shard["source"] and mtime == shard["mtime"]):
+        return
+    _swapping.add(city)
+
+    def swap():
+        try:
+            with _shard_locks[city]:
+                docs, source = _read_cache(city)
+                if docs:
+                    _swap(city, _build_shard(docs, city, source), "cache file changed")
+        except Exception as e:
+            print(f"[Firestore] ⚠️ Snapshot swap failed for '{city}': {e}")
+        finally:
+            _swapping.discard(city)
+
+    threading.Thread(target=swap, daemon=True, name=f"swap-{city}").start()
+
+def _refresh_stale(city, shard, now):
+    """Refetch from Firestore (in the background) once the shard's data is older than SHARD_MAX_AGE_SEC."""
+    # The cache file's mtime is when its data was fetched; a shard
+    # built from an old file on disk is already that old
+    age = now - (shard["mtime"] or shard["loaded_at"])
+    if (SHARD_MAX_AGE_SEC <= 0 or not PROJECT_ID or age < SHARD_MAX_AGE_SEC or city in _swapping
+            or now - _load_failed.get(city, 0) < LOAD_RETRY_SEC):
+        return
+    _swapping.add(city)
+
+    def refresh():
+        try:
+            with _shard_locks[city]:
+                docs = _fetch_all_docs(city=city)
+                if docs:
+                    # Rewriting the cache file also makes the other workers swap (_watch)
+                    _swap(city, _build_shard(docs, city, _save_to_disk(docs, city)), "max age")
+                    _checked[city] = time.time()
+                else:
+                    _load_failed[city] = time.time()
+                    print(f"[Firestore] ⚠️ Refresh of '{city}' failed — keeping snapshot {shard['version']}")
+        except Exception as e:
+            _load_failed[city] = time.time()
+            print(f"[Firestore] ⚠️ Refresh of '{city}' failed: {e}")
+        finally:
+            _swapping.discard(city)
+
+    print(f"[Firestore] ⏳ '{city}' snapshot is {age / 3600:.1f}h old — refetching in the background")
+    threading.Thread(target=refresh, daemon=True, name=f"refresh-{city}").start()
+
+def reload_city(city, source="disk") -> dict:
+    """
+    Build a new snapshot and swap it in now (admin endpoint). "firestore"
+    refetches and rewrites doctors_cache_{city}.json first; "disk" rereads
+    it (and hospital_geo) and touches it. Either way the file's new mtime
+    makes every other worker swap within DOCTORS_WATCH_SEC.
+    """
+    city = normalize_city(city)
+    if city not in _shard_locks:
+        raise ValueError(f"Unsupported city '{city}'")
+    with _shard_locks[city]:
+        if source == "firestore":
+            docs = _fetch_all_docs(city=city)
+            meta = _save_to_disk(docs, city) if docs else None
+        else:
+            docs, meta = _read_cache(city)
+            if meta:
+                os.utime(meta["path"])
+                meta["mtime"] = os.path.getmtime(meta["path"])
+        if not docs:
+            raise LookupError(f"No doctors found for '{city}' ({source})")
+        shard = _build_shard(docs, city, meta)
+        _swap(city, shard, f"reload from {source}")
+    _checked[city] = time.time()
+    return shard_status()[city]
+
+def _load_in_background(city):
+    if time.time() - _load_failed.get(city, 0) < LOAD_RETRY_SEC:
+        return
+    _loading.add(city)
+
+    def load():
+        try:
+            with _shard_locks[city]:
+                docs = _fetch_all_docs(city=city)
+                if docs:
+                    _shards[city] = _build_shard(docs, city, _save_to_disk(docs, city))
+                    print(f"[Firestore] ✅ '{city}' shard ready (background) — {len(docs)} doctors")
+                else:
+                    _load_failed[city] = time.time()
+        except Exception as e:
+            _load_failed[city] = time.time()   # retry after LOAD_RETRY_SEC, not on the next request
+            print(f"[Firestore] ⚠️ Background load of '{city}' failed: {e}")
+        finally:
+            _loading.discard(city)
+            # list(): request threads keep adding cold query results
+            for key in [k for k in list(_cold) if k[0] == city]:
+                _cold.pop(key, None)
 
-def _set_cache(key, data):
-    _cache[key] = (data, time.time())
+    print(f"[Firestore] 🧊 '{city}' is cold — loading snapshot in the background")
+    threading.Thread(target=load, daemon=True, name=f"shard-{city}").start()
 
 # ── Local file cache ──────────────────────────────────────
-def _save_to_disk(docs):
+def _cache_file(city):
+    return CITY_CACHE_FILE.format(city=city.replace(" ", "_"))
+
+def _cache_paths(city):
+    return [_cache_file(city)] + ([CACHE_FILE] if city == LEGACY_CITY else [])
+
+def _save_to_disk(docs, city=DEFAULT_CITY):
+    """Write tmp + rename, so a watching worker never reads half a file. → snapshot source or None"""
+    path = _cache_file(city)
+    raw  = json.dumps(docs, ensure_ascii=False).encode("utf-8")
     try:
-        with open(CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(docs, f, ensure_ascii=False)
-        print(f"[Cache] 💾 Saved {len(docs)} doctors to {CACHE_FILE}")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+        print(f"[Cache] 💾 Saved {len(docs)} doctors to {path}")
+        return {"version": _snapshot_version(raw), "path": path, "mtime": os.path.getmtime(path)}
     except Exception as e:
         print(f"[Cache] ⚠️ Could not save to disk: {e}")
-
-def _load_from_disk():
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, "r", encoding="utf-8") as f:
-                docs = json.load(f)
-            print(f"[Cache] ✅ Loaded {len(docs)} doctors from local cache")
-            return docs
-        except Exception as e:
-            print(f"[Cache] ⚠️ Could not read cache file: {e}")
-    return None
-
-# ── Fetch all docs via REST (no auth) ─────────────────────
-def _fetch_all_docs(timeout_sec=15):
-    if not PROJECT_ID:
-        print("[Firestore] ❌ No FIREBASE_PROJECT_ID set")
-        return []
-
-    url = f"{FIRESTORE_BASE}/doctors"
+        return None
+
+def _read_cache(city=DEFAULT_CITY):
+    """(docs, {"version", "path", "mtime"}) from the city's cache file, or (None, None)."""
+    for path in _cache_paths(city):
+        if os.path.exists(path):
+            try:
+                mtime = os.path.getmtime(path)
+                with open(path, "rb") as f:
+                    raw = f.read()
+                docs = json.loads(raw)
+                print(f"[Cache] ✅ Loaded {len(docs)} '{city}' doctors from {path}")
+                return docs, {"version": _snapshot_version(raw), "path": path, "mtime": mtime}
+            except Exception as e:
+                print(f"[Cache] ⚠️ Could not read cache file: {e}")
+    return None, None
+
+def _load_from_disk(city=DEFAULT_CITY):
+    return _read_cache(city)[0]
+
+# ── Fetch one city's docs via REST (no auth) ──────────────
+def _fetch_collection(path, timeout_sec, deadline):
+    url = f"{FIRESTORE_BASE}/{path}"
     all_docs, page_tok = [], None
 
-    print("[Firestore] Fetching via REST...")
+    print(f"[Firestore] Fetching {path} via REST...")
 
     while True:
         params = {"pageSize": 300}
         if page_tok:
             params["pageToken"] = page_tok
 
+        if deadline:
+            deadline.check("Firestore page")   # partial snapshots must not be cached
+
         try:
-            resp = requests.get(url, params=params, timeout=timeout_sec)
+            resp = requests.get(url, params=params, timeout=timeout_for(deadline, timeout_sec))
+        except requests.exceptions.Timeout:
+            if deadline and deadline.expired():
+                raise DeadlineExceeded("Firestore page")
+            print("[Firestore] ❌ Request timed out")
+            break
         except Exception as e:
             print(f"[Firestore] ❌ Request error: {e}")
             break
@@ -111,47 +364,169 @@ def _fetch_all_docs(timeout_sec=15):
         if not page_tok:
             break
 
-    print(f"[Firestore] ✅ Loaded {len(all_docs)} doctors")
+    print(f"[Firestore] ✅ Loaded {len(all_docs)} doctors from {path}")
     return all_docs
 
+def _run_query(parent, collection, filters, limit, timeout_sec, deadline):
+    """
+    One runQuery call: AND of (field, op, string value) filters, only the
+    COLD_FIELDS, at most `limit` docs. None on any error.
+    """
+    clauses = [{"fieldFilter": {"field": {"fieldPath": f}, "op": op, "value": {"stringValue": v}}}
+               for f, op, v in filters]
+    query = {
+        "from"  : [{"collectionId": collection}],
+        "select": {"fields": [{"fieldPath": f} for f in COLD_FIELDS]},
+        "where" : clauses[0] if len(clauses) == 1 else
+                  {"compositeFilter": {"op": "AND", "filters": clauses}},
+        "limit" : limit,
+    }
+    url = f"{FIRESTORE_BASE}/{parent}:runQuery" if parent else f"{FIRESTORE_BASE}:runQuery"
+    if deadline:
+        deadline.check("Firestore query")
+    try:
+        resp = requests.post(url, json={"structuredQuery": query},
+                             timeout=timeout_for(deadline, timeout_sec))
+    except requests.exceptions.Timeout:
+        if deadline and deadline.expired():
+            raise DeadlineExceeded("Firestore query")
+        print("[Firestore] ❌ Query timed out")
+        return None
+    except Exception as e:
+        print(f"[Firestore] ❌ Query error: {e}")
+        return None
+    if resp.status_code != 200:
+        print(f"[Firestore] ❌ Query HTTP {resp.status_code}: {resp.text[:200]}")
+        return None
+    # One entry per result; an entry without "document" only carries readTime
+    return [_parse_doc(r["document"]) for r in resp.json() if "document" in r]
+
+def _cold_query(city, kw, limit, deadline, timeout_sec=8):
+    """Doctors for one specialty straight from Firestore, without loading the city."""
+    key = (city, kw, limit)
+    if key in _cold:
+        return _cold[key]
+    parent = f"cities/{city}"
+    docs   = (_run_query(parent, "doctors", [("specialties", "ARRAY_CONTAINS", kw)],
+                         COLD_QUERY_LIMIT, timeout_sec, deadline)
+              # documents uploaded before the specialties array existed
+              or _run_query(parent, "doctors", [("specialization", "EQUAL", kw)],
+                            COLD_QUERY_LIMIT, timeout_sec, deadline))
+    if not docs and city == LEGACY_CITY:
+        docs = _run_query("", "doctors", [("specialization", "EQUAL", kw), ("city", "EQUAL", city)],
+                          COLD_QUERY_LIMIT, timeout_sec, deadline)
+    result = _prioritize([_fmt(d) for d in docs or []], limit)
+    print(f"[Firestore] '{kw}' in '{city}' → {len(result)} from cold query")
+    if docs is not None:
+        _cold[key] = result
+    return result
+
+def _fetch_all_docs(timeout_sec=15, deadline=None, city=DEFAULT_CITY):
+    if not PROJECT_ID:
+        print("[Firestore] ❌ No FIREBASE_PROJECT_ID set")
+        return []
+
+    docs = _fetch_collection(_collection_path(city), timeout_sec, deadline)
+    if not docs and city == LEGACY_CITY:
+        # Karachi data predates the per-city layout
+        docs = _fetch_collection("doctors", timeout_sec, deadline)
+    return docs
+
 # ── Warm up ───────────────────────────────────────────────
-def warm_up():
+def warm_up(cities=None):
     print("[Firestore] 🔥 Warming up...")
 
-    docs = _load_from_disk()
+    for city in cities or [DEFAULT_CITY]:
+        city = normalize_city(city)
+        docs, source = _read_cache(city)
+
+        if not docs:
+            print(f"[Cache] No local cache for '{city}' — fetching from Firestore...")
+            docs = _fetch_all_docs(city=city)
+            if docs:
+                source = _save_to_disk(docs, city)
 
-    if not docs:
-        print("[Cache] No local cache — fetching from Firestore...")
-        docs = _fetch_all_docs()
         if docs:
-            _save_to_disk(docs)
+            _shards[city] = _build_shard(docs, city, source)
+            print(f"[Firestore] ✅ Ready — {len(docs)} '{city}' doctors in memory")
+        else:
+            print(f"[Firestore] ⚠️ Warm-up failed for '{city}'")
 
-    if docs:
-        _set_cache("all_doctors", docs)
-        print(f"[Firestore] ✅ Ready — {len(docs)} doctors in memory")
-    else:
-        print("[Firestore] ⚠️ Warm-up failed")
+def shard_status() -> dict:
+    return {
+        city: {"version": s["version"], "source": s["source"], "doctors": len(s["docs"]),
+               "hospitals_located": len(s["geo"]), "loaded_at": int(s["loaded_at"]),
+               "idle_sec": int(time.time() - s["last_used"])}
+        for city, s in list(_shards.items())
+    }
 
 # ── Query ─────────────────────────────────────────────────
-def get_doctors_by_specialization(specialization, city="karachi", limit=5):
-    all_docs = _get_cache("all_doctors")
+def _matching_positions(shard, kw):
+    return sorted(i for spec, idxs in shard["by_spec"].items() if kw in spec for i in idxs)
+
+def _near_index(shard, kw):
+    """(GridIndex over located hospitals, [doc positions per hospital], unlocated positions)."""
+    near = shard["near"].get(kw)
+    if near is None:
+        geo, docs = shard["geo"], shard["docs"]
+        grid, at_point, point_of, unlocated = GridIndex(), [], {}, []
+        for i in _matching_positions(shard, kw):
+            loc = geo.get(str(docs[i].get("hospital_name", "")).strip().lower())
+            if loc is None:
+                unlocated.append(i)
+                continue
+            if loc not in point_of:
+                point_of[loc] = grid.add(*loc)
+                at_point.append([])
+            at_point[point_of[loc]].append(i)
+        near = shard["near"][kw] = (grid, at_point, unlocated)
+    return near
+
+def _nearest_doctors(shard, kw, lat, lng, limit):
+    grid, at_point, unlocated = _near_index(shard, kw)
+    docs = shard["docs"]
+    # Every hospital has at least one doctor, so the `limit` nearest
+    # hospitals always hold the `limit` nearest doctors.
+    ranked = []
+    for dist, p in grid.nearest(lat, lng, k=limit):
+        for d in _prioritize([_fmt(docs[i]) for i in at_point[p]], limit):
+            ranked.append({**d, "distance_km": round(dist, 2)})
+    ranked = ranked[:limit]
+    if len(ranked) < limit:
+        ranked += _prioritize([_fmt(docs[i]) for i in unlocated], limit - len(ranked))
+    return ranked
+
+def get_doctors_by_specialization(specialization, city="karachi", limit=5, deadline=None,
+                                  lat=None, lng=None):
+    city = normalize_city(city)
+    kw = specialization.lower().strip()
+    try:
+        shard = _get_shard(city, deadline)
+        # Also while a failed background load waits LOAD_RETRY_SEC to retry
+        if shard is None and city in _shard_locks and COLD_QUERY and PROJECT_ID:
+            return _cold_query(city, kw, limit, deadline)
+    except DeadlineExceeded:
+        return []   # degraded: answer without a doctor list
+    if shard is None:
+        return []
 
-    if all_docs is None:
-        all_docs = _load_from_disk() or _fetch_all_docs()
-        if all_docs:
-            _set_cache("all_doctors", all_docs)
-        else:
-            return []
+    if lat is not None and lng is not None and shard["geo"]:
+        result = _nearest_doctors(shard, kw, lat, lng, limit)
+        print(f"[Firestore] '{kw}' in '{city}' near ({lat:.4f}, {lng:.4f}) → {len(result)} ranked")
+        return result
 
-    kw = specialization.lower().strip()
+    key = (kw, limit)
+    if key in shard["queries"]:
+        return shard["queries"][key]
+
+    docs    = shard["docs"]
+    matched = [_fmt(docs[i]) for i in _matching_positions(shard, kw)]
 
-    matched = [
-        _fmt(d) for d in all_docs
-        if kw in str(d.get("specialization","")).lower()
-    ]
+    print(f"[Firestore] '{kw}' in '{city}' → {len(matched)} matched")
+    result = shard["queries"][key] = _prioritize(matched, limit)
+    return result
 
-    print(f"[Firestore] '{kw}' → {len(matched)} matched")
-    return _prioritize(matched, limit)
+COLD_FIELDS = ("name", "hospital_name", "specialization", "phone", "pmdc", "city")   # what _fmt reads
 
 def _fmt(d):
     return {
@@ -168,8 +543,9 @@ def _prioritize(doctors, limit):
     without_phone = [d for d in doctors if not d.get("phone")]
     return (with_phone + without_phone)[:limit]
 
-def get_all_specializations():
-    all_docs = _load_from_disk() or _fetch_all_docs()
+def get_all_specializations(city=DEFAULT_CITY):
+    city     = normalize_city(city)
+    all_docs = _load_from_disk(city) or _fetch_all_docs(city=city)
     return sorted({
         str(d.get("specialization","")).strip()
         for d in all_docs
@@ -0,0 +1,150 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — geo_index.py
+  Small pure-Python spatial index (uniform lat/lng grid)
+  1. haversine_km()        → great-circle distance in km
+  2. GridIndex.within()    → all points inside a radius
+  3. GridIndex.nearest()   → k nearest points
+  Serialisable to plain JSON so it can live on disk next
+  to the other caches (doctors_cache.json etc.)
+============================================================
+"""
+
+import math
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEG_LAT  = 111.32
+DEFAULT_CELL_DEG = 0.02   # ≈ 2.2 km — a few hundred facilities per cell at most
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) ** 2
+         + math.cos(math.radians(lat1))
+         * math.cos(math.radians(lat2))
+         * math.sin(dlon / 2) ** 2)
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+class GridIndex:
+    """
+    Buckets points into square lat/lng cells. Radius and k-nearest
+    queries only look at the cells around the query point, so cost
+    depends on local density rather than on the total point count.
+    """
+
+    def __init__(self, points=None, cell_deg=DEFAULT_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.points   = []     # [(lat, lng), ...] — position == payload index
+        self.cells    = {}     # (i, j) → [point index, ...]
+        self._bounds  = None   # [min_i, max_i, min_j, max_j] of occupied cells
+        for lat, lng in points or []:
+            self.add(lat, lng)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def add(self, lat, lng):
+        idx  = len(self.points)
+        cell = self._cell(lat, lng)
+        self.points.append((lat, lng))
+        self.cells.setdefault(cell, []).append(idx)
+        if self._bounds is None:
+            self._bounds = [cell[0], cell[0], cell[1], cell[1]]
+        else:
+            b = self._bounds
+            b[0], b[1] = min(b[0], cell[0]), max(b[1], cell[0])
+            b[2], b[3] = min(b[2], cell[1]), max(b[3], cell[1])
+        return idx
+
+    # ── Queries ───────────────────────────────────────────
+    def _ring(self, ci, cj, r):
+        if r == 0:
+            yield (ci, cj)
+            return
+        for i in range(ci - r, ci + r + 1):
+            yield (i, cj - r)
+            yield (i, cj + r)
+        for j in range(cj - r + 1, cj + r):
+            yield (ci - r, j)
+            yield (ci + r, j)
+
+    def _ring_min_km(self, lat, r):
+        # Lower bound on the distance to any point in ring r (or beyond).
+        if r == 0:
+            return 0.0
+        km_per_deg_lng = KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01)
+        return (r - 1) * self.cell_deg * min(KM_PER_DEG_LAT, km_per_deg_lng)
+
+    def within(self, lat, lng, radius_km):
+        """Returns [(distance_km, index), ...] sorted by distance."""
+        if not self.points:
+            return []
+        ci, cj = self._cell(lat, lng)
+        found, r = [], 0
+        while self._ring_min_km(lat, r) <= radius_km:
+            for cell in self._ring(ci, cj, r):
+                for idx in self.cells.get(cell, ()):
+                    p_lat, p_lng = self.points[idx]
+                    d = haversine_km(lat, lng, p_lat, p_lng)
+                    if d <= radius_km:
+                        found.append((d, idx))
+            r += 1
+            if r > self._max_ring(ci, cj):
+                break
+        found.sort()
+        return found
+
+    def nearest(self, lat, lng, k=5, max_km=None, accept=None):
+        """
+        Returns up to k [(distance_km, index), ...] sorted by distance.
+        `accept(index)` can reject points (e.g. facilities without an ER).
+        """
+        if not self.points or k <= 0:
+            return []
+        ci, cj = self._cell(lat, lng)
+        found, r, limit = [], 0, self._max_ring(ci, cj)
+        while r <= limit:
+            ring_min = self._ring_min_km(lat, r)
+            if max_km is not None and ring_min > max_km:
+                break
+            if len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= ring_min:
+                    break
+            for cell in self._ring(ci, cj, r):
+                for idx in self.cells.get(cell, ()):
+                    if accept is not None and not accept(idx):
+                        continue
+                    p_lat, p_lng = self.points[idx]
+                    d = haversine_km(lat, lng, p_lat, p_lng)
+                    if max_km is None or d <= max_km:
+                        found.append((d, idx))
+            r += 1
+        found.sort()
+        return found[:k]
+
+    def _max_ring(self, ci, cj):
+        # Furthest ring that can still contain an occupied cell.
+        if self._bounds is None:
+            return 0
+        min_i, max_i, min_j, max_j = self._bounds
+        return max(abs(min_i - ci), abs(max_i - ci), abs(min_j - cj), abs(max_j - cj))
+
+    # ── (De)serialisation ─────────────────────────────────
+    def to_dict(self):
+        return {
+            "cell_deg": self.cell_deg,
+            "points"  : [[round(lat, 7), round(lng, 7)] for lat, lng in self.points],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            points   = [tuple(p) for p in data.get("points", [])],
+            cell_deg = data.get("cell_deg", DEFAULT_CELL_DEG),
+        )
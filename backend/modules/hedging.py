@@ -0,0 +1,195 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — hedging.py
+  Hedged Groq → Ollama generation for interactive chats
+  1. race()        → runs the primary provider; if it has not
+                     produced any output after hedge_delay(),
+                     starts the backup in parallel. First
+                     non-empty reply wins, the other one is
+                     told to stop (cancel event)
+  2. hedge_delay() → HEDGE_PERCENTILE of recent Groq
+                     time-to-first-output
+  3. stats()       → hedges fired / won / skipped and served
+                     vs Groq-only p50/p99, for GET /api/health
+  LLM_HEDGING=1 turns it on. HEDGE_MAX_RATE caps the share
+  of calls that may start a second provider.
+  All state is per worker process.
+============================================================
+"""
+
+import os, queue, threading, time
+from collections import deque
+
+HEDGING_ENABLED     = os.getenv("LLM_HEDGING", "0") == "1"
+HEDGE_PERCENTILE    = float(os.getenv("HEDGE_PERCENTILE",     "95"))
+HEDGE_MAX_RATE      = float(os.getenv("HEDGE_MAX_RATE",       "0.1"))
+HEDGE_MIN_DELAY_SEC = float(os.getenv("HEDGE_MIN_DELAY_SEC",  "0.5"))
+HEDGE_INITIAL_DELAY = float(os.getenv("HEDGE_INITIAL_DELAY_SEC", "2.0"))
+MIN_SAMPLES         = 20     # below this, HEDGE_INITIAL_DELAY is used
+WINDOW              = 200    # calls / samples kept for percentiles and the rate cap
+NO_HEDGE_CLASSES    = {"batch"}   # offline jobs can wait for Groq
+
+_lock      = threading.Lock()
+_ttfo      = deque(maxlen=WINDOW)   # Groq seconds to first output
+_groq_ms   = deque(maxlen=WINDOW)   # Groq full-reply latency (estimated when it lost)
+_tail      = deque(maxlen=WINDOW)   # Groq seconds from first output to done
+_served_ms = deque(maxlen=WINDOW)   # what the caller actually waited
+_hedged    = deque(maxlen=WINDOW)   # per call: did it start the backup?
+_stats     = {"calls": 0, "hedges_fired": 0, "hedges_won": 0, "skipped_rate_cap": 0,
+              "skipped_budget": 0, "primary_failed": 0}
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def enabled_for(priority) -> bool:
+    return HEDGING_ENABLED and priority not in NO_HEDGE_CLASSES
+
+
+def hedge_delay() -> float:
+    with _lock:
+        if len(_ttfo) < MIN_SAMPLES:
+            return HEDGE_INITIAL_DELAY
+        return max(HEDGE_MIN_DELAY_SEC, _percentile(_ttfo, HEDGE_PERCENTILE))
+
+
+def _rate_allows():
+    with _lock:
+        return sum(_hedged) < HEDGE_MAX_RATE * max(len(_hedged), MIN_SAMPLES)
+
+
+def _note_primary(t0, first, done, text, cancelled):
+    """
+    Groq's own latency for the "without hedging" comparison — also for calls
+    it lost: a reply cancelled mid-stream counts as first output + median
+    tail, one cancelled before any output as what it had waited by then.
+    """
+    with _lock:
+        if first is not None:
+            _ttfo.append(first - t0)
+        if text:
+            _tail.append(done - first if first is not None else 0.0)
+            _groq_ms.append((done - t0) * 1000)
+        elif cancelled and first is not None:
+            _groq_ms.append((first - t0 + (_percentile(_tail, 50) or 0.0)) * 1000)
+        elif cancelled:
+            _groq_ms.append((done - t0) * 1000)
+
+
+def race(primary, backup, deadline=None, min_backup_sec=0.0):
+    """
+    primary / backup: fn(on_first, cancel) → reply text or None. on_first()
+    is called once the provider has output; cancel is a threading.Event the
+    provider checks between chunks (a request still waiting for its first
+    byte runs on in its daemon thread until the provider timeout, and its
+    reply is dropped). A primary that fails outright falls back to the
+    backup as before. Returns (reply, "primary" | "backup" | None).
+    """
+    t0, events = time.perf_counter(), queue.Queue()
+    cancels    = {"primary": threading.Event(), "backup": threading.Event()}
+    first_at   = {}
+
+    def _run(name, fn):
+        def on_first():
+            if name not in first_at:
+                first_at[name] = time.perf_counter()
+                events.put(("first", name, None))
+        try:
+            text = fn(on_first, cancels[name])
+        except Exception as e:
+            print(f"[Hedge] ❌ {name}: {e}")
+            text = None
+        if name == "primary":
+            _note_primary(t0, first_at.get(name), time.perf_counter(), text, cancels[name].is_set())
+        events.put(("done", name, text))
+
+    def _start(name):
+        threading.Thread(target=_run, args=(name, primary if name == "primary" else backup),
+                         daemon=True).start()
+        running.add(name)
+
+    def _no_budget():
+        return deadline is not None and deadline.remaining() < min_backup_sec
+
+    running, hedge = set(), "pending"   # pending | fired | skipped | fallback
+    _start("primary")
+    hedge_at  = t0 + hedge_delay()
+    winner    = reply = None
+
+    while running:
+        timeout = deadline.remaining() if deadline else None
+        if hedge == "pending" and "primary" not in first_at:
+            wait    = max(0.0, hedge_at - time.perf_counter())
+            timeout = wait if timeout is None else min(timeout, wait)
+        try:
+            kind, name, text = events.get(timeout=timeout)
+        except queue.Empty:
+            if deadline and deadline.expired():
+                break
+            # Primary silent past the hedge delay → start the backup if allowed
+            if _no_budget() or not _rate_allows():
+                with _lock:
+                    _stats["skipped_budget" if _no_budget() else "skipped_rate_cap"] += 1
+                hedge = "skipped"
+                continue
+            print(f"[Hedge] 🔀 No Groq output after {time.perf_counter() - t0:.1f}s — starting Ollama")
+            hedge = "fired"
+            _start("backup")
+            continue
+
+        if kind == "first":
+            continue
+
+        running.discard(name)
+        if text:
+            winner, reply = name, text
+            break
+        if name == "primary" and not running:
+            # Outright failure before any hedge: plain sequential fallback
+            with _lock:
+                _stats["primary_failed"] += 1
+            if _no_budget():
+                print("[Fallback] ⏱️ Not enough budget left for Ollama")
+                break
+            print("[Fallback] 🔄 Switching to Ollama...")
+            hedge = "fallback"
+            _start("backup")
+
+    for other in running:
+        cancels[other].set()
+    elapsed = time.perf_counter() - t0
+    if winner == "backup" and hedge == "fired":
+        print("[Hedge] 🏁 Ollama finished first — Groq cancelled")
+
+    with _lock:
+        _stats["calls"] += 1
+        _hedged.append(hedge == "fired")
+        _served_ms.append(elapsed * 1000)
+        if hedge == "fired":
+            _stats["hedges_fired"] += 1
+            _stats["hedges_won"]   += int(winner == "backup")
+    return reply, winner
+
+
+def stats() -> dict:
+    with _lock:
+        served = list(_served_ms)
+        groq   = list(_groq_ms)
+        out    = {
+            **_stats,
+            "enabled"        : HEDGING_ENABLED,
+            "hedge_rate"     : round(sum(_hedged) / len(_hedged), 3) if _hedged else 0.0,
+            "max_rate"       : HEDGE_MAX_RATE,
+        }
+    out["current_delay_s"] = round(hedge_delay(), 2)
+    for label, values in (("served", served), ("groq", groq)):
+        for pct in (50, 99):
+            v = _percentile(values, pct)
+            out[f"{label}_p{pct}_ms"] = round(v) if v is not None else None
+    if out["served_p99_ms"] is not None and out["groq_p99_ms"] is not None:
+        out["p99_improvement_ms"] = out["groq_p99_ms"] - out["served_p99_ms"]
+    return out
@@ -0,0 +1,171 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — hospital_geo.py
+  Offline geocoding of doctor hospitals against the local
+  OSM facility index (osm_facilities_index.json)
+  1. geocode_hospitals() → hospital_name → (lat, lng) by
+                           weighted word match, written to
+                           hospital_geo_<city>.json
+  2. load_hospital_geo() → read back by firestore_service
+                           when a city shard is built
+============================================================
+"""
+
+import difflib, json, math, os, re, time
+
+GEO_FILE        = os.getenv("HOSPITAL_GEO_FILE", "hospital_geo_{city}.json")
+MATCH_THRESHOLD = float(os.getenv("HOSPITAL_MATCH_THRESHOLD", "0.8"))
+
+# Words every second facility has — they say nothing about *which* hospital
+GENERIC_WORDS = {
+    "hospital", "hospitals", "clinic", "clinics", "medical", "center", "centre",
+    "complex", "care", "health", "healthcare", "the", "and", "of", "pvt", "ltd",
+    "private", "limited", "trust", "karachi", "lahore", "islamabad", "rawalpindi",
+    "pakistan", "road", "block", "sector",
+}
+UNMATCHABLE = {"", "clinic not specified", "n/a", "none", "nan"}
+
+
+def _words(name) -> list:
+    name  = re.sub(r"\([^)]*\)", " ", str(name).lower())   # "(nicvd)" acronyms — OSM rarely has them
+    words = re.sub(r"[^a-z0-9 ]+", " ", name).split()
+    out = []
+    for w in words:
+        if w in GENERIC_WORDS or len(w) < 2:
+            continue
+        w = re.sub(r"(?<=[bdgjkpt])h", "", w)            # agha/aga, khan/kan
+        if len(w) > 4 and w.endswith("s"):              # diseases/disease
+            w = w[:-1]
+        out.append(w)
+    return out
+
+
+def name_tokens(name) -> frozenset:
+    return frozenset(_words(name))
+
+
+def _align(words, other: frozenset) -> list:
+    """
+    Rewrites `words` towards the spelling used in `other`: merges split
+    words ("shah faisal" → "shahfaisal") and maps near-identical long
+    words ("garduate" → "graduate").
+    """
+    def spelled(w):
+        if w in other or len(w) < 6:
+            return w
+        close = difflib.get_close_matches(w, other, n=1, cutoff=0.85)
+        return close[0] if close else w
+
+    out, i = [], 0
+    while i < len(words):
+        if i + 1 < len(words) and words[i] not in other and words[i + 1] not in other:
+            joined = spelled(words[i] + words[i + 1])
+            if joined in other:
+                out.append(joined)
+                i += 2
+                continue
+        out.append(spelled(words[i]))
+        i += 1
+    return out
+
+
+def _containment(name_words, fac_words, weight) -> float:
+    """
+    Weighted share of the facility's distinctive words found in the
+    doctor's hospital name. Dataset names are "<facility> <area> karachi
+    (<acronym>)", so extra words on the doctor side are expected; the
+    name's first word must still be part of the facility name, which
+    keeps "south city hospital" away from "City Clinic". One-word
+    facilities ("Civil Hospital") must also cover most of the name, so
+    "civil aviation authority hospital" does not land on them.
+    """
+    fac_set = frozenset(fac_words)
+    if not name_words or not fac_set or name_words[0] not in fac_set:
+        return 0.0
+    name_set = frozenset(name_words)
+    shared   = fac_set & name_set
+    if len(fac_set) == 1 and weight(name_words[0]) < 0.5 * sum(map(weight, name_set)):
+        return 0.0
+    return sum(map(weight, shared)) / sum(map(weight, fac_set))
+
+
+def geocode_hospitals(hospital_names, facilities, threshold=MATCH_THRESHOLD) -> dict:
+    """
+    Returns {hospital_name: {"lat", "lng", "osm_id", "osm_name", "score"}}
+    for every name with a facility scoring at least `threshold`.
+    Candidates come from a word → facility inverted index, so each name
+    is only compared with facilities that share a distinctive word.
+    """
+    names = sorted({str(n).strip().lower() for n in hospital_names} - UNMATCHABLE)
+    names = [n for n in names if "not provided" not in n]
+
+    fac_words = [_words(fac["name"]) for fac in facilities]
+    by_word   = {}
+    for i, words in enumerate(fac_words):
+        for w in words:
+            by_word.setdefault(w, []).append(i)
+    vocab = frozenset(by_word)
+
+    # Word weights (IDF) over both name lists — "national" counts for less than "nicvd"
+    doc_freq = {}
+    for words in [_words(n) for n in names] + fac_words:
+        for w in set(words):
+            doc_freq[w] = doc_freq.get(w, 0) + 1
+    total  = len(names) + len(fac_words)
+    weight = lambda w: math.log(1 + total / doc_freq.get(w, 1))
+
+    matched = {}
+    for name in names:
+        words = _align(_words(name), vocab)
+        best, best_score = None, 0.0
+        for i in {i for w in words for i in by_word.get(w, ())}:
+            score = _containment(words, fac_words[i], weight)
+            # Prefer actual hospitals over a same-named clinic/pharmacy
+            if score > best_score or (score == best_score and best is not None
+                                      and facilities[i].get("kind") == "hospital"
+                                      and facilities[best].get("kind") != "hospital"):
+                best, best_score = i, score
+        if best is not None and best_score >= threshold:
+            fac = facilities[best]
+            matched[name] = {
+                "lat"     : fac["lat"],
+                "lng"     : fac["lng"],
+                "osm_id"  : fac["id"],
+                "osm_name": fac["name"],
+                "score"   : round(best_score, 3),
+            }
+    return matched
+
+
+def geo_file(city) -> str:
+    return GEO_FILE.format(city=city.replace(" ", "_"))
+
+
+def save_hospital_geo(city, matched, total):
+    path = geo_file(city)
+    payload = {
+        "city"      : city,
+        "built_at"  : int(time.time()),
+        "hospitals" : total,
+        "matched"   : len(matched),
+        "locations" : matched,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+    print(f"[Geo] ✅ {city}: {len(matched)}/{total} hospitals located → {path}")
+
+
+def load_hospital_geo(city) -> dict:
+    """hospital_name (lowercase) → (lat, lng); empty when not geocoded yet."""
+    path = geo_file(city)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[Geo] ⚠️ Could not read {path}: {e}")
+        return {}
+    return {name: (loc["lat"], loc["lng"]) for name, loc in data.get("locations", {}).items()}
@@ -0,0 +1,204 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — intent_classifier.py
+  Optional offline intent / specialty classifier
+  Hashed word + character n-grams → linear model (NumPy)
+  1. featurize()          → (n, dim) matrix for a batch
+  2. IntentClassifier     → one matrix multiply per head:
+       "intent"    general / specialist / emotional / general_chat
+       "specialty" user-mode specialties (SPECIALIST_KEYWORDS)
+       "clinical"  doctor-mode specialties (CLINICAL_SPECIALTY_MAP)
+  3. detect_intent() / detect_clinical_specialty()
+                          → same shape as intent_detector.py,
+                            plus ranked labels with confidences
+  Trained by train_intent_classifier.py, compared with the
+  keyword rules by bench_intent_classifier.py.
+  INTENT_CLASSIFIER=intent_model.npz turns it on in app.py.
+  NumPy is imported on first use, so app.py runs without it
+  when no classifier is configured.
+============================================================
+"""
+
+import math, os, re, zlib
+from collections import Counter
+
+from modules.intent_detector import EMOTION_MAP
+from modules import memdiag
+
+MODEL_FILE     = os.getenv("INTENT_CLASSIFIER", "")
+MIN_CONFIDENCE = float(os.getenv("INTENT_MIN_CONFIDENCE", "0.55"))
+DEFAULT_DIM    = 2 ** 14
+NONE_LABEL     = "none"
+BATCH_ROWS     = 512    # rows per featurize/matmul block — bounds memory for big batches
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+np       = None   # numpy, set by _numpy()
+
+
+def _numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+# ── Features ──────────────────────────────────────────────
+def _features(text):
+    words = _WORD_RE.findall(text.lower())
+    feats = [f"w:{w}" for w in words]
+    feats += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        for n in (3, 4, 5):
+            feats += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+    return feats
+
+
+_hash_cache = {}
+HASH_CACHE_MAX = 200_000
+memdiag.track("intent_hash_cache", lambda: _hash_cache)
+
+
+def _hash(feat):
+    # crc32 rather than hash(): stable across processes and Python versions
+    h = _hash_cache.get(feat)
+    if h is None:
+        if len(_hash_cache) >= HASH_CACHE_MAX:
+            _hash_cache.clear()
+        h = _hash_cache[feat] = zlib.crc32(feat.encode("utf-8"))
+    return h
+
+
+def featurize(messages, dim=DEFAULT_DIM):
+    """L2-normalised hashed n-gram counts, one row per message."""
+    _numpy()
+    X = np.zeros((len(messages), dim), dtype=np.float32)
+    for row, text in enumerate(messages):
+        counts = Counter(_hash(f) % dim for f in _features(text))
+        if counts:
+            norm = math.sqrt(sum(c * c for c in counts.values()))
+            X[row, list(counts)] = [c / norm for c in counts.values()]
+    return X
+
+
+def softmax(z):
+    _numpy()
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+# ── Model ─────────────────────────────────────────────────
+class IntentClassifier:
+    """
+    heads: {name: {"labels": [str], "W": (dim, L) float32, "b": (L,) float32}}
+    Saved as one .npz: "dim", "<head>__W", "<head>__b", "<head>__labels".
+    """
+
+    def __init__(self, heads: dict, dim=DEFAULT_DIM):
+        _numpy()
+        self.dim   = dim
+        self.heads = heads
+
+    @classmethod
+    def load(cls, path):
+        _numpy()
+        with np.load(path, allow_pickle=False) as data:
+            dim   = int(data["dim"])
+            names = {k.split("__")[0] for k in data.files if "__" in k}
+            heads = {
+                name: {
+                    "labels": [str(l) for l in data[f"{name}__labels"]],
+                    "W"     : data[f"{name}__W"].astype(np.float32),
+                    "b"     : data[f"{name}__b"].astype(np.float32),
+                }
+                for name in names
+            }
+        return cls(heads, dim)
+
+    def save(self, path):
+        arrays = {"dim": np.array(self.dim)}
+        for name, h in self.heads.items():
+            arrays[f"{name}__W"]      = h["W"]
+            arrays[f"{name}__b"]      = h["b"]
+            arrays[f"{name}__labels"] = np.array(h["labels"])
+        np.savez_compressed(path, **arrays)
+
+    def predict_proba(self, messages, *heads) -> dict:
+        """
+        {head: (n, labels) probabilities}. Messages are featurized once per
+        block of BATCH_ROWS and each head is a single X @ W on that block.
+        """
+        out = {h: np.empty((len(messages), len(self.heads[h]["labels"])), dtype=np.float32)
+               for h in heads}
+        for start in range(0, len(messages), BATCH_ROWS):
+            X = featurize(messages[start:start + BATCH_ROWS], self.dim)
+            for name in heads:
+                h = self.heads[name]
+                out[name][start:start + len(X)] = softmax(X @ h["W"] + h["b"])
+        return out
+
+    def _ranked(self, probs, head, k):
+        labels = self.heads[head]["labels"]
+        top    = np.argsort(-probs, axis=1)[:, :k]
+        return [[(labels[j], round(float(probs[i, j]), 3)) for j in row] for i, row in enumerate(top)]
+
+    def rank(self, messages, head: str, k=3):
+        """[[(label, confidence), ...] best first] per message."""
+        return self._ranked(self.predict_proba(messages, head)[head], head, k)
+
+    # ── Drop-in replacements for intent_detector ──────────
+    def detect_intent_batch(self, messages):
+        probs   = self.predict_proba(messages, "intent", "specialty")
+        intents = self._ranked(probs["intent"], "intent", 2)
+        specs   = self._ranked(probs["specialty"], "specialty", 3)
+        results = []
+        for msg, intent, spec in zip(messages, intents, specs):
+            kind, conf = intent[0]
+            ranked     = [(s, c) for s, c in spec if s != NONE_LABEL]
+            top_spec   = spec[0][0] if spec[0][0] != NONE_LABEL else None
+            if kind == "specialist" and top_spec is None:
+                top_spec = "general practitioner (gp)"
+            emotion = _emotion(msg) if kind == "emotional" else None
+            results.append({
+                "type"                 : kind,
+                "specialization"       : None if kind == "general_chat" else top_spec,
+                "emotion"              : emotion,
+                "confidence"           : conf,
+                "specialty_confidence" : spec[0][1],
+                "ranked"               : ranked,
+            })
+        return results
+
+    def detect_intent(self, message):
+        return self.detect_intent_batch([message])[0]
+
+    def detect_clinical_specialty_batch(self, messages):
+        return [r[0][0] if r[0][0] != NONE_LABEL else None
+                for r in self.rank(messages, "clinical", k=1)]
+
+    def detect_clinical_specialty(self, message):
+        return self.detect_clinical_specialty_batch([message])[0]
+
+
+def _emotion(msg):
+    msg = msg.lower()
+    for emotion, keywords in EMOTION_MAP.items():
+        if any(kw in msg for kw in keywords):
+            return emotion
+    return "stressed"
+
+
+# ── Optional app integration ──────────────────────────────
+def load_configured():
+    """The model named by INTENT_CLASSIFIER, or None (keyword rules are used)."""
+    if not MODEL_FILE:
+        return None
+    try:
+        model = IntentClassifier.load(MODEL_FILE)
+    except Exception as e:
+        print(f"[Intent] ⚠️ Could not load classifier {MODEL_FILE}: {e} — using keyword rules")
+        return None
+    print(f"[Intent] ✅ Classifier loaded from {MODEL_FILE} (heads: {', '.join(sorted(model.heads))})")
+    return model
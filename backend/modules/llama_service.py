@@ -7,18 +7,31 @@
 """
 
 import os
+import json
+import time
 import requests
+from functools import partial
 from groq import Groq
 from dotenv import load_dotenv
 from pathlib import Path
+from modules.llm_scheduler import llm_slot
+from modules.deadline import timeout_for, DeadlineExceeded
+from modules.usage import CallUsage
+from modules.prompt_profiles import select_profile, trim_history
+from modules import hedging, ollama_warm, cascade
+from modules.profiling import note
 
 env_path = Path(__file__).resolve().parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_MODEL   = "llama-3.1-8b-instant"
+GROQ_TIMEOUT = 60
 OLLAMA_URL   = "http://localhost:11434/api/generate"
 OLLAMA_MODEL = "llama3"
+OLLAMA_TIMEOUT     = 120
+MIN_FALLBACK_SEC   = 3   # not worth starting Ollama with less budget than this
+OLLAMA_MODELS      = [m for m in (cascade.SMALL_MODEL, OLLAMA_MODEL) if m]   # kept warm by ollama_warm
 
 groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
 
@@ -198,26 +211,93 @@ IMPORTANT BOUNDARIES:
 """
 
 
-def _call_groq(system: str, messages: list):
+def _stopped(scanner, provider, parts):
+    print(f"[Safety] ⛔ {provider}: restricted phrase '{scanner.match.strip()}' "
+          f"— generation stopped after {scanner.chars} chars")
+    return "".join(parts).strip()
+
+
+def _record(usage, provider, t0, prompt_tokens, completion_tokens, text):
+    note(provider=provider)
+    if usage is not None:
+        usage.record(provider, prompt_tokens, completion_tokens, text,
+                     (time.perf_counter() - t0) * 1000)
+
+
+def _groq_usage(u):
+    return (u.prompt_tokens, u.completion_tokens) if u is not None else (None, None)
+
+
+def _call_groq(system: str, messages: list, scanner=None, deadline=None, usage=None,
+               max_tokens=700, on_first=None, cancel=None):
     if not groq_client:
         return None
+    t0 = time.perf_counter()
     try:
+        if deadline:
+            deadline.check("Groq")
         full_messages = [{"role": "system", "content": system}] + messages
         response = groq_client.chat.completions.create(
             model       = GROQ_MODEL,
             messages    = full_messages,
             temperature = 0.5,
-            max_tokens  = 700,  # Increased for longer responses
+            max_tokens  = max_tokens,
+            stream      = scanner is not None,
+            timeout     = timeout_for(deadline, GROQ_TIMEOUT),
         )
+        if scanner is None:
+            if on_first:
+                on_first()
+            if cancel is not None and cancel.is_set():
+                return None
+            print("[AI] ✅ Groq responded")
+            text = response.choices[0].message.content.strip()
+            _record(usage, "groq", t0, *_groq_usage(response.usage), text)
+            return text
+
+        # Streaming: scan as tokens arrive, stop paying for a reply we will discard
+        parts, final_usage = [], None
+        for chunk in response:
+            # Usage rides on the last chunk (x_groq.usage; newer APIs: chunk.usage)
+            final_usage = (getattr(chunk, "usage", None)
+                           or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                           or final_usage)
+            if cancel is not None and cancel.is_set():
+                response.close()
+                _record(usage, "groq", t0, None, None, "".join(parts))
+                print("[Groq] ✂️ Cancelled — the other provider answered first")
+                return None
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if on_first and not parts:
+                on_first()
+            parts.append(delta)
+            if scanner.feed(delta):
+                response.close()
+                text = _stopped(scanner, "Groq", parts)
+                _record(usage, "groq", t0, None, None, text)   # no usage chunk after close()
+                return text
+            if deadline and deadline.expired():
+                response.close()
+                deadline.check("Groq stream")
         print("[AI] ✅ Groq responded")
-        return response.choices[0].message.content.strip()
+        text = "".join(parts).strip()
+        _record(usage, "groq", t0, *_groq_usage(final_usage), text)
+        return text
+    except DeadlineExceeded:
+        return None
     except Exception as e:
         print(f"[Groq] ❌ {e}")
         return None
 
 
-def _call_ollama(system: str, messages: list):
+def _call_ollama(system: str, messages: list, scanner=None, deadline=None, usage=None,
+                 max_tokens=600, on_first=None, cancel=None, model=OLLAMA_MODEL):
+    t0 = time.perf_counter()
     try:
+        if deadline:
+            deadline.check("Ollama")
         history_text = ""
         for m in messages[:-1]:
             role = "User" if m["role"] == "user" else "Assistant"
@@ -225,16 +305,60 @@ def _call_ollama(system: str, messages: list):
         last_msg = messages[-1]["content"] if messages else ""
 
         payload = {
-            "model"  : OLLAMA_MODEL,
+            "model"  : model,
             "system" : system,
             "prompt" : f"{history_text}User: {last_msg}",
-            "stream" : False,
-            "options": {"temperature": 0.5, "num_predict": 600, "num_ctx": 2048},  # Increased
+            "stream" : scanner is not None,
+            "options": {"temperature": 0.5, "num_predict": max_tokens, "num_ctx": 2048},
+            "keep_alive": ollama_warm.OLLAMA_KEEP_ALIVE,
         }
-        r = requests.post(OLLAMA_URL, json=payload, timeout=120)
-        if r.status_code == 200:
+        r = requests.post(OLLAMA_URL, json=payload, timeout=timeout_for(deadline, OLLAMA_TIMEOUT),
+                          stream=scanner is not None)
+        if r.status_code != 200:
+            r.close()   # a streamed error body would keep the pooled connection
+            print(f"[Ollama] ❌ HTTP {r.status_code}")
+            return None
+        if scanner is None:
+            if on_first:
+                on_first()
+            if cancel is not None and cancel.is_set():
+                return None
             print("[AI] ✅ Ollama responded")
-            return r.json().get("response", "").strip()
+            data = r.json()
+            text = data.get("response", "").strip()
+            ollama_warm.observe(model, data)
+            _record(usage, "ollama", t0, data.get("prompt_eval_count"), data.get("eval_count"), text)
+            return text
+
+        # Streaming: one JSON object per line; the "done" line carries the counts
+        parts, data = [], {}
+        with r:
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                if cancel is not None and cancel.is_set():
+                    _record(usage, "ollama", t0, None, None, "".join(parts))
+                    print("[Ollama] ✂️ Cancelled — the other provider answered first")
+                    return None
+                data  = json.loads(line)
+                delta = data.get("response", "")
+                if on_first and delta and not any(parts):
+                    on_first()
+                parts.append(delta)
+                if scanner.feed(delta):
+                    text = _stopped(scanner, "Ollama", parts)
+                    _record(usage, "ollama", t0, None, None, text)
+                    return text
+                if deadline:
+                    deadline.check("Ollama stream")
+                if data.get("done"):
+                    break
+        print("[AI] ✅ Ollama responded")
+        text = "".join(parts).strip()
+        ollama_warm.observe(model, data)
+        _record(usage, "ollama", t0, data.get("prompt_eval_count"), data.get("eval_count"), text)
+        return text
+    except DeadlineExceeded:
         return None
     except requests.exceptions.ConnectionError:
         print("[Ollama] ❌ Not running")
@@ -244,33 +368,135 @@ def _call_ollama(system: str, messages: list):
         return None
 
 
-def _call_ai(system: str, messages: list):
-    result = _call_groq(system, messages)
-    if result:
+def _call_local(system: str, messages: list, scanner=None, deadline=None, usage=None,
+                max_tokens=600, on_first=None, cancel=None, complexity=None):
+    """
+    Ollama through the model cascade (modules/cascade.py): a simple query
+    goes to the small model first and is escalated to OLLAMA_MODEL when
+    that reply is empty, too short or unsure. The small attempt scans with
+    its own copy of the scanner so a discarded reply leaves no trace.
+    """
+    if not cascade.enabled() or complexity is None or cascade.choose(complexity) == "large":
+        t0    = time.perf_counter()
+        reply = _call_ollama(system, messages, scanner, deadline, usage, max_tokens, on_first, cancel)
+        if cascade.enabled():
+            cascade.record("large", t0)
+            note(tier="large")
+        return reply
+
+    own    = type(scanner)() if scanner is not None else None
+    t0     = time.perf_counter()
+    reply  = _call_ollama(system, messages, own, deadline, usage, max_tokens, on_first, cancel,
+                          model=cascade.SMALL_MODEL)
+    reason = None if own is not None and own.violated else cascade.insufficient(reply, complexity)
+    cascade.record("small", t0, escalated=reason)
+    if reason is None or (cancel is not None and cancel.is_set()):
+        if scanner is not None:
+            vars(scanner).update(vars(own))
+        note(tier="small")
+        return reply
+    if deadline and deadline.remaining() < MIN_FALLBACK_SEC:
+        print(f"[Cascade] ⏱️ Small-model reply {reason}, no budget to escalate")
+        if scanner is not None:
+            vars(scanner).update(vars(own))
+        return reply
+    print(f"[Cascade] ⬆️ {cascade.SMALL_MODEL} reply {reason} (score {complexity}) — escalating to {OLLAMA_MODEL}")
+    t0    = time.perf_counter()
+    reply = _call_ollama(system, messages, scanner, deadline, usage, max_tokens, on_first, cancel)
+    cascade.record("large", t0)
+    note(tier="large", escalated=reason)
+    return reply
+
+
+def _call_ai(system: str, messages: list, scanner=None, priority="general",
+             is_alive=None, deadline=None, usage=None, max_tokens=None, complexity=None):
+    caps  = {"max_tokens": max_tokens} if max_tokens else {}   # None → provider defaults above
+    local = partial(_call_local, complexity=complexity)
+    # Scheduler orders calls by priority and drops stale/abandoned ones
+    # before they cost any provider time (raises SchedulerRejected).
+    with llm_slot(priority, deadline=deadline.at if deadline else None, is_alive=is_alive):
+        if hedging.enabled_for(priority):
+            return _call_hedged(system, messages, scanner, deadline, usage, caps, local)
+        result = _call_groq(system, messages, scanner, deadline, usage, **caps)
+        if result or (scanner and scanner.violated):
+            return result
+        if deadline and deadline.remaining() < MIN_FALLBACK_SEC:
+            print("[Fallback] ⏱️ Not enough budget left for Ollama")
+            return None
+        print("[Fallback] 🔄 Switching to Ollama...")
+        # Fresh scan state: a phrase must not match across Groq's aborted
+        # text and the Ollama reply; the fallback's state is copied back
+        own    = type(scanner)() if scanner is not None else None
+        result = local(system, messages, own, deadline, usage, **caps)
+        if scanner is not None:
+            vars(scanner).update(vars(own))
         return result
-    print("[Fallback] 🔄 Switching to Ollama...")
-    return _call_ollama(system, messages)
 
 
-def ask_user_mode(message: str, history: list = None, doctor_context: str = "") -> str:
-    history = history or []
+def _call_hedged(system, messages, scanner, deadline, usage, caps, local=_call_ollama):
+    """
+    Groq and Ollama raced by hedging.race(). Each provider scans with its own
+    copy of the restricted-content scanner (they stream concurrently); the
+    winner's scan state is copied back into the caller's scanner.
+    """
+    scanners = {}
+
+    def provider(name, call):
+        def run(on_first, cancel):
+            own = scanners[name] = type(scanner)() if scanner is not None else None
+            return call(system, messages, own, deadline, usage, on_first=on_first, cancel=cancel, **caps)
+        return run
+
+    reply, winner = hedging.race(provider("primary", _call_groq), provider("backup", local),
+                                 deadline, MIN_FALLBACK_SEC)
+    if scanner is not None and winner:
+        vars(scanner).update(vars(scanners[winner]))
+    if winner:
+        note(provider="groq" if winner == "primary" else "ollama", hedged=True)
+    return reply
+
+
+def _apply_profile(profile, legacy_system, history):
+    """(system prompt, trimmed history, max_tokens) — legacy prompt and caps when profiles are off."""
+    if profile is None:
+        return legacy_system, history, None
+    print(f"[Profile] {profile['name']} | history_turns={profile['history_turns']} "
+          f"| max_tokens={profile['max_tokens']}")
+    return profile["system"], trim_history(history, profile["history_turns"]), profile["max_tokens"]
+
+
+def ask_user_mode(message: str, history: list = None, doctor_context: str = "",
+                  scanner=None, priority="general", is_alive=None, deadline=None,
+                  intent="general") -> str:
+    history = full_history = history or []
     current_content = message
     if doctor_context:
         current_content += f"\n\n[Doctor List]\n{doctor_context}\nInclude this doctor information in your response where relevant."
+    system, history, max_tokens = _apply_profile(select_profile("user", intent=intent),
+                                                 USER_SYSTEM, history)
     messages = history + [{"role": "user", "content": current_content}]
-    result = _call_ai(USER_SYSTEM, messages)
+    usage    = CallUsage("user", intent, system, history, current_content[len(message):], message)
+    result = _call_ai(system, messages, scanner, priority, is_alive, deadline, usage, max_tokens,
+                      complexity=cascade.complexity(message, intent, full_history))
     if result:
         return result
     return "Service is currently unavailable. Please rest, stay hydrated, and consult a doctor if you do not feel better."
 
 
-def ask_doctor_mode(message: str, history: list = None, doctor_context: str = "") -> str:
-    history = history or []
+def ask_doctor_mode(message: str, history: list = None, doctor_context: str = "",
+                    scanner=None, priority="clinical", is_alive=None, deadline=None,
+                    specialty=None) -> str:
+    history = full_history = history or []
     current_content = message
     if doctor_context:
-        current_content += f"\n\n[Referral Doctors in Karachi]\n{doctor_context}"
+        current_content += f"\n\n[Referral Doctors]\n{doctor_context}"
+    system, history, max_tokens = _apply_profile(select_profile("doctor", specialty=specialty),
+                                                 DOCTOR_SYSTEM, history)
     messages = history + [{"role": "user", "content": current_content}]
-    result = _call_ai(DOCTOR_SYSTEM, messages)
+    usage    = CallUsage("doctor", "referral" if specialty else "clinical",
+                         system, history, current_content[len(message):], message)
+    result = _call_ai(system, messages, scanner, priority, is_alive, deadline, usage, max_tokens,
+                      complexity=cascade.complexity(message, usage.intent, full_history))
     if result:
         return result
     return "Clinical AI unavailable. Assess vitals immediately. Emergency: Call 1122 Karachi."
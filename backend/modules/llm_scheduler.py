@@ -0,0 +1,188 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — llm_scheduler.py
+  Priority- and deadline-aware scheduling of LLM calls
+  (sits between ask_user_mode/ask_doctor_mode and the
+  Groq/Ollama providers)
+  - Global cap on concurrent LLM calls (LLM_MAX_CONCURRENT)
+  - Waiters are granted by priority class, with aging so
+    low classes are never starved forever
+  - Requests whose deadline passed or whose client hung up
+    are dropped before they reach the model
+  - Batch traffic may hold at most BATCH_MAX_SHARE of slots
+  All state is per worker process.
+============================================================
+"""
+
+import itertools, os, threading, time
+from contextlib import contextmanager
+
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT",  "4"))
+LLM_MAX_QUEUE      = int(os.getenv("LLM_MAX_QUEUE",       "16"))
+LLM_QUEUE_TIMEOUT  = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+BATCH_MAX_SHARE    = float(os.getenv("LLM_BATCH_MAX_SHARE", "0.25"))
+AGING_SEC          = 5.0    # one priority level gained per AGING_SEC waited
+POLL_SEC           = 0.25   # how often waiters re-check deadline / liveness
+
+# Lower number = served first. Keys are detect_intent() types plus
+# "clinical" (doctor mode) and "batch" (offline triage jobs).
+PRIORITY = {
+    "clinical"    : 0,
+    "specialist"  : 1,
+    "emotional"   : 2,
+    "general"     : 2,
+    "general_chat": 3,
+    "batch"       : 4,
+}
+DEFAULT_CLASS = "general"
+
+
+class SchedulerRejected(Exception):
+    """Raised by acquire(). reason: queue_full | deadline | client_gone"""
+
+    def __init__(self, reason: str, retry_after: float = 0.0):
+        super().__init__(reason)
+        self.reason      = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("cls", "priority", "seq", "enqueued", "deadline", "is_alive", "event", "granted")
+
+    def __init__(self, cls, seq, deadline, is_alive):
+        self.cls      = cls
+        self.priority = PRIORITY.get(cls, PRIORITY[DEFAULT_CLASS])
+        self.seq      = seq
+        self.enqueued = time.time()
+        self.deadline = deadline
+        self.is_alive = is_alive
+        self.event    = threading.Event()
+        self.granted  = False
+
+    def rank(self, now):
+        return (self.priority - (now - self.enqueued) / AGING_SEC, self.seq)
+
+
+_lock       = threading.Lock()
+_waiters    = []
+_active     = {}                  # class → slots held
+_seq        = itertools.count()
+_avg_hold   = [5.0]               # EWMA of seconds a slot is held — drives Retry-After
+_stats      = {
+    "admitted"           : 0,
+    "queued"             : 0,
+    "rejected_queue"     : 0,
+    "dropped_deadline"   : 0,
+    "dropped_client_gone": 0,
+}
+_by_class   = {}                  # class → admitted count
+
+
+def _total_active():
+    return sum(_active.values())
+
+
+def _batch_cap():
+    return max(1, int(LLM_MAX_CONCURRENT * BATCH_MAX_SHARE))
+
+
+def _eligible(w):
+    return w.cls != "batch" or _active.get("batch", 0) < _batch_cap()
+
+
+def _estimated_wait():
+    return _avg_hold[0] * (len(_waiters) + 1) / max(LLM_MAX_CONCURRENT, 1)
+
+
+def _grant(w):
+    _active[w.cls] = _active.get(w.cls, 0) + 1
+    _stats["admitted"] += 1
+    _by_class[w.cls] = _by_class.get(w.cls, 0) + 1
+    w.granted = True
+    w.event.set()
+
+
+def _dispatch():
+    # Caller holds _lock. Hand free slots to the best eligible waiters.
+    while _waiters and _total_active() < LLM_MAX_CONCURRENT:
+        now = time.time()
+        candidates = [w for w in _waiters if _eligible(w)]
+        if not candidates:
+            return
+        best = min(candidates, key=lambda w: w.rank(now))
+        _waiters.remove(best)
+        _grant(best)
+
+
+def acquire(cls=DEFAULT_CLASS, deadline=None, is_alive=None) -> float:
+    """
+    Blocks until an LLM slot is granted and returns the grant time
+    (pass it to release()). `deadline` is an absolute time.time() value;
+    `is_alive()` returning False means the client disconnected.
+    Raises SchedulerRejected when the request should not reach the model.
+    """
+    queue_limit = time.time() + LLM_QUEUE_TIMEOUT
+    deadline    = queue_limit if deadline is None else min(deadline, queue_limit)
+
+    with _lock:
+        w = _Waiter(cls, next(_seq), deadline, is_alive)
+        _waiters.append(w)
+        _dispatch()
+        if w.granted:
+            return time.time()
+        if len(_waiters) > LLM_MAX_QUEUE:
+            _waiters.remove(w)
+            _stats["rejected_queue"] += 1
+            raise SchedulerRejected("queue_full", _estimated_wait())
+        _stats["queued"] += 1
+
+    while not w.event.wait(min(POLL_SEC, max(deadline - time.time(), 0))):
+        reason = None
+        if time.time() >= deadline:
+            reason = "deadline"
+        elif is_alive is not None and not is_alive():
+            reason = "client_gone"
+        if reason:
+            with _lock:
+                if w.granted:          # granted while we were checking
+                    break
+                _waiters.remove(w)
+                _stats[f"dropped_{reason}"] += 1
+                _dispatch()
+                raise SchedulerRejected(reason, _estimated_wait())
+
+    # A slot is held from here on — drop it if the client left while queued
+    if is_alive is not None and not is_alive():
+        release(time.time(), cls)
+        with _lock:
+            _stats["dropped_client_gone"] += 1
+        raise SchedulerRejected("client_gone")
+    return time.time()
+
+
+def release(acquired_at: float, cls=DEFAULT_CLASS):
+    with _lock:
+        _active[cls] = max(0, _active.get(cls, 0) - 1)
+        _avg_hold[0] = 0.8 * _avg_hold[0] + 0.2 * (time.time() - acquired_at)
+        _dispatch()
+
+
+@contextmanager
+def llm_slot(cls=DEFAULT_CLASS, deadline=None, is_alive=None):
+    acquired_at = acquire(cls, deadline, is_alive)
+    try:
+        yield
+    finally:
+        release(acquired_at, cls)
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "llm_active"      : _total_active(),
+            "llm_waiting"     : len(_waiters),
+            "llm_capacity"    : LLM_MAX_CONCURRENT,
+            "queue_limit"     : LLM_MAX_QUEUE,
+            "admitted_by_class": dict(_by_class),
+        }
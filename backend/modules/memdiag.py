@@ -0,0 +1,213 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — memdiag.py
+  Per-worker memory accounting and leak hunting
+  1. start()      → sampler thread (MEMDIAG=1): RSS every
+                    MEMDIAG_SAMPLE_SEC into a ring buffer;
+                    with tracemalloc on, a top-by-module
+                    snapshot + diff every MEMDIAG_SNAPSHOT_EVERY
+                    samples
+  2. track()      → named structures whose size is reported
+                    (SESSIONS, doctor shards, ...); big ones
+                    are sized from a sample of their items
+  3. report()     → RSS now / history / growth per hour,
+                    tracked sizes, gc counts, tracemalloc top
+                    allocators and the last diff
+  4. set_tracing()→ start / stop tracemalloc at runtime
+  tracemalloc is the only expensive part: it is off unless
+  MEMDIAG_TRACEMALLOC=1 or an admin starts it. Everything
+  else is one /proc read per sample.
+============================================================
+"""
+
+import gc, os, sys, threading, time, tracemalloc
+from collections import deque
+
+MEMDIAG_ENABLED   = os.getenv("MEMDIAG", "0") == "1"
+SAMPLE_SEC        = float(os.getenv("MEMDIAG_SAMPLE_SEC", "60"))
+SNAPSHOT_EVERY    = int(os.getenv("MEMDIAG_SNAPSHOT_EVERY", "10"))   # samples between tracemalloc snapshots
+TRACE_AT_START    = os.getenv("MEMDIAG_TRACEMALLOC", "0") == "1"
+HISTORY           = 1440       # RSS samples kept (a day at 60 s)
+TOP_N             = 20
+SIZE_SAMPLE       = 200        # items measured per container before extrapolating
+TRACE_FRAMES      = 1
+
+_lock      = threading.Lock()
+_history   = deque(maxlen=HISTORY)   # (unix time, rss bytes)
+_tracked   = {}                      # name → callable returning the object to size
+_last      = {"snapshot": None, "top": [], "diff": [], "at": None}
+_started   = []
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# ── RSS ───────────────────────────────────────────────────
+def rss_bytes():
+    """Current resident set size (Linux /proc), else the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _growth_per_hour(samples):
+    """Least-squares slope of RSS over time, bytes/hour (None below 3 samples)."""
+    if len(samples) < 3:
+        return None
+    n  = len(samples)
+    mt = sum(t for t, _ in samples) / n
+    mr = sum(r for _, r in samples) / n
+    var = sum((t - mt) ** 2 for t, _ in samples)
+    if var == 0:
+        return None
+    return sum((t - mt) * (r - mr) for t, r in samples) / var * 3600
+
+
+# ── Sizes of tracked structures ───────────────────────────
+def track(name, getter):
+    """getter() → object to size on each report (e.g. lambda: SESSIONS)."""
+    _tracked[name] = getter
+
+
+def deep_size(obj, sample=SIZE_SAMPLE, _seen=None):
+    """
+    Approximate bytes held by obj and what it contains. Containers with
+    more than `sample` items are measured on an evenly spaced sample and
+    scaled up, so a 300k-doctor shard costs the same as a small one.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        items = list(obj.items())
+        step  = max(1, len(items) // sample)
+        part  = sum(deep_size(k, sample, seen) + deep_size(v, sample, seen) for k, v in items[::step])
+        size += part * len(items) / max(1, len(items[::step]))
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        items = list(obj)
+        step  = max(1, len(items) // sample)
+        part  = sum(deep_size(v, sample, seen) for v in items[::step])
+        size += part * len(items) / max(1, len(items[::step]))
+    return int(size)
+
+
+def _sizes():
+    out = {}
+    for name, getter in list(_tracked.items()):
+        try:
+            obj = getter()
+            out[name] = {"bytes": deep_size(obj), "items": len(obj) if hasattr(obj, "__len__") else None}
+        except Exception as e:
+            out[name] = {"error": str(e)}
+    return out
+
+
+# ── tracemalloc ───────────────────────────────────────────
+def _module(filename):
+    # site-packages/flask/app.py → flask ; backend/modules/x.py → modules/x.py
+    parts = filename.replace("\\", "/").split("/")
+    if "site-packages" in parts:
+        return parts[parts.index("site-packages") + 1].removesuffix(".py")
+    if "modules" in parts:
+        return "modules/" + parts[-1]
+    return parts[-1] if "python3" not in filename else "stdlib/" + parts[-1]
+
+
+def _by_module(stats):
+    grouped = {}
+    for st in stats:
+        name = _module(st.traceback[0].filename)
+        size, count = grouped.get(name, (0, 0))
+        grouped[name] = (size + getattr(st, "size_diff", st.size), count + getattr(st, "count_diff", st.count))
+    ranked = sorted(grouped.items(), key=lambda kv: abs(kv[1][0]), reverse=True)[:TOP_N]
+    return [{"module": m, "kb": round(s / 1024, 1), "blocks": c} for m, (s, c) in ranked]
+
+
+def _take_snapshot():
+    snap = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    with _lock:
+        prev = _last["snapshot"]
+        _last.update(snapshot=snap, at=int(time.time()),
+                     top=_by_module(snap.statistics("filename")),
+                     diff=_by_module(snap.compare_to(prev, "filename")) if prev else [])
+
+
+def set_tracing(on: bool):
+    if on and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+        print("[Memory] 🔬 tracemalloc started")
+    elif not on and tracemalloc.is_tracing():
+        tracemalloc.stop()
+        with _lock:
+            _last["snapshot"] = None
+        print("[Memory] ⏹️ tracemalloc stopped")
+
+
+def top_lines(limit=TOP_N):
+    """Top allocating source lines right now (tracemalloc must be on)."""
+    if not tracemalloc.is_tracing():
+        return []
+    return [{"line": f"{st.traceback[0].filename}:{st.traceback[0].lineno}",
+             "kb": round(st.size / 1024, 1), "blocks": st.count}
+            for st in tracemalloc.take_snapshot().statistics("lineno")[:limit]]
+
+
+# ── Sampler ───────────────────────────────────────────────
+def _sample(n):
+    with _lock:
+        _history.append((int(time.time()), rss_bytes()))
+    if tracemalloc.is_tracing() and n % max(SNAPSHOT_EVERY, 1) == 0:
+        _take_snapshot()
+
+
+def start():
+    """Sampler thread (once per process) when MEMDIAG=1."""
+    if not MEMDIAG_ENABLED or _started:
+        return
+    _started.append(True)
+    if TRACE_AT_START:
+        set_tracing(True)
+
+    def loop():
+        n = 0
+        while True:
+            try:
+                _sample(n)
+            except Exception as e:
+                print(f"[Memory] ⚠️ Sample failed: {e}")
+            n += 1
+            time.sleep(SAMPLE_SEC)
+
+    threading.Thread(target=loop, daemon=True, name="memdiag").start()
+    print(f"[Memory] 📈 Sampling RSS every {SAMPLE_SEC:.0f}s (pid {os.getpid()})")
+
+
+def report(snapshot=False) -> dict:
+    """snapshot=True takes a tracemalloc snapshot now (diffed against the last one)."""
+    if snapshot and tracemalloc.is_tracing():
+        _take_snapshot()
+    with _lock:
+        history = list(_history)
+        last    = {k: v for k, v in _last.items() if k != "snapshot"}
+    growth = _growth_per_hour(history)
+    out = {
+        "pid"              : os.getpid(),
+        "rss_mb"           : round(rss_bytes() / 2 ** 20, 1),
+        "sampling"         : MEMDIAG_ENABLED,
+        "growth_mb_per_h"  : round(growth / 2 ** 20, 2) if growth is not None else None,
+        "history"          : [[t, round(r / 2 ** 20, 1)] for t, r in history],
+        "tracked"          : _sizes(),
+        "gc"               : {"counts": gc.get_count(), "garbage": len(gc.garbage)},
+        "tracemalloc"      : {"tracing": tracemalloc.is_tracing(), **last},
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        out["tracemalloc"].update(traced_mb=round(current / 2 ** 20, 1), peak_mb=round(peak / 2 ** 20, 1))
+    return out
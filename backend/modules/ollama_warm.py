@@ -0,0 +1,160 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — ollama_warm.py
+  Keeps the local Ollama fallback models loaded
+  1. start()     → background thread: loads every model at
+                   startup, then every OLLAMA_KEEPALIVE_SEC
+                   checks /api/ps, reloads a model Ollama
+                   has unloaded and measures time to first
+                   token with a 1-token probe
+  2. observe()   → load / prompt-eval time of real calls
+                   (counts fallback calls that hit a cold
+                   model)
+  3. readiness() → per-model loaded + TTFT, for /api/health
+                   and GET /api/ready (503 until warm)
+  Requests also pass keep_alive=OLLAMA_KEEP_ALIVE so Ollama
+  itself does not unload the model after its 5 min default.
+  Opt-in: OLLAMA_PRELOAD=1 on pods that run a local Ollama.
+  Off (the default, e.g. the Groq-only deploy) there is no
+  thread and /api/ready ignores Ollama.
+============================================================
+"""
+
+import os, threading, time
+import requests
+
+OLLAMA_PRELOAD      = os.getenv("OLLAMA_PRELOAD", "0") == "1"
+OLLAMA_KEEP_ALIVE   = os.getenv("OLLAMA_KEEP_ALIVE", "30m")            # "-1" = never unload
+KEEPALIVE_EVERY_SEC = float(os.getenv("OLLAMA_KEEPALIVE_SEC", "240"))
+READY_TTFT_MS       = float(os.getenv("OLLAMA_READY_TTFT_MS", "5000"))  # warm but slower than this → not ready
+PRELOAD_MODELS      = [m.strip() for m in os.getenv("OLLAMA_PRELOAD_MODELS", "").split(",") if m.strip()]
+LOAD_TIMEOUT        = 300    # first load of a model from disk can take minutes
+COLD_LOAD_SEC       = 1.0    # a call whose load_duration exceeds this found the model unloaded
+
+_lock    = threading.Lock()
+_models  = {}   # name → {"loaded", "ttft_ms", "load_ms", "checked_at", "reloads", "error"}
+_stats   = {"probes": 0, "reloads": 0, "cold_calls": 0}
+_started = []
+
+
+def _entry(model):
+    return _models.setdefault(model, {"loaded": False, "ttft_ms": None, "load_ms": None,
+                                      "checked_at": None, "reloads": 0, "error": None})
+
+
+def _base(url):
+    # OLLAMA_URL is the /api/generate endpoint; /api/ps lives next to it
+    return url.split("/api/")[0]
+
+
+def _same_model(name, model):
+    return name == model or (":" not in model and name == f"{model}:latest")
+
+
+def _resident(base) -> set:
+    r = requests.get(f"{base}/api/ps", timeout=10)
+    r.raise_for_status()
+    return {m.get("name") or m.get("model") for m in r.json().get("models", [])}
+
+
+def _probe(base, model):
+    """One-token generation: loads the model if needed and refreshes keep_alive."""
+    t0 = time.perf_counter()
+    r  = requests.post(f"{base}/api/generate", timeout=LOAD_TIMEOUT, json={
+        "model": model, "prompt": "hi", "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE, "options": {"num_predict": 1},
+    })
+    r.raise_for_status()
+    data    = r.json()
+    wall_ms = (time.perf_counter() - t0) * 1000
+    load_ms = data.get("load_duration", 0) / 1e6
+    with _lock:
+        _stats["probes"] += 1
+        e = _entry(model)
+        e.update(loaded=True, error=None, checked_at=int(time.time()),
+                 ttft_ms=round(wall_ms - load_ms, 1))
+        if load_ms >= COLD_LOAD_SEC * 1000:
+            e["load_ms"] = round(load_ms, 1)
+    return load_ms
+
+
+def _cycle(base, models):
+    try:
+        resident = _resident(base)
+    except requests.exceptions.RequestException as e:
+        with _lock:
+            first = all(_entry(model)["error"] is None for model in models)
+            for model in models:
+                _models[model].update(loaded=False, error="not running", checked_at=int(time.time()))
+        if first:   # log once, not every cycle
+            print(f"[Ollama] ❌ Not reachable for preload: {e}")
+        return
+
+    for model in models:
+        loaded = any(_same_model(name, model) for name in resident)
+        with _lock:
+            known = _entry(model)["checked_at"] is not None
+        try:
+            load_ms = _probe(base, model)
+        except requests.exceptions.RequestException as e:
+            with _lock:
+                _models[model].update(loaded=False, error=str(e)[:200], checked_at=int(time.time()))
+            print(f"[Ollama] ⚠️ Probe failed for {model}: {e}")
+            continue
+        if not loaded:
+            if known:
+                with _lock:
+                    _stats["reloads"]         += 1
+                    _models[model]["reloads"] += 1
+                print(f"[Ollama] 🔁 {model} had been unloaded — reloaded in {load_ms / 1000:.1f}s")
+            else:
+                print(f"[Ollama] 🔥 {model} loaded in {load_ms / 1000:.1f}s")
+            # The loading probe's TTFT includes warm-up effects; measure again
+            try:
+                _probe(base, model)
+            except requests.exceptions.RequestException:
+                pass
+
+
+def start(url, models):
+    """Preload + keep-warm thread (once per process). PRELOAD_MODELS overrides models."""
+    if not OLLAMA_PRELOAD or _started:
+        return
+    _started.append(True)
+    base, models = _base(url), PRELOAD_MODELS or list(models)
+    with _lock:
+        for model in models:
+            _entry(model)
+
+    def loop():
+        while True:
+            _cycle(base, models)
+            time.sleep(KEEPALIVE_EVERY_SEC)
+
+    threading.Thread(target=loop, daemon=True, name="ollama-warm").start()
+    print(f"[Ollama] ♨️ Keeping {', '.join(models)} warm (keep_alive={OLLAMA_KEEP_ALIVE}, "
+          f"check every {KEEPALIVE_EVERY_SEC:.0f}s)")
+
+
+def observe(model, final: dict):
+    """Timings from the last line of a real Ollama reply."""
+    load_ms = (final.get("load_duration") or 0) / 1e6
+    with _lock:
+        e = _entry(model)
+        e.update(loaded=True, error=None)
+        if load_ms >= COLD_LOAD_SEC * 1000:
+            _stats["cold_calls"] += 1
+            e["load_ms"] = round(load_ms, 1)
+    if load_ms >= COLD_LOAD_SEC * 1000:
+        print(f"[Ollama] 🧊 {model} was cold — this call spent {load_ms / 1000:.1f}s loading it")
+
+
+def readiness() -> dict:
+    with _lock:
+        models = {m: dict(e) for m, e in _models.items()}
+        out    = {**_stats, "managed": OLLAMA_PRELOAD, "keep_alive": OLLAMA_KEEP_ALIVE,
+                  "ready_ttft_ms": READY_TTFT_MS, "models": models}
+    out["ready"] = not OLLAMA_PRELOAD or bool(models) and all(
+        e["loaded"] and e["ttft_ms"] is not None and e["ttft_ms"] <= READY_TTFT_MS
+        for e in models.values())
+    return out
@@ -0,0 +1,246 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — osm_index.py
+  Offline health-facility index built from a local
+  OpenStreetMap extract (Overpass JSON dump or .osm.pbf)
+  1. build_index()      → extract → osm_facilities_index.json
+  2. nearby_facilities() → radius search, answered in-process
+  3. facility_from_element() → shared with the live Overpass
+                               fallback so both paths agree
+  4. nearest_emergency() → nearest hospitals / emergency
+                           departments for the chat emergency
+                           path: in-memory only, never reloads
+                           or touches the network
+============================================================
+"""
+
+import json, os, time
+from modules.geo_index import GridIndex
+
+INDEX_FILE        = os.getenv("OSM_INDEX_FILE", "osm_facilities_index.json")
+INDEX_RELOAD_SEC  = int(os.getenv("OSM_INDEX_RELOAD_SEC", "60"))
+INDEX_VERSION     = 1
+EMERGENCY_MAX_KM  = float(os.getenv("EMERGENCY_MAX_KM", "30"))
+EMERGENCY_KINDS   = {"hospital"}   # + any facility tagged emergency=yes
+
+# Same tag set as the live Overpass query in app.py
+HEALTH_AMENITIES = {"hospital", "clinic", "doctors", "health_post"}
+
+
+def is_health_facility(tags: dict) -> bool:
+    return tags.get("amenity") in HEALTH_AMENITIES or "healthcare" in tags
+
+
+def facility_from_element(el: dict):
+    """
+    Overpass element → flat facility dict, or None if it is unnamed
+    or has no usable coordinates.
+    """
+    tags = el.get("tags", {})
+    name = tags.get("name") or tags.get("name:en") or tags.get("name:ur")
+    if not name:
+        return None
+
+    # Coordinates — nodes have lat/lon directly; ways have "center"
+    if el.get("type") == "node":
+        lat, lng = el.get("lat"), el.get("lon")
+    else:
+        center   = el.get("center", {})
+        lat, lng = center.get("lat"), center.get("lon")
+    if lat is None or lng is None:
+        return None
+
+    # Build address from tags
+    address_parts = [tags[k] for k in ["addr:street", "addr:suburb", "addr:city"] if tags.get(k)]
+    address = ", ".join(address_parts) if address_parts else tags.get("addr:full", "")
+
+    return {
+        "id"       : str(el["id"]),
+        "name"     : name,
+        "lat"      : float(lat),
+        "lng"      : float(lng),
+        "address"  : address,
+        "phone"    : tags.get("phone") or tags.get("contact:phone") or "",
+        "kind"     : tags.get("amenity") or tags.get("healthcare") or "",
+        "emergency": tags.get("emergency") == "yes",
+    }
+
+
+# ── Extract readers ───────────────────────────────────────
+def _read_overpass_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for el in data.get("elements", []):
+        if is_health_facility(el.get("tags", {})):
+            yield el
+
+
+def _read_pbf(path):
+    try:
+        import osmium
+    except ImportError:
+        raise RuntimeError("Reading .osm.pbf needs pyosmium — pip install osmium")
+
+    elements = []
+
+    class _Handler(osmium.SimpleHandler):
+        def node(self, n):
+            tags = dict(n.tags)
+            if is_health_facility(tags) and n.location.valid():
+                elements.append({"type": "node", "id": n.id, "tags": tags,
+                                 "lat": n.location.lat, "lon": n.location.lon})
+
+        def way(self, w):
+            tags = dict(w.tags)
+            if not is_health_facility(tags):
+                return
+            locs = [nd.location for nd in w.nodes if nd.location.valid()]
+            if not locs:
+                return
+            elements.append({"type": "way", "id": w.id, "tags": tags, "center": {
+                "lat": sum(l.lat for l in locs) / len(locs),
+                "lon": sum(l.lon for l in locs) / len(locs),
+            }})
+
+    _Handler().apply_file(path, locations=True)
+    return elements
+
+
+def read_extract(path):
+    if path.endswith(".pbf"):
+        return _read_pbf(path)
+    return _read_overpass_json(path)
+
+
+# ── Build ─────────────────────────────────────────────────
+def build_index(source, out_file=INDEX_FILE):
+    """Reads an extract and atomically writes the on-disk index."""
+    t0 = time.time()
+    facilities, seen_ids = [], set()
+
+    for el in read_extract(source):
+        fac = facility_from_element(el)
+        if fac and fac["id"] not in seen_ids:
+            seen_ids.add(fac["id"])
+            facilities.append(fac)
+
+    grid = GridIndex((f["lat"], f["lng"]) for f in facilities)
+    bbox = None
+    if facilities:
+        lats = [f["lat"] for f in facilities]
+        lngs = [f["lng"] for f in facilities]
+        bbox = [min(lats), min(lngs), max(lats), max(lngs)]
+
+    payload = {
+        "version"   : INDEX_VERSION,
+        "built_at"  : int(time.time()),
+        "source"    : os.path.basename(source),
+        "bbox"      : bbox,
+        "grid"      : grid.to_dict(),
+        "facilities": facilities,
+    }
+
+    tmp = f"{out_file}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, out_file)   # readers never see a half-written file
+
+    print(f"[OSM Index] ✅ {len(facilities)} facilities → {out_file} ({time.time() - t0:.1f}s)")
+    return len(facilities)
+
+
+# ── Load / hot reload ─────────────────────────────────────
+_state = {"snap": None, "mtime": None, "checked": 0.0}
+
+def _emergency_index(facilities):
+    """GridIndex over the facilities that can take an emergency + their positions in `facilities`."""
+    grid, positions = GridIndex(), []
+    for i, f in enumerate(facilities):
+        if f.get("emergency") or f.get("kind") in EMERGENCY_KINDS:
+            grid.add(f["lat"], f["lng"])
+            positions.append(i)
+    return grid, positions
+
+
+def load_index(path=INDEX_FILE):
+    if not os.path.exists(path):
+        return False
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        grid = GridIndex.from_dict(data["grid"])
+        er_grid, er_positions = _emergency_index(data.get("facilities", []))
+    except Exception as e:
+        print(f"[OSM Index] ⚠️ Could not load {path}: {e}")
+        return False
+
+    # One assignment — concurrent readers see the old or the new index, never a mix
+    _state["snap"] = {
+        "grid"      : grid,
+        "facilities": data.get("facilities", []),
+        "bbox"      : data.get("bbox"),
+        "built_at"  : data.get("built_at"),
+        # Prebuilt so the emergency path only pays for the grid lookup
+        "er_grid"     : er_grid,
+        "er_positions": er_positions,
+    }
+    _state["mtime"] = mtime
+    print(f"[OSM Index] ✅ Loaded {len(grid)} facilities ({len(er_grid)} emergency-capable) from {path}")
+    return True
+
+
+def _maybe_reload():
+    now = time.time()
+    if now - _state["checked"] < INDEX_RELOAD_SEC:
+        return
+    _state["checked"] = now
+    try:
+        mtime = os.path.getmtime(INDEX_FILE)
+    except OSError:
+        return
+    if mtime != _state["mtime"]:
+        load_index(INDEX_FILE)
+
+
+def index_status() -> dict:
+    snap = _state["snap"]
+    return {
+        "loaded"    : snap is not None,
+        "facilities": len(snap["facilities"]) if snap else 0,
+        "emergency" : len(snap["er_grid"]) if snap else 0,
+        "built_at"  : snap["built_at"] if snap else None,
+    }
+
+
+def _covers(snap, lat, lng) -> bool:
+    bbox = snap["bbox"]
+    if not bbox:
+        return False
+    return bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]
+
+
+def nearby_facilities(lat, lng, radius_m):
+    """
+    Returns [(distance_km, facility), ...] sorted by distance, or None
+    when no index is loaded or the point lies outside the extract.
+    """
+    _maybe_reload()
+    snap = _state["snap"]
+    if snap is None or not _covers(snap, lat, lng):
+        return None
+    facilities = snap["facilities"]
+    return [(d, facilities[i]) for d, i in snap["grid"].within(lat, lng, radius_m / 1000)]
+
+def nearest_emergency(lat, lng, k=3, max_km=EMERGENCY_MAX_KM):
+    """
+    [(distance_km, facility), ...] — the k nearest hospitals or facilities
+    tagged emergency=yes within max_km. Uses the index already in memory
+    (no reload check, no disk, no network); [] when none is loaded or the
+    point lies outside the extract.
+    """
+    snap = _state["snap"]
+    if snap is None or not _covers(snap, lat, lng):
+        return []
+    facilities, positions = snap["facilities"], snap["er_positions"]
+    return [(d, facilities[positions[i]]) for d, i in snap["er_grid"].nearest(lat, lng, k=k, max_km=max_km)]
@@ -0,0 +1,147 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — profiling.py
+  On-demand cProfile capture for slow API requests
+  1. profiled()  → view decorator; profiles a request when
+                   it is forced (admin X-Profile header) or
+                   sampled (1 in PROFILE_SAMPLE_EVERY)
+  2. note()      → request metadata for the capture (intent,
+                   mode, provider, Overpass mirror, ...)
+  3. recent()    → newest captures for the admin endpoint
+  Output: PROFILE_DIR/<time>_<route>_<ms>ms.prof (pstats,
+  open with `python -m pstats` or snakeviz) + .json
+  sidecar with the metadata and the top functions.
+  With PROFILE_SAMPLE_EVERY=0 and no ADMIN_TOKEN the
+  decorator returns the view unchanged — no overhead.
+============================================================
+"""
+
+import cProfile, io, json, os, pstats, threading, time
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+PROFILE_DIR          = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))     # 0 = no sampling
+PROFILE_SLOW_MS      = float(os.getenv("PROFILE_SLOW_MS", "2000"))     # sampled captures below this are dropped
+PROFILE_KEEP         = int(os.getenv("PROFILE_KEEP", "50"))            # newest captures kept on disk
+TOP_FUNCTIONS        = 25
+
+_local   = threading.local()
+_busy    = threading.Lock()   # cProfile can only run one profiler at a time
+_counter = [0]
+_counter_lock = threading.Lock()   # requests arrive on concurrent gunicorn threads
+_stats   = {"profiled": 0, "saved": 0, "skipped_busy": 0}
+
+
+def note(**fields):
+    """Attach metadata to the request being profiled (no-op otherwise)."""
+    meta = getattr(_local, "meta", None)
+    if meta is not None:
+        meta.update(fields)
+
+
+def _sampled():
+    if PROFILE_SAMPLE_EVERY <= 0:
+        return False
+    with _counter_lock:
+        _counter[0] += 1
+        return _counter[0] % PROFILE_SAMPLE_EVERY == 0
+
+
+def _status(result):
+    if isinstance(result, tuple) and len(result) > 1 and isinstance(result[1], int):
+        return result[1]
+    return getattr(result, "status_code", 200)
+
+
+def _top(profiler):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    return out.getvalue().splitlines()
+
+
+def _save(route, profiler, meta):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{route}_{int(meta['duration_ms'])}ms"
+    profiler.dump_stats(PROFILE_DIR / f"{stem}.prof")
+    with open(PROFILE_DIR / f"{stem}.json", "w", encoding="utf-8") as f:
+        json.dump({**meta, "profile": f"{stem}.prof", "top": _top(profiler)}, f, indent=1)
+    # Keep the newest PROFILE_KEEP captures
+    for old in sorted(PROFILE_DIR.glob("*.json"))[:-max(PROFILE_KEEP, 1)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+    print(f"[Profile] 💾 {stem} ({meta['reason']})")
+
+
+def profiled(route, forced=None):
+    """
+    forced: callable → True when the current request asked to be profiled
+    (app.py checks the admin token). Without it and without sampling the
+    view is returned as is.
+    """
+    def decorate(view):
+        if forced is None and PROFILE_SAMPLE_EVERY <= 0:
+            return view
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            reason = "forced" if forced is not None and forced() else "sampled" if _sampled() else None
+            if reason is None or not _busy.acquire(blocking=False):
+                if reason is not None:
+                    _stats["skipped_busy"] += 1
+                return view(*args, **kwargs)
+
+            _local.meta = meta = {"route": route, "reason": reason, "at": int(time.time())}
+            profiler    = cProfile.Profile()
+            t0          = time.perf_counter()
+            try:
+                profiler.enable()
+                result = view(*args, **kwargs)
+            finally:
+                profiler.disable()
+                _local.meta = None
+                _busy.release()
+            meta["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            meta["status"]      = _status(result)
+            _stats["profiled"] += 1
+            if reason == "forced" or meta["duration_ms"] >= PROFILE_SLOW_MS:
+                try:
+                    _save(route, profiler, meta)
+                    _stats["saved"] += 1
+                except OSError as e:
+                    print(f"[Profile] ⚠️ Could not save profile: {e}")
+            return result
+        return wrapper
+    return decorate
+
+
+def recent(limit=20, min_ms=0.0) -> list:
+    """Newest captures first, metadata + top functions."""
+    out = []
+    for path in sorted(PROFILE_DIR.glob("*.json"), reverse=True):
+        try:
+            with open(path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if meta.get("duration_ms", 0) >= min_ms:
+            out.append(meta)
+        if len(out) >= limit:
+            break
+    return out
+
+
+def profile_path(name):
+    """Path of a saved .prof for download, or None (no directory escapes)."""
+    path = PROFILE_DIR / Path(name).name
+    return path if path.suffix == ".prof" and path.is_file() else None
+
+
+def stats() -> dict:
+    return {
+        **_stats,
+        "sample_every": PROFILE_SAMPLE_EVERY,
+        "slow_ms"     : PROFILE_SLOW_MS,
+        "dir"         : str(PROFILE_DIR),
+    }
@@ -0,0 +1,119 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — prompt_profiles.py
+  Intent-tiered prompts: each profile has its own compact
+  system prompt, history window and token cap
+  1. select_profile() → profile for (mode, intent / clinical
+                        specialty)
+  2. PROMPT_PROFILES_FILE (JSON) overrides any field of any
+     profile without a deploy; PROMPT_PROFILES=0 falls back
+     to the original full prompts for every call
+  bench_prompt_profiles.py measures prompt size and latency.
+============================================================
+"""
+
+import json, os
+
+PROFILES_ENABLED = os.getenv("PROMPT_PROFILES", "1") != "0"
+PROFILES_FILE    = os.getenv("PROMPT_PROFILES_FILE", "prompt_profiles.json")
+
+# Shared by every user-facing profile — the language rules are what the
+# long prompts spend most of their words on, and they must not drift.
+LANGUAGE_RULES = """Language: reply in English by default. If the user writes Roman Urdu (Urdu in Latin letters, e.g. "mujhe", "dard", "hai", "kya", "bukhar", "tabiyat"), reply only in Roman Urdu. Never use Urdu script. Never mix languages. When in doubt, use English."""
+
+SAFETY_RULES = """Never name medicine brands or exact dosages; for medicines say to consult a doctor or use the Doctor AI panel. Do not diagnose a disease by name — describe possibilities. For chest pain, breathing difficulty, stroke signs or heavy bleeding say: "Please call 1122 (Rescue) or 115 (Edhi Ambulance) right now." """
+
+USER_GENERAL = f"""You are SehatMand AI, a caring health assistant for users in Pakistan.
+{LANGUAGE_RULES}
+Answer in about 150-250 words with these bold sections: **Understanding Your Concern:**, **Helpful Suggestions:** (3 practical points, each with why it helps), **Home Care:**, **When to See a Doctor:** (clear warning signs).
+{SAFETY_RULES}
+Be warm and reassuring; end with a reminder to seek help if symptoms worsen."""
+
+USER_SPECIALIST = f"""You are SehatMand AI, a caring health assistant for users in Pakistan. The user needs a specialist referral.
+{LANGUAGE_RULES}
+In under 150 words: say in 1-2 sentences why this specialist fits their concern, list the doctors from [Doctor List] as "Name – Hospital – Phone" (only those given, never invent any), and give 2 short tips until the visit.
+{SAFETY_RULES}"""
+
+USER_EMOTIONAL = f"""You are SehatMand AI, a warm and supportive companion for users in Pakistan.
+{LANGUAGE_RULES}
+The user is sharing how they feel. In under 120 words: acknowledge the feeling, offer 2-3 gentle coping ideas, and invite them to keep talking. If they mention self-harm or suicide, urge them to talk to someone they trust and call 1122 immediately.
+{SAFETY_RULES}"""
+
+USER_SMALLTALK = f"""You are SehatMand AI, a friendly health assistant for users in Pakistan.
+{LANGUAGE_RULES}
+Reply in 1-3 short sentences and offer to help with any health question."""
+
+DOCTOR_CLINICAL = f"""You are Dr. AI, an experienced doctor speaking directly to a patient in Pakistan.
+{LANGUAGE_RULES}
+Be warm, first person, no heavy jargon; ask ONE follow-up question if you need more information.
+Judge severity. Mild: reassure, home care, over-the-counter medicine TYPES only. Moderate: see a doctor soon, likely tests, warning signs. Urgent (chest pain, breathing difficulty, stroke signs, severe injury, high fever with confusion): go to the emergency room immediately and call 1122 (Rescue) or 115 (Edhi Ambulance).
+Answer in about 200-300 words with these bold sections: **What I Think Is Happening:**, **What You Should Do Right Now:** (steps), **Home Care Tips:** (if applicable), **When to See a Doctor:**, **My Advice to You:**.
+Never prescribe exact dosages or brand names. Always add: "If your symptoms get worse or you feel very unwell, go to the hospital." """
+
+DOCTOR_REFERRAL = f"""You are Dr. AI, an experienced doctor speaking directly to a patient in Pakistan. Their complaint points to a specific specialty.
+{LANGUAGE_RULES}
+In about 150-200 words: explain in 2-3 sentences what is likely happening and how urgent it is, what to do right now, and refer them to the doctors in [Referral Doctors] (only those given, as "Name – Hospital – Phone"). For urgent signs, tell them to go to the emergency room and call 1122.
+Never prescribe exact dosages or brand names."""
+
+# name → settings. "history_turns" = user/assistant pairs kept; "max_tokens"
+# caps the generation (Groq max_tokens / Ollama num_predict).
+PROFILES = {
+    "user_general"    : {"system": USER_GENERAL,    "history_turns": 6, "max_tokens": 450},
+    "user_specialist" : {"system": USER_SPECIALIST, "history_turns": 2, "max_tokens": 300},
+    "user_emotional"  : {"system": USER_EMOTIONAL,  "history_turns": 4, "max_tokens": 250},
+    "user_smalltalk"  : {"system": USER_SMALLTALK,  "history_turns": 1, "max_tokens": 100},
+    "doctor_clinical" : {"system": DOCTOR_CLINICAL, "history_turns": 6, "max_tokens": 550},
+    "doctor_referral" : {"system": DOCTOR_REFERRAL, "history_turns": 4, "max_tokens": 400},
+}
+
+# detect_intent()["type"] → profile
+USER_INTENT_PROFILE = {
+    "general"     : "user_general",
+    "specialist"  : "user_specialist",
+    "emotional"   : "user_emotional",
+    "general_chat": "user_smalltalk",
+}
+
+
+def _load_overrides(path):
+    """
+    {"user_specialist": {"max_tokens": 250, "history_turns": 1},
+     "user_general": {"system_file": "prompts/general.txt"}}
+    """
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        for name, fields in overrides.items():
+            if name not in PROFILES:
+                print(f"[Profiles] ⚠️ Unknown profile '{name}' in {path} — ignored")
+                continue
+            if "system_file" in fields:
+                with open(fields.pop("system_file"), "r", encoding="utf-8") as sf:
+                    fields["system"] = sf.read()
+            PROFILES[name].update(fields)
+        print(f"[Profiles] ✅ Loaded overrides for {', '.join(overrides)} from {path}")
+    except Exception as e:
+        print(f"[Profiles] ⚠️ Could not read {path}: {e}")
+
+
+_load_overrides(PROFILES_FILE)
+
+
+def select_profile(mode: str, intent: str = None, specialty: str = None):
+    """
+    Profile name + settings for this turn, or None when profiles are
+    disabled (callers then use the full legacy prompt).
+    """
+    if not PROFILES_ENABLED:
+        return None
+    if mode == "doctor":
+        name = "doctor_referral" if specialty else "doctor_clinical"
+    else:
+        name = USER_INTENT_PROFILE.get(intent, "user_general")
+    return {"name": name, **PROFILES[name]}
+
+
+def trim_history(history: list, turns: int) -> list:
+    return history[-turns * 2:] if turns > 0 else []
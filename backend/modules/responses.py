@@ -0,0 +1,121 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — responses.py
+  Fast JSON response layer
+  1. encode()       → orjson when installed, stdlib json otherwise
+  2. fragment()     → encode a shared object once (doctor lists,
+                      static emergency payload) and reuse the bytes
+  3. json_body()    → build an object, splicing Raw fragments in
+  4. json_response()→ Flask Response, gzip above a size threshold
+  5. stats()        → bytes on the wire + CPU spent, for /api/health
+============================================================
+"""
+
+import gzip, json, os, threading, time
+from collections import OrderedDict
+from flask import Response, request
+from modules import memdiag
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL     = 5
+FRAGMENT_CACHE_MAX = 512
+
+
+class Raw(bytes):
+    """Already-encoded JSON, spliced into json_body() verbatim."""
+
+
+def encode(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# ── Pre-encoded fragments ─────────────────────────────────
+# Keyed by object identity: firestore_service hands out the same list
+# object for repeated specialization queries, so each doctor list is
+# encoded once per snapshot. The object is pinned so its id() is not reused —
+# only pass long-lived shared objects, never lists built per request.
+_fragments = OrderedDict()
+_lock      = threading.Lock()
+memdiag.track("response_fragments", lambda: _fragments)
+
+_stats = {
+    "responses"       : 0,
+    "compressed"      : 0,
+    "bytes_json"      : 0,
+    "bytes_wire"      : 0,
+    "encode_ms"       : 0.0,
+    "compress_ms"     : 0.0,
+    "fragment_hits"   : 0,
+    "fragment_misses" : 0,
+}
+
+
+def fragment(obj) -> Raw:
+    key = id(obj)
+    with _lock:
+        hit = _fragments.get(key)
+        if hit is not None and hit[0] is obj:
+            _fragments.move_to_end(key)
+            _stats["fragment_hits"] += 1
+            return hit[1]
+
+    t0  = time.perf_counter()
+    raw = Raw(encode(obj))
+    with _lock:
+        _stats["encode_ms"] += (time.perf_counter() - t0) * 1000
+        _stats["fragment_misses"] += 1
+        _fragments[key] = (obj, raw)
+        while len(_fragments) > FRAGMENT_CACHE_MAX:
+            _fragments.popitem(last=False)
+    return raw
+
+
+def json_body(fields: dict) -> bytes:
+    parts = []
+    for key, value in fields.items():
+        val = value if isinstance(value, Raw) else encode(value)
+        parts.append(encode(key) + b":" + val)
+    return b"{" + b",".join(parts) + b"}"
+
+
+def json_response(fields: dict, status: int = 200) -> Response:
+    t0   = time.perf_counter()
+    body = json_body(fields)
+    t1   = time.perf_counter()
+    size = len(body)
+
+    compressed = (size >= COMPRESS_MIN_BYTES
+                  and "gzip" in request.headers.get("Accept-Encoding", ""))
+    if compressed:
+        body = gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+    t2 = time.perf_counter()
+
+    resp = Response(body, status=status, mimetype="application/json")
+    resp.headers["Vary"] = "Accept-Encoding"
+    if compressed:
+        resp.headers["Content-Encoding"] = "gzip"
+
+    with _lock:
+        _stats["responses"]   += 1
+        _stats["compressed"]  += int(compressed)
+        _stats["bytes_json"]  += size
+        _stats["bytes_wire"]  += len(body)
+        _stats["encode_ms"]   += (t1 - t0) * 1000
+        _stats["compress_ms"] += (t2 - t1) * 1000
+    return resp
+
+
+def stats() -> dict:
+    with _lock:
+        out = dict(_stats)
+    out["encoder"]     = "orjson" if orjson is not None else "json"
+    out["encode_ms"]   = round(out["encode_ms"], 2)
+    out["compress_ms"] = round(out["compress_ms"], 2)
+    return out
@@ -3,10 +3,14 @@
   safety_filter.py — OPTIMIZED
   1. is_emergency()           → detects life-threatening situations
   2. has_restricted_content() → catches unsafe AI outputs
-  3. detect_emotional_state() → detects user distress
+  3. RestrictedContentScanner → same check, fed chunk by chunk
+                                while the model is still generating
+  4. detect_emotional_state() → detects user distress
 ============================================================
 """
 
+from collections import deque
+
 # ── Emergency keywords (expanded — Roman Urdu + English) ──
 EMERGENCY_KEYWORDS = [
     # Cardiac
@@ -82,6 +86,75 @@ def has_restricted_content(response: str) -> bool:
     return any(word in response_lower for word in RESTRICTED_OUTPUT_WORDS)
 
 
+# ── Incremental scanner (Aho-Corasick over RESTRICTED_OUTPUT_WORDS) ──
+def _build_automaton(phrases):
+    goto, fail, out = [{}], [0], [None]
+    for phrase in phrases:
+        state = 0
+        for ch in phrase:
+            if ch not in goto[state]:
+                goto.append({})
+                fail.append(0)
+                out.append(None)
+                goto[state][ch] = len(goto) - 1
+            state = goto[state][ch]
+        out[state] = phrase
+
+    # Breadth-first fill of failure links; a state also "outputs" whatever
+    # its failure state outputs, so "take 500" inside "...take 500 mg" still fires.
+    queue = deque(goto[0].values())   # depth-1 states keep fail = root
+    while queue:
+        state = queue.popleft()
+        for ch, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[nxt] = goto[f].get(ch, 0)
+            if out[nxt] is None:
+                out[nxt] = out[fail[nxt]]
+    return goto, fail, out
+
+
+_GOTO, _FAIL, _OUT = _build_automaton(RESTRICTED_OUTPUT_WORDS)
+
+
+class RestrictedContentScanner:
+    """
+    Streaming version of has_restricted_content(). Feed model output as it
+    arrives; feed() returns True as soon as any restricted phrase completes,
+    even if it is split across chunks, so the caller can stop generating.
+
+        scanner = RestrictedContentScanner()
+        for chunk in stream:
+            if scanner.feed(chunk):
+                break
+    """
+
+    def __init__(self):
+        self._state   = 0
+        self.violated = False
+        self.match    = None   # the phrase that fired
+        self.chars    = 0      # characters scanned so far
+
+    def feed(self, chunk: str) -> bool:
+        if self.violated or not chunk:
+            return self.violated
+        goto, fail, out = _GOTO, _FAIL, _OUT
+        state = self._state
+        for ch in chunk.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state] is not None:
+                self.violated = True
+                self.match    = out[state]
+                break
+        self._state = state
+        self.chars += len(chunk)
+        return self.violated
+
+
 def detect_emotional_state(message: str) -> str:
     """
     Returns emotional state:
@@ -0,0 +1,132 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — session_store.py
+  Server-side conversation memory, safe under threaded
+  gunicorn workers
+  1. turn()        → per-session lock held for a whole chat
+                     turn (read history → LLM → save), so two
+                     quick messages from one session run one
+                     after the other; different sessions run
+                     in parallel
+  2. history()     → copy of the session's turns
+  3. append_turn() → user + assistant message, trimmed to
+                     MAX_HISTORY turns
+  4. cleanup()     → drops sessions idle for SESSION_TTL
+                     (never one with a turn in progress)
+  Every mutation of a session happens under one of STRIPES
+  locks picked by hash(session_id). Sessions are per worker
+  process (gunicorn forks).
+============================================================
+"""
+
+import threading, time
+from contextlib import contextmanager
+
+from modules import memdiag
+
+SESSION_TTL = 1800   # 30 minutes
+MAX_HISTORY = 10     # keep last 10 turns
+STRIPES     = 64
+
+
+class TurnBusy(Exception):
+    """The session's previous message is still being answered past the wait budget."""
+
+
+_sessions = {}   # session_id → {"history": [...], "last_active": t}
+_turns    = {}   # session_id → [turn lock, holders + waiters]
+_stripes  = [threading.Lock() for _ in range(STRIPES)]
+_stats    = {"turns": 0, "waited": 0, "busy": 0}
+_stats_lock = threading.Lock()
+memdiag.track("sessions", lambda: _sessions)
+
+
+def _stripe(session_id):
+    return _stripes[hash(session_id) % STRIPES]
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+@contextmanager
+def turn(session_id, timeout=None):
+    """
+    Serialise chat turns of one session. Waits up to `timeout` seconds
+    (None = no limit) for the session's previous turn, else raises
+    TurnBusy. Requests without a session_id share no history and never wait.
+    """
+    if not session_id:
+        yield
+        return
+    stripe = _stripe(session_id)
+    with stripe:
+        entry = _turns.get(session_id)
+        if entry is None:
+            entry = _turns[session_id] = [threading.Lock(), 0]
+        entry[1] += 1
+    try:
+        lock = entry[0]
+        if not lock.acquire(blocking=False):
+            _count("waited")
+            if not lock.acquire(timeout=-1 if timeout is None else max(0.0, timeout)):
+                _count("busy")
+                raise TurnBusy(session_id)
+        try:
+            _count("turns")
+            yield
+        finally:
+            lock.release()
+    finally:
+        with stripe:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _turns.pop(session_id, None)
+
+
+def history(session_id) -> list:
+    if not session_id:
+        return []
+    with _stripe(session_id):
+        s = _sessions.get(session_id)
+        return list(s["history"]) if s else []
+
+
+def append_turn(session_id, user_msg, assistant_msg):
+    if not session_id:
+        return
+    with _stripe(session_id):
+        s = _sessions.get(session_id)
+        if s is None:
+            s = _sessions[session_id] = {"history": [], "last_active": time.time()}
+        s["history"] += [{"role": "user",      "content": user_msg},
+                         {"role": "assistant", "content": assistant_msg}]
+        s["history"] = s["history"][-(MAX_HISTORY * 2):]
+        s["last_active"] = time.time()
+
+
+def clear(session_id):
+    if session_id:
+        with _stripe(session_id):
+            _sessions.pop(session_id, None)
+
+
+def cleanup(now=None):
+    now = now or time.time()
+    # list() copies the keys in one step, so inserts from other threads
+    # cannot break the iteration; each candidate is re-checked under its stripe
+    for session_id in list(_sessions):
+        with _stripe(session_id):
+            s = _sessions.get(session_id)
+            if s and now - s["last_active"] > SESSION_TTL and session_id not in _turns:
+                del _sessions[session_id]
+
+
+def count() -> int:
+    return len(_sessions)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return {**_stats, "active": len(_sessions), "turns_in_progress": len(_turns)}
@@ -0,0 +1,132 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — smalltalk.py
+  Template replies for greetings / thanks / goodbyes, so
+  general_chat messages never reach the LLM
+  1. reply()  → English or Roman Urdu template, or None when
+                the message carries anything beyond small
+                talk (then the normal LLM path answers it)
+  2. stats()  → fast-path counters for GET /api/usage
+  SMALLTALK_FAST_PATH=0 sends everything to the LLM again.
+============================================================
+"""
+
+import os, random, re, threading
+
+FAST_PATH_ENABLED = os.getenv("SMALLTALK_FAST_PATH", "1") != "0"
+
+# category → phrases (matched on word boundaries, longest first)
+PHRASES = {
+    "salam"      : ["assalam o alaikum", "assalamualaikum", "assalam alaikum", "asalam o alaikum",
+                    "salam alaikum", "assalam", "asalam", "salam", "aoa"],
+    "greeting"   : ["good morning", "good afternoon", "good evening", "subha bakhair",
+                    "hello", "hey", "hi"],
+    "how_are_you": ["how are you", "how r u", "kaise ho", "kaisay ho", "kese ho", "kya haal hai",
+                    "kya haal", "theek ho", "kaisa chal raha hai", "kaisa chal raha",
+                    "what's up", "whats up", "wassup"],
+    "thanks"     : ["thank you so much", "thank you", "thanks a lot", "thanks", "thx",
+                    "shukriya", "bohat shukriya", "jazakallah khair", "jazakallah"],
+    "bye"        : ["allah hafiz", "khuda hafiz", "goodbye", "good night", "shab bakhair",
+                    "bye bye", "bye"],
+}
+
+# Words allowed around the phrases without making it a real question
+FILLER = {
+    "ji", "jee", "sir", "madam", "doctor", "dr", "bhai", "dost", "aap", "ap", "app", "tum",
+    "you", "too", "u", "there", "dear", "ok", "okay", "acha", "achha", "very", "much",
+    "so", "a", "lot", "bohat", "bahut", "and", "aur", "sehatmand", "ai", "bot", "again",
+    "sahab", "sahib", "saab",
+}
+
+ROMAN_URDU_WORDS = {
+    "salam", "assalam", "asalam", "alaikum", "assalamualaikum", "aoa", "kaise", "kaisay", "kese",
+    "kya", "haal", "hai", "theek", "ho", "kaisa", "chal", "raha", "shukriya", "jazakallah",
+    "khair", "khuda", "allah", "hafiz", "subha", "shab", "bakhair", "ji", "jee", "bhai",
+    "aap", "ap", "tum", "acha", "achha", "bohat", "bahut", "aur", "dost", "sahab", "sahib", "saab",
+}
+
+TEMPLATES = {
+    "salam": {
+        "en": ["Walaikum assalam! I'm SehatMand AI. How can I help you with your health today?"],
+        "ur": ["Walaikum assalam! Main SehatMand AI hoon. Aaj main aapki sehat ke hawale se kya madad kar sakta hoon?"],
+    },
+    "greeting": {
+        "en": ["Hello! I'm SehatMand AI. Tell me what's bothering you, or ask me any health question.",
+               "Hi there! How can I help you with your health today?"],
+        "ur": ["Assalam o alaikum! Main SehatMand AI hoon. Batayein, aapki kya madad kar sakta hoon?"],
+    },
+    "how_are_you": {
+        "en": ["I'm doing well, thank you for asking! How are you feeling today? Is there anything health-related I can help with?"],
+        "ur": ["Main theek hoon, poochne ka shukriya! Aap kaise hain? Sehat ke hawale se koi sawal ho to zaroor batayein."],
+    },
+    "thanks": {
+        "en": ["You're welcome! Take care of yourself, and feel free to ask if anything else comes up."],
+        "ur": ["Koi baat nahi! Apna khayal rakhiye, aur koi aur sawal ho to zaroor poochiye."],
+    },
+    "bye": {
+        "en": ["Goodbye! Take care, and remember — if your symptoms get worse, please see a doctor."],
+        "ur": ["Allah Hafiz! Apna khayal rakhiye — agar tabiyat zyada kharab ho to doctor ko zaroor dikhayein."],
+    },
+}
+
+# Salam + question etc. → answer the most specific part
+CATEGORY_ORDER = ["how_are_you", "thanks", "bye", "salam", "greeting"]
+
+_PATTERNS = {
+    cat: re.compile(r"\b(" + "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)) + r")\b")
+    for cat, phrases in PHRASES.items()
+}
+
+_lock  = threading.Lock()
+_stats = {"answered": 0, "fell_through": 0, "by_category": {}, "by_language": {"en": 0, "ur": 0}}
+
+
+def _normalize(message):
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z' ]+", " ", message.lower())).strip()
+
+
+def detect_language(text: str) -> str:
+    """'ur' for Roman Urdu, 'en' otherwise — word-list vote, English wins ties."""
+    words = text.split()
+    ur = sum(w in ROMAN_URDU_WORDS for w in words)
+    return "ur" if ur * 2 > len(words) else "en"
+
+
+def classify(message: str):
+    """Small-talk category, or None if anything else is in the message."""
+    text = _normalize(message)
+    if not text:
+        return None
+    found, rest = [], text
+    for cat in CATEGORY_ORDER:
+        if _PATTERNS[cat].search(rest):
+            found.append(cat)
+            rest = _PATTERNS[cat].sub(" ", rest)
+    if not found or any(w not in FILLER for w in rest.split()):
+        return None
+    return found[0]
+
+
+def reply(message: str):
+    """Template reply, or None when the LLM should answer."""
+    category = classify(message)
+    with _lock:
+        if category is None:
+            _stats["fell_through"] += 1
+            return None
+        lang = detect_language(_normalize(message))
+        _stats["answered"] += 1
+        _stats["by_category"][category] = _stats["by_category"].get(category, 0) + 1
+        _stats["by_language"][lang] += 1
+    return random.choice(TEMPLATES[category][lang])
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "enabled"     : FAST_PATH_ENABLED,
+            "answered"    : _stats["answered"],
+            "fell_through": _stats["fell_through"],
+            "by_category" : dict(_stats["by_category"]),
+            "by_language" : dict(_stats["by_language"]),
+        }
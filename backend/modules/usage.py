@@ -0,0 +1,122 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — usage.py
+  Token accounting for every Groq / Ollama call
+  1. CallUsage          → created per chat turn, knows the
+                          prompt parts (system, history,
+                          doctor context, user message)
+  2. CallUsage.record() → called by _call_groq/_call_ollama
+                          with the provider's usage numbers
+                          (or a local estimate when missing)
+  3. stats()            → totals per mode/intent and provider,
+                          for GET /api/usage
+  Counts are per worker process (gunicorn forks).
+============================================================
+"""
+
+import threading, time
+
+CHARS_PER_TOKEN = 4   # Llama 3 tokenizer averages ~4 chars/token on English text
+PARTS = ("system", "history", "doctor_context", "user")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def _empty():
+    return {
+        "calls"            : 0,
+        "prompt_tokens"    : 0,
+        "completion_tokens": 0,
+        "estimated_calls"  : 0,   # provider did not report usage
+        "latency_ms"       : 0.0,
+        "prompt_parts"     : dict.fromkeys(PARTS, 0),
+    }
+
+
+_lock        = threading.Lock()
+_by_route    = {}   # "mode/intent" → totals
+_by_provider = {}   # "groq" / "ollama" → totals
+_started_at  = time.time()
+
+
+class CallUsage:
+    """Prompt breakdown of one chat turn; collects one record per provider call."""
+
+    def __init__(self, mode, intent, system, history, doctor_context, user_message):
+        self.mode   = mode
+        self.intent = intent or "general"
+        self.parts  = {
+            "system"        : estimate_tokens(system),
+            "history"       : sum(estimate_tokens(m["content"]) for m in history),
+            "doctor_context": estimate_tokens(doctor_context),
+            "user"          : estimate_tokens(user_message),
+        }
+        self.calls = []
+
+    def record(self, provider, prompt_tokens, completion_tokens, completion_text, latency_ms):
+        """Token counts may be None — then the local estimate is used."""
+        estimated = prompt_tokens is None or completion_tokens is None
+        if prompt_tokens is None:
+            prompt_tokens = sum(self.parts.values())
+        if completion_tokens is None:
+            completion_tokens = estimate_tokens(completion_text)
+        call = {
+            "provider"         : provider,
+            "prompt_tokens"    : int(prompt_tokens),
+            "completion_tokens": int(completion_tokens),
+            "estimated"        : estimated,
+            "latency_ms"       : latency_ms,
+        }
+        self.calls.append(call)
+        _add(f"{self.mode}/{self.intent}", provider, call, self._attribute(call["prompt_tokens"]))
+        print(f"[Usage] {provider} {self.mode}/{self.intent}: "
+              f"prompt={call['prompt_tokens']} completion={call['completion_tokens']}"
+              f"{' (estimated)' if estimated else ''}")
+
+    def _attribute(self, prompt_tokens):
+        # Split the provider's prompt total across the parts in proportion to
+        # their estimates, so the parts add up to what was actually billed.
+        est = sum(self.parts.values())
+        if not est:
+            return dict.fromkeys(PARTS, 0)
+        return {p: round(prompt_tokens * n / est) for p, n in self.parts.items()}
+
+
+def _add(route, provider, call, parts):
+    with _lock:
+        for table, key in ((_by_route, route), (_by_provider, provider)):
+            t = table.setdefault(key, _empty())
+            t["calls"]             += 1
+            t["prompt_tokens"]     += call["prompt_tokens"]
+            t["completion_tokens"] += call["completion_tokens"]
+            t["estimated_calls"]   += int(call["estimated"])
+            t["latency_ms"]        += call["latency_ms"]
+            for p, n in parts.items():
+                t["prompt_parts"][p] += n
+
+
+def _summary(t):
+    calls = t["calls"] or 1
+    return {
+        **t,
+        "prompt_parts"         : dict(t["prompt_parts"]),
+        "latency_ms"           : round(t["latency_ms"], 1),
+        "avg_prompt_tokens"    : round(t["prompt_tokens"] / calls),
+        "avg_completion_tokens": round(t["completion_tokens"] / calls),
+        "avg_latency_ms"       : round(t["latency_ms"] / calls, 1),
+        "prompt_share"         : {p: round(n / (t["prompt_tokens"] or 1), 3)
+                                  for p, n in t["prompt_parts"].items()},
+    }
+
+
+def stats() -> dict:
+    with _lock:
+        routes    = {k: _summary(v) for k, v in _by_route.items()}
+        providers = {k: _summary(v) for k, v in _by_provider.items()}
+    return {
+        "since"      : int(_started_at),
+        "by_route"   : routes,
+        "by_provider": providers,
+    }
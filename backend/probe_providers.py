@@ -0,0 +1,277 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — Provider latency probe
+  Runs a fixed suite of SehatMand prompts (the real
+  USER_SYSTEM / DOCTOR_SYSTEM) against each provider/model
+  and measures, per concurrency level:
+    time to first token, tokens per second, total latency
+    (p50 / p95), aggregate throughput and errors
+
+USAGE:
+  python probe_providers.py                                  # groq:<GROQ_MODEL> + ollama:<OLLAMA_MODEL>
+  python probe_providers.py --target groq:llama-3.1-8b-instant \\
+                            --target groq:llama-3.3-70b-versatile \\
+                            --target ollama:llama3 --target ollama:llama3.2:3b
+  python probe_providers.py --concurrency 1,4,8 --rounds 2 --json probe.json
+  python probe_providers.py --stub                           # local stand-in servers (CI)
+
+--stub starts fake Groq (OpenAI-style SSE) and Ollama
+(NDJSON) servers in-process, with --stub-ttft / --stub-tps
+shaping their replies, so the probe itself can run in CI
+without API keys or a GPU. --groq-url / --ollama-url point
+the probe at any other stand-in. Exits 1 when a target
+answered none of its calls.
+============================================================
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import requests
+from groq import Groq
+
+from modules.llama_service import USER_SYSTEM, DOCTOR_SYSTEM, GROQ_API_KEY, GROQ_MODEL, OLLAMA_URL, OLLAMA_MODEL
+from modules.usage import estimate_tokens
+
+# (name, system, message) — one per kind of traffic the API sees
+SUITE = [
+    ("user_general",    USER_SYSTEM,   "I have had a mild headache and runny nose since yesterday, what should I do?"),
+    ("user_roman_urdu", USER_SYSTEM,   "mujhe 3 din se bukhar hai aur gala kharab hai, kya karun?"),
+    ("user_emotional",  USER_SYSTEM,   "I feel very anxious and lonely these days, I can't sleep"),
+    ("user_specialist", USER_SYSTEM,   "mujhe skin par rash hai, kis doctor ko dikhaun?\n\n[Doctor List]\n"
+                                       "Dermatologist doctors in Karachi:\n"
+                                       "1. Dr Sana Khan | Liaquat National Hospital | Phone: 923001112223 | PMDC: 54321-P"),
+    ("doctor_clinical", DOCTOR_SYSTEM, "Patient has had a productive cough and fever for 5 days, 45 year old smoker"),
+    ("doctor_referral", DOCTOR_SYSTEM, "I keep getting chest tightness when I climb stairs"),
+]
+
+
+# ── Provider calls (streamed, timed) ──────────────────────
+def _groq_call(client, model, system, message, max_tokens):
+    t0, first, parts, usage = time.perf_counter(), None, [], None
+    stream = client.chat.completions.create(
+        model=model, temperature=0.5, max_tokens=max_tokens, stream=True,
+        messages=[{"role": "system", "content": system}, {"role": "user", "content": message}],
+    )
+    for chunk in stream:
+        usage = (getattr(chunk, "usage", None)
+                 or getattr(getattr(chunk, "x_groq", None), "usage", None) or usage)
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            first = first or time.perf_counter()
+            parts.append(delta)
+    return t0, first, "".join(parts), usage.completion_tokens if usage else None
+
+
+def _ollama_call(url, model, system, message, max_tokens):
+    t0, first, parts, data = time.perf_counter(), None, [], {}
+    r = requests.post(url, stream=True, timeout=300, json={
+        "model": model, "system": system, "prompt": f"User: {message}", "stream": True,
+        "options": {"temperature": 0.5, "num_predict": max_tokens, "num_ctx": 2048},
+    })
+    r.raise_for_status()
+    with r:
+        for line in r.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            if data.get("response"):
+                first = first or time.perf_counter()
+                parts.append(data["response"])
+            if data.get("done"):
+                break
+    return t0, first, "".join(parts), data.get("eval_count")
+
+
+def _one(call, name, system, message, max_tokens):
+    try:
+        t0, first, text, tokens = call(system, message, max_tokens)
+    except Exception as e:
+        return {"prompt": name, "error": str(e)[:200]}
+    done = time.perf_counter()
+    if first is None or not text:
+        return {"prompt": name, "error": "empty reply"}
+    tokens = tokens or estimate_tokens(text)
+    gen    = done - first
+    return {
+        "prompt"    : name,
+        "ttft_ms"   : round((first - t0) * 1000, 1),
+        "total_ms"  : round((done - t0) * 1000, 1),
+        "tokens"    : tokens,
+        "tok_per_s" : round(tokens / gen, 1) if gen > 0 else None,
+    }
+
+
+def _pct(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else None
+
+
+def _summary(calls, wall):
+    ok = [c for c in calls if "error" not in c]
+    row = {"calls": len(calls), "errors": len(calls) - len(ok)}
+    for key in ("ttft_ms", "total_ms"):
+        values = [c[key] for c in ok]
+        row[f"{key[:-3]}_p50_ms"] = _pct(values, 50)
+        row[f"{key[:-3]}_p95_ms"] = _pct(values, 95)
+    rates = [c["tok_per_s"] for c in ok if c["tok_per_s"]]
+    row["tok_per_s_p50"]      = round(statistics.median(rates), 1) if rates else None
+    row["throughput_tok_s"]   = round(sum(c["tokens"] for c in ok) / wall, 1) if wall > 0 else None
+    return row
+
+
+def probe(target, call, levels, rounds, max_tokens):
+    rows = []
+    for level in levels:
+        jobs = [(name, system, message) for _ in range(rounds) for name, system, message in SUITE]
+        # Keep at least `level` calls in flight: repeat the suite until it fills the pool
+        while len(jobs) < level:
+            jobs += [(name, system, message) for name, system, message in SUITE]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            calls = list(pool.map(lambda j: _one(call, *j, max_tokens), jobs))
+        row = {"target": target, "concurrency": level,
+               **_summary(calls, time.perf_counter() - t0), "samples": calls}
+        rows.append(row)
+        print(f"{target:<38}{level:>4}{row['calls']:>6}{row['errors']:>5}"
+              f"{_fmt(row['ttft_p50_ms'])}{_fmt(row['ttft_p95_ms'])}"
+              f"{_fmt(row['total_p50_ms'])}{_fmt(row['total_p95_ms'])}"
+              f"{_fmt(row['tok_per_s_p50'])}{_fmt(row['throughput_tok_s'])}")
+    return rows
+
+
+def _fmt(v):
+    return f"{'—' if v is None else round(v):>10}"
+
+
+# ── Local stand-ins (--stub) ──────────────────────────────
+STUB_REPLY = ("Rest, drink plenty of fluids and take paracetamol for the fever. "
+              "If it lasts more than three days or you have trouble breathing, see a doctor. ").split(" ")
+
+
+def start_stubs(ttft, tps):
+    """Fake Groq + Ollama on free local ports → (groq base_url, ollama generate URL)."""
+    class Stub(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _words(self, max_tokens):
+            time.sleep(ttft)
+            for i, word in enumerate(STUB_REPLY[:max_tokens]):
+                if i:
+                    time.sleep(1 / tps)
+                yield word + " "
+
+        def _chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            if self.path.endswith("/chat/completions"):
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                n = 0
+                for word in self._words(body.get("max_tokens") or 64):
+                    n += 1
+                    self._chunk(b"data: " + json.dumps({
+                        "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                        "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+                    }).encode() + b"\n\n")
+                self._chunk(b"data: " + json.dumps({
+                    "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "x_groq": {"id": "stub", "usage": {"prompt_tokens": 1, "completion_tokens": n,
+                                                       "total_tokens": n + 1}},
+                }).encode() + b"\n\ndata: [DONE]\n\n")
+            else:
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                n = 0
+                for word in self._words(body.get("options", {}).get("num_predict") or 64):
+                    n += 1
+                    self._chunk(json.dumps({"model": body["model"], "response": word, "done": False}).encode() + b"\n")
+                self._chunk(json.dumps({"model": body["model"], "response": "", "done": True,
+                                        "eval_count": n}).encode() + b"\n")
+            self._chunk(b"")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    server.daemon_threads = True
+    server.handle_error   = lambda request, address: None   # clients hanging up on keep-alive sockets
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🧪 Stub providers on {base} (ttft {ttft}s, {tps} tok/s)")
+    return base, f"{base}/api/generate"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure TTFT, tokens/s and latency per LLM provider/model")
+    parser.add_argument("--target", action="append",
+                        help="provider:model (groq:… / ollama:…), repeatable")
+    parser.add_argument("--concurrency", default="1,4", help="comma-separated concurrency levels")
+    parser.add_argument("--rounds",      type=int, default=1, help="suite repetitions per level")
+    parser.add_argument("--max-tokens",  type=int, default=300)
+    parser.add_argument("--json",        help="write results (with per-call samples) to this file")
+    parser.add_argument("--groq-url",    default=os.getenv("GROQ_BASE_URL"), help="Groq-compatible base URL")
+    parser.add_argument("--ollama-url",  default=OLLAMA_URL, help="Ollama /api/generate URL")
+    parser.add_argument("--stub",        action="store_true", help="probe local stand-in servers")
+    parser.add_argument("--stub-ttft",   type=float, default=0.2)
+    parser.add_argument("--stub-tps",    type=float, default=200.0)
+    args = parser.parse_args()
+
+    groq_key = GROQ_API_KEY
+    if args.stub:
+        args.groq_url, args.ollama_url = start_stubs(args.stub_ttft, args.stub_tps)
+        groq_key = "stub"
+    targets = args.target or ([f"groq:{GROQ_MODEL}"] if groq_key else []) + [f"ollama:{OLLAMA_MODEL}"]
+    levels  = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    calls = {}
+    for target in targets:
+        provider, _, model = target.partition(":")
+        if provider == "groq":
+            if not groq_key:
+                print(f"⚠️  {target}: GROQ_API_KEY not set — skipped")
+                continue
+            client = Groq(api_key=groq_key, base_url=args.groq_url, max_retries=0)
+            calls[target] = lambda s, m, n, c=client, model=model: _groq_call(c, model, s, m, n)
+        elif provider == "ollama":
+            calls[target] = lambda s, m, n, model=model: _ollama_call(args.ollama_url, model, s, m, n)
+        else:
+            parser.error(f"unknown provider in {target!r} (use groq:<model> or ollama:<model>)")
+
+    print(f"{len(SUITE)} prompts × {args.rounds} round(s), max_tokens {args.max_tokens}\n")
+    print(f"{'target':<38}{'conc':>4}{'calls':>6}{'err':>5}{'ttft p50':>10}{'ttft p95':>10}"
+          f"{'total p50':>10}{'total p95':>10}{'tok/s p50':>10}{'agg tok/s':>10}")
+    print("-" * 113)
+    results, dead = [], []
+    for target, call in calls.items():
+        rows = probe(target, call, levels, args.rounds, args.max_tokens)
+        results += rows
+        if all(r["errors"] == r["calls"] for r in rows):
+            dead.append(target)
+            print(f"   ❌ {target}: {rows[0]['samples'][0]['error']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"suite": [name for name, _, _ in SUITE], "max_tokens": args.max_tokens,
+                       "rounds": args.rounds, "stub": args.stub, "results": results}, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+    sys.exit(1 if dead or not calls else 0)
+
+
+if __name__ == "__main__":
+    main()
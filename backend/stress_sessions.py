@@ -0,0 +1,139 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — Session stress test
+  Fires every turn of many sessions at POST /api/chat at
+  once from a thread pool (like a threaded gunicorn worker),
+  while another thread churns and cleans up the session
+  table, then checks every session:
+    - no lost turns     (all --turns saved)
+    - no interleaving   (user / assistant alternate and each
+                         reply answers the message before it)
+    - serialised turns  (turn k saw exactly k earlier turns)
+
+USAGE:
+  python stress_sessions.py
+  python stress_sessions.py --sessions 200 --turns 10 --threads 64
+  python stress_sessions.py --no-turn-lock    # shows the races the lock prevents
+
+The LLM call is replaced by a reply that echoes the message
+after a random 0–--delay-ms pause, so no provider is needed.
+Exits 1 when any check fails.
+============================================================
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Before app import: no rate limits, no Ollama preload for the harness
+for key in ("RATE_LIMIT_SESSION_PER_MIN", "RATE_LIMIT_SESSION_BURST",
+            "RATE_LIMIT_IP_PER_MIN", "RATE_LIMIT_IP_BURST"):
+    os.environ[key] = "1000000"
+os.environ.setdefault("OLLAMA_PRELOAD", "0")
+
+import app as api
+from modules import session_store as sessions
+
+_seen      = {}   # session_id → [history length seen by each turn]
+_seen_lock = threading.Lock()
+
+
+def fake_llm(delay_ms):
+    def ask(message, history=None, **kwargs):
+        session_id = message.split()[-1].rstrip("?")
+        with _seen_lock:
+            _seen.setdefault(session_id, []).append(len(history or []))
+        time.sleep(random.uniform(0, delay_ms) / 1000)
+        return f"reply to {message}"
+    return ask
+
+
+def churn(stop):
+    """Unrelated sessions coming and going + cleanup, while the test runs."""
+    n = 0
+    while not stop.is_set():
+        sid = f"churn-{n % 500}"
+        sessions.append_turn(sid, "hi", "hello")
+        if n % 3 == 0:
+            sessions.clear(sid)
+        if n % 50 == 0:
+            sessions.cleanup()   # iterates the table while the chat threads insert
+        n += 1
+
+
+def check(session_ids, turns):
+    failures = []
+    for sid in session_ids:
+        hist = sessions.history(sid)
+        if len(hist) != 2 * turns:
+            failures.append(f"{sid}: {len(hist) // 2}/{turns} turns saved")
+            continue
+        for i in range(0, len(hist), 2):
+            user, bot = hist[i], hist[i + 1]
+            if user["role"] != "user" or bot["role"] != "assistant" or bot["content"] != f"reply to {user['content']}":
+                failures.append(f"{sid}: interleaved at turn {i // 2}")
+                break
+        seen = sorted(_seen.get(sid, []))
+        if seen != list(range(0, 2 * turns, 2)):
+            failures.append(f"{sid}: turns saw history lengths {seen}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the session layer with concurrent turns")
+    parser.add_argument("--sessions",     type=int, default=100)
+    parser.add_argument("--turns",        type=int, default=sessions.MAX_HISTORY,
+                        help=f"per session (≤ MAX_HISTORY={sessions.MAX_HISTORY} so nothing is trimmed)")
+    parser.add_argument("--threads",      type=int, default=32)
+    parser.add_argument("--delay-ms",     type=float, default=5.0)
+    parser.add_argument("--no-turn-lock", action="store_true")
+    args = parser.parse_args()
+    if args.turns > sessions.MAX_HISTORY:
+        parser.error("--turns must be ≤ MAX_HISTORY")
+
+    api.ask_user_mode = fake_llm(args.delay_ms)
+    if args.no_turn_lock:
+        sessions.turn = lambda session_id, timeout=None: nullcontext()
+    client = api.app.test_client()
+
+    session_ids = [f"stress{i}" for i in range(args.sessions)]
+    jobs = [(sid, k) for sid in session_ids for k in range(args.turns)]
+    random.shuffle(jobs)
+
+    def send(job):
+        sid, k = job
+        r = client.post("/api/chat", json={"message": f"please explain point {k} for {sid}?",
+                                           "mode": "user", "session_id": sid})
+        return r.status_code
+
+    stop = threading.Event()
+    churner = threading.Thread(target=churn, args=(stop,), daemon=True)
+    churner.start()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        codes = list(pool.map(send, jobs))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    churner.join()
+
+    failures = check(session_ids, args.turns)
+    bad      = [c for c in codes if c != 200]
+    print(f"\n{len(jobs)} turns / {args.sessions} sessions / {args.threads} threads in {elapsed:.1f}s "
+          f"| non-200: {len(bad)} | {sessions.stats()}")
+    for line in failures[:20]:
+        print(f"   ❌ {line}")
+    if failures or bad:
+        print(f"❌ {len(failures)} session(s) failed")
+        sys.exit(1)
+    print("✅ No lost or interleaved history")
+
+
+if __name__ == "__main__":
+    main()
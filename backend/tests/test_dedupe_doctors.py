@@ -0,0 +1,55 @@
+"""
+Stable doctor IDs from dedupe_doctors.dedupe()
+  python -m pytest backend/tests
+"""
+
+import hashlib
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+import dedupe_doctors  # noqa: E402
+
+
+def _row(name, hospital, phone="", pmdc=""):
+    return {"name": name, "hospital_name": hospital, "specialization": "General Physician",
+            "city": "Karachi", "phone": phone or None, "pmdc": pmdc or None}
+
+
+def _expected(kind, *parts):
+    return "dr_" + hashlib.sha1(":".join((kind,) + parts).encode("utf-8")).hexdigest()[:16]
+
+
+def test_ids_without_pmdc_use_phone_then_name():
+    frame = pd.DataFrame([
+        _row("Dr. Ayesha Khan", "Ziauddin Hospital", phone="0300-1234567"),
+        _row("Dr. Imran Shah",  "Aga Khan Hospital"),
+        _row("Dr. Sara Malik",  "Liaquat National Hospital", phone="0321-7654321", pmdc="12345-S"),
+    ])
+    out, _ = dedupe_doctors.dedupe(frame, verbose=False)
+    ids = dict(zip(out["name"], out["doctor_id"]))
+
+    def keys(name, hospital):
+        hosp = dedupe_doctors.phonetic_key(dedupe_doctors.hospital_text(hospital))
+        return dedupe_doctors.phonetic_key(name), hosp
+
+    name_key, hosp_key = keys("Dr. Ayesha Khan", "Ziauddin Hospital")
+    assert ids["Dr. Ayesha Khan"] == _expected("phone", "3001234567", name_key, hosp_key)
+
+    name_key, hosp_key = keys("Dr. Imran Shah", "Aga Khan Hospital")
+    assert ids["Dr. Imran Shah"] == _expected("name", "karachi", name_key, hosp_key)
+
+    _, hosp_key = keys("Dr. Sara Malik", "Liaquat National Hospital")
+    assert ids["Dr. Sara Malik"] == _expected("pmdc", "12345S", hosp_key)
+
+
+def test_sample_csv_ids_are_unique_without_suffixes():
+    frame = pd.read_csv(BACKEND / "cleaned_doctors.csv", dtype=str)
+    frame = frame.drop(columns="doctor_id", errors="ignore")
+    out, _ = dedupe_doctors.dedupe(frame, verbose=False)
+    assert out["doctor_id"].is_unique
+    assert not out["doctor_id"].str.contains("-").any()
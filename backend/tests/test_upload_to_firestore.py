@@ -0,0 +1,141 @@
+"""
+Manifest-based Firestore sync in upload_to_firestore.py, against an
+in-memory stand-in for the Firestore client
+  python -m pytest backend/tests
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+import upload_to_firestore as up  # noqa: E402
+
+
+class FakeDB:
+    """.collection(name).document(id) + .batch() with set / delete / commit."""
+
+    def __init__(self, fail_on=None):
+        self.store   = {}          # (collection, doc_id) → data
+        self.fail_on = fail_on     # doc_id whose batch raises on commit
+        self.lock    = threading.Lock()
+
+    def collection(self, name):
+        return _Collection(name)
+
+    def batch(self):
+        return _Batch(self)
+
+
+class _Collection:
+    def __init__(self, name):
+        self.name = name
+
+    def document(self, doc_id):
+        return (self.name, doc_id)
+
+
+class _Batch:
+    def __init__(self, db):
+        self.db, self.ops = db, []
+
+    def set(self, ref, data):
+        self.ops.append(("set", ref, data))
+
+    def delete(self, ref):
+        self.ops.append(("delete", ref, None))
+
+    def commit(self):
+        if any(ref[1] == self.db.fail_on for _, ref, _ in self.ops):
+            raise ValueError("permission denied")   # not retryable
+        with self.db.lock:
+            for op, ref, data in self.ops:
+                if op == "set":
+                    self.db.store[ref] = data
+                else:
+                    self.db.store.pop(ref, None)
+
+
+def _docs(*names, city="lahore"):
+    frame = pd.DataFrame([{"doctor_id": f"dr_{n}", "name": n, "hospital_name": "mayo hospital",
+                           "specialization": "dentist", "city": city, "phone": None, "pmdc": None}
+                          for n in names])
+    return up.build_documents(frame).get(city, {})
+
+
+def _sync(db, docs, manifest, **kwargs):
+    return up.sync_doctors(db, docs, str(manifest), "cities/lahore/doctors", workers=2, **kwargs)
+
+
+def _ids(db):
+    return sorted(doc_id for _, doc_id in db.store)
+
+
+def test_upserts_then_only_changes(tmp_path):
+    db, manifest = FakeDB(), tmp_path / "upload_manifest_lahore.json"
+    assert _sync(db, _docs("a", "b"), manifest)["upserted"] == 2
+    assert _ids(db) == ["dr_a", "dr_b"]
+
+    result = _sync(db, _docs("a", "b", "c"), manifest)
+    assert (result["upserted"], result["skipped"]) == (1, 2)
+    assert set(up.load_manifest(manifest)) == {"dr_a", "dr_b", "dr_c"}
+
+
+def test_removed_documents_are_deleted(tmp_path):
+    db, manifest = FakeDB(), tmp_path / "upload_manifest_lahore.json"
+    _sync(db, _docs("a", "b"), manifest)
+    assert _sync(db, _docs("a"), manifest)["deleted"] == 1
+    assert _ids(db) == ["dr_a"]
+    assert list(up.load_manifest(manifest)) == ["dr_a"]
+
+
+def test_full_rewrites_everything_and_still_deletes(tmp_path):
+    db, manifest = FakeDB(), tmp_path / "upload_manifest_lahore.json"
+    _sync(db, _docs("a", "b"), manifest)
+    result = _sync(db, _docs("a"), manifest, full=True)
+    assert (result["upserted"], result["deleted"]) == (1, 1)
+    assert _ids(db) == ["dr_a"]
+    assert list(up.load_manifest(manifest)) == ["dr_a"]
+
+
+def test_failed_batch_leaves_its_manifest_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(up, "BATCH_SIZE", 1)
+    db, manifest = FakeDB(), tmp_path / "upload_manifest_lahore.json"
+    _sync(db, _docs("a", "b"), manifest)
+    before = up.load_manifest(manifest)
+
+    db.fail_on = "dr_b"
+    changed = {**_docs("a", "b"), "dr_a": {**_docs("a")["dr_a"], "phone": "923001234567"}}
+    changed["dr_b"] = {**changed["dr_b"], "phone": "923007654321"}
+    result = _sync(db, changed, manifest)
+    assert (result["upserted"], result["failed"]) == (1, 1)
+    after = up.load_manifest(manifest)
+    assert after["dr_b"] == before["dr_b"]            # retried on the next run
+    assert after["dr_a"] != before["dr_a"]
+
+    db.fail_on = "dr_a"
+    result = _sync(db, {}, manifest)                  # delete of dr_a fails
+    assert (result["deleted"], result["failed"]) == (1, 1)
+    assert list(up.load_manifest(manifest)) == ["dr_a"]
+
+
+def test_main_deletes_cities_with_no_rows_left(tmp_path, monkeypatch):
+    pattern = str(tmp_path / "upload_manifest_{city}.json")
+    db = FakeDB()
+    up.sync_doctors(db, _docs("a"), pattern.format(city="lahore"), "cities/lahore/doctors")
+    up.sync_doctors(db, _docs("b", city="karachi"), pattern.format(city="karachi"), "cities/karachi/doctors")
+    assert up.manifest_cities(pattern) == ["karachi", "lahore"]
+
+    csv = tmp_path / "cleaned_doctors.csv"   # Lahore has no rows left
+    pd.DataFrame([{"doctor_id": "dr_b", "name": "b", "hospital_name": "mayo hospital",
+                   "specialization": "dentist", "city": "karachi", "phone": "", "pmdc": ""}]).to_csv(csv, index=False)
+    monkeypatch.setattr(up, "connect", lambda: db)
+    for argv in (["--city", "lahore"], []):
+        monkeypatch.setattr(sys, "argv", ["upload_to_firestore.py", "--csv", str(csv), "--manifest", pattern, *argv])
+        up.main()
+        assert _ids(db) == ["dr_b"]
+        assert up.load_manifest(pattern.format(city="lahore")) == {}
@@ -0,0 +1,189 @@
+"""
+============================================================
+  SEHAT MAND PAKISTAN — Intent classifier training
+  Input : keyword maps in modules/intent_detector.py
+          (+ optional labelled chat logs, --data)
+  Output: intent_model.npz (modules/intent_classifier.py)
+
+USAGE:
+  python train_intent_classifier.py
+  python train_intent_classifier.py --data labelled.csv --epochs 300
+
+  labelled.csv columns: text, intent, specialty, clinical
+  (an empty column → the row is not used for that head;
+  write "none" for an explicit "no specialty" label)
+
+Training sentences are generated from the keyword maps with
+English and Roman Urdu carrier phrases, so the model starts
+out agreeing with the keyword rules but scores every
+specialty instead of stopping at the first dictionary hit.
+Real labelled messages (--data) are added on top and
+weighted higher. Enable in the API with
+INTENT_CLASSIFIER=intent_model.npz.
+============================================================
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from modules.intent_detector import (
+    CHAT_KEYWORDS, EMOTION_MAP, DOCTOR_REQUEST_PHRASES,
+    SPECIALIST_KEYWORDS, CLINICAL_SPECIALTY_MAP,
+)
+from modules.intent_classifier import IntentClassifier, featurize, softmax, DEFAULT_DIM, NONE_LABEL
+
+# ── Carrier phrases ───────────────────────────────────────
+SYMPTOM_TEMPLATES = [
+    "I have {kw}", "mujhe {kw} hai", "{kw} ho raha hai", "meri {kw} ki problem hai",
+    "I am suffering from {kw} since 3 days", "{kw} ka kya ilaj hai", "what should I do about {kw}",
+    "my mother has {kw}", "kal se {kw} hai kya karun", "is {kw} dangerous",
+    "{kw} bohat zyada hai", "how to treat {kw} at home",
+]
+REFERRAL_TEMPLATES = [
+    "{kw} ke liye {ask}", "{ask} for {kw}", "I have {kw}, {ask}", "mujhe {kw} hai {ask}",
+    "{kw} specialist chahiye", "{kw} ka doctor batao", "best doctor for {kw} in karachi",
+]
+EMOTION_TEMPLATES = [
+    "I feel {kw}", "main bohat {kw} hoon", "aaj kal {kw} feel kar raha hoon",
+    "I am so {kw} these days", "{kw} lag raha hai", "i have been feeling {kw} lately",
+]
+CHAT_TEMPLATES = ["{kw}", "{kw} ji", "{kw} doctor sahab", "{kw}!", "ok {kw}", "{kw} bhai"]
+GENERAL_NO_SPEC = [
+    "what is a healthy diet", "how much water should I drink", "kya roz walk karna zaroori hai",
+    "how many hours should I sleep", "vitamin d ke fayde", "is green tea good for health",
+    "how to lose weight safely", "exercise kab karni chahiye", "what are the benefits of fruit",
+]
+CLINICAL_TEMPLATES = [
+    "patient presents with {kw}", "{kw} for two days", "55 year old male with {kw}",
+    "history of {kw}, what next", "female 30 years {kw} and fever", "c/o {kw} since morning",
+    "management of {kw}", "{kw} with vomiting",
+]
+CLINICAL_NONE = [
+    "general checkup advice", "patient feels weak and tired", "routine follow up",
+    "mild fever and body ache", "what vaccines are due for adults", "weight loss plan",
+]
+
+
+def generate(seed=7, per_keyword=6):
+    """[(text, intent, specialty, clinical)] — None means 'not a label for that head'."""
+    rng, rows = random.Random(seed), []
+    asks = [p for p in DOCTOR_REQUEST_PHRASES if len(p.split()) > 1]
+
+    for spec, keywords in SPECIALIST_KEYWORDS.items():
+        for kw in keywords:
+            for tpl in rng.sample(SYMPTOM_TEMPLATES, min(per_keyword, len(SYMPTOM_TEMPLATES))):
+                rows.append((tpl.format(kw=kw), "general", spec, None))
+            for tpl in rng.sample(REFERRAL_TEMPLATES, min(per_keyword, len(REFERRAL_TEMPLATES))):
+                rows.append((tpl.format(kw=kw, ask=rng.choice(asks)), "specialist", spec, None))
+
+    for ask in DOCTOR_REQUEST_PHRASES:
+        rows.append((ask, "specialist", NONE_LABEL, None))
+        rows.append((f"{ask} please", "specialist", NONE_LABEL, None))
+
+    for emotion, keywords in EMOTION_MAP.items():
+        for kw in keywords:
+            for tpl in rng.sample(EMOTION_TEMPLATES, min(per_keyword, len(EMOTION_TEMPLATES))):
+                rows.append((tpl.format(kw=kw), "emotional", NONE_LABEL, None))
+
+    for kw in CHAT_KEYWORDS:
+        for tpl in CHAT_TEMPLATES:
+            rows.append((tpl.format(kw=kw), "general_chat", NONE_LABEL, None))
+
+    for text in GENERAL_NO_SPEC:
+        rows.append((text, "general", NONE_LABEL, None))
+
+    for spec, keywords in CLINICAL_SPECIALTY_MAP.items():
+        for kw in keywords:
+            for tpl in rng.sample(CLINICAL_TEMPLATES, min(per_keyword, len(CLINICAL_TEMPLATES))):
+                rows.append((tpl.format(kw=kw), None, None, spec))
+    for text in CLINICAL_NONE:
+        for _ in range(3):
+            rows.append((text, None, None, NONE_LABEL))
+
+    rng.shuffle(rows)
+    return rows
+
+
+def load_labelled(path):
+    import pandas as pd
+    df = pd.read_csv(path, dtype=str).fillna("")
+    # Empty → None: the row is masked out of that head (see _split / main)
+    return [(r["text"], r.get("intent") or None, r.get("specialty") or None,
+             r.get("clinical") or None) for _, r in df.iterrows()]
+
+
+# ── Training (softmax regression, full-batch Adam + L2) ───
+def train_head(X, y, labels, weights, epochs, lr=0.005, l2=1e-4):
+    n, dim = X.shape
+    L      = len(labels)
+    Y      = np.zeros((n, L), dtype=np.float32)
+    Y[np.arange(n), y] = 1.0
+    W, b   = np.zeros((dim, L), dtype=np.float32), np.zeros(L, dtype=np.float32)
+    mW, vW, mb, vb = (np.zeros_like(W), np.zeros_like(W), np.zeros_like(b), np.zeros_like(b))
+    w      = (weights / weights.sum())[:, None].astype(np.float32)
+
+    for t in range(1, epochs + 1):
+        P  = softmax(X @ W + b)
+        G  = (P - Y) * w
+        gW = X.T @ G + l2 * W
+        gb = G.sum(axis=0)
+        for p, g, m, v in ((W, gW, mW, vW), (b, gb, mb, vb)):
+            m *= 0.9;   m += 0.1 * g
+            v *= 0.999; v += 0.001 * g * g
+            p -= lr * (m / (1 - 0.9 ** t)) / (np.sqrt(v / (1 - 0.999 ** t)) + 1e-8)
+    return W, b
+
+
+def _split(rows, head_index, holdout, seed):
+    data = [(r[0], r[head_index]) for r in rows if r[head_index] is not None]
+    random.Random(seed).shuffle(data)
+    cut = int(len(data) * (1 - holdout))
+    return data[:cut], data[cut:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the hashed n-gram intent classifier")
+    parser.add_argument("--out",     default="intent_model.npz")
+    parser.add_argument("--data",    help="labelled CSV (text,intent,specialty,clinical)")
+    parser.add_argument("--dim",     type=int, default=DEFAULT_DIM)
+    parser.add_argument("--epochs",  type=int, default=200)
+    parser.add_argument("--holdout", type=float, default=0.15)
+    parser.add_argument("--seed",    type=int, default=7)
+    args = parser.parse_args()
+
+    rows = generate(args.seed)
+    real = load_labelled(args.data) if args.data else []
+    print(f"📂 {len(rows)} generated + {len(real)} labelled examples")
+
+    heads = {}
+    for head, idx in (("intent", 1), ("specialty", 2), ("clinical", 3)):
+        t0 = time.time()
+        train, test = _split(rows, idx, args.holdout, args.seed)
+        train      += [(r[0], r[idx]) for r in real if r[idx] is not None]
+        labels      = sorted({lbl for _, lbl in train} | {lbl for _, lbl in test})
+        index       = {lbl: i for i, lbl in enumerate(labels)}
+        X           = featurize([t for t, _ in train], args.dim)
+        y           = np.array([index[l] for _, l in train])
+        weights     = np.array([1.0] * (len(train) - sum(r[idx] is not None for r in real))
+                               + [3.0] * sum(r[idx] is not None for r in real))
+        W, b        = train_head(X, y, labels, weights, args.epochs)
+        heads[head] = {"labels": labels, "W": W, "b": b}
+
+        model = IntentClassifier({head: heads[head]}, args.dim)
+        pred  = model.predict_proba([t for t, _ in test], head)[head].argmax(axis=1) if test else []
+        acc   = np.mean([labels[p] == l for p, (_, l) in zip(pred, test)]) if test else float("nan")
+        print(f"   🧠 {head:<10} {len(labels):>2} labels | train {len(train):>5} | "
+              f"holdout acc {acc:.3f} | {time.time() - t0:.1f}s")
+
+    IntentClassifier(heads, args.dim).save(args.out)
+    print(f"💾 Saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
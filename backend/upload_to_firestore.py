@@ -2,7 +2,7 @@
 ============================================================
   SEHAT MAND PAKISTAN — Step 2: Firestore Upload
   Input : cleaned_doctors.csv
-  Upload: Firebase Firestore → 'doctors' collection
+  Upload: Firebase Firestore → cities/{city}/doctors
 ============================================================
 
 FOLDER STRUCTURE (keep all 3 files in same folder):
@@ -12,106 +12,267 @@ FOLDER STRUCTURE (keep all 3 files in same folder):
 
 INSTALL REQUIREMENTS:
   pip install firebase-admin pandas
+
+USAGE:
+  python upload_to_firestore.py              # sync only what changed
+  python upload_to_firestore.py --dry-run    # show the diff, write nothing
+  python upload_to_firestore.py --full       # rewrite every document (deletes still apply)
+  python upload_to_firestore.py --city lahore
+
+Each city is its own subcollection (cities/karachi/doctors, ...) with
+its own manifest (upload_manifest_<city>.json), so the API can load
+one city without reading the others.
+
+Only documents whose content hash differs from the manifest
+are written, documents that disappeared from the CSV are deleted
+(also for a city with no rows left, found by its manifest),
+and batches are committed in parallel (bounded by --workers) with
+exponential backoff when Firestore rate-limits us.
+
+Local testing: set FIRESTORE_EMULATOR_HOST=localhost:8080 (and
+FIREBASE_PROJECT_ID) to sync against the Firestore emulator instead
+of production. sync_doctors() only needs an object with
+.collection(name).document(id) and .batch() (set/delete/commit), so
+any local stand-in with that shape works too.
 ============================================================
 """
 
-import firebase_admin
-from firebase_admin import credentials, firestore
-import pandas as pd
-import math
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# ──────────────────────────────────────────────
-# STEP 1: Connect to Firebase
-# ──────────────────────────────────────────────
-print("🔥 Connecting to Firebase...")
+import pandas as pd
 
-cred = credentials.Certificate("serviceAccountKey.json")  # your downloaded key
-firebase_admin.initialize_app(cred)
+CSV_FILE      = "cleaned_doctors.csv"
+COLLECTION    = "cities/{city}/doctors"
+MANIFEST_FILE = "upload_manifest_{city}.json"
+BATCH_SIZE    = 400   # safe limit under Firestore's 500 writes per batch
+MAX_WORKERS   = int(os.getenv("UPLOAD_WORKERS", "8"))
+MAX_RETRIES   = 6
+
+# google.api_core exception names that mean "slow down and retry"
+RETRYABLE_ERRORS = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+                    "DeadlineExceeded", "Aborted", "InternalServerError"}
 
-db = firestore.client()
-print("✅ Firebase connected!\n")
 
 # ──────────────────────────────────────────────
-# STEP 2: Load cleaned CSV
+# Firebase connection
 # ──────────────────────────────────────────────
-print("📂 Loading cleaned_doctors.csv...")
-df = pd.read_csv("cleaned_doctors.csv")
+def connect():
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        from google.auth.credentials import AnonymousCredentials
+        from google.cloud import firestore as gc_firestore
+        project = os.getenv("FIREBASE_PROJECT_ID", "demo-sehatmand")
+        print(f"🧪 Using Firestore emulator at {os.environ['FIRESTORE_EMULATOR_HOST']} ({project})")
+        return gc_firestore.Client(project=project, credentials=AnonymousCredentials())
 
-# Replace NaN with None so Firestore accepts it
-df = df.where(pd.notnull(df), None)
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    print("🔥 Connecting to Firebase...")
+    cred = credentials.Certificate("serviceAccountKey.json")  # your downloaded key
+    firebase_admin.initialize_app(cred)
+    print("✅ Firebase connected!\n")
+    return firestore.client()
 
-print(f"   Total doctors to upload: {len(df)}\n")
 
 # ──────────────────────────────────────────────
-# STEP 3: Upload to Firestore in batches
-# Firestore allows max 500 writes per batch
+# CSV → documents
 # ──────────────────────────────────────────────
+def _doc_id(row) -> str:
+    # Stable doctor_id from dedupe_doctors.py; older CSVs fall back to the
+    # name (spaces → underscores), where namesakes overwrite each other
+    if row.get("doctor_id"):
+        return str(row["doctor_id"]).strip()
+    return str(row["name"]).strip().replace(" ", "_").replace("/", "_")
 
-BATCH_SIZE = 400  # safe limit under 500
-collection_ref = db.collection("doctors")
-
-total    = len(df)
-uploaded = 0
-failed   = 0
 
-print("⬆️  Starting upload to Firestore 'doctors' collection...")
-print("=" * 50)
+def _specialties(specialization) -> list:
+    return [s.strip() for s in str(specialization).lower().split(",") if s.strip()]
 
-for batch_start in range(0, total, BATCH_SIZE):
 
-    batch     = db.batch()
-    batch_df  = df.iloc[batch_start : batch_start + BATCH_SIZE]
-
-    for _, row in batch_df.iterrows():
-
-        # ── Build document data ──────────────────
-        doc_data = {
+def build_documents(df: pd.DataFrame) -> dict:
+    """Returns {city: {doc_id: doc_data}}. Later rows win on duplicate IDs."""
+    df = df.astype(object).where(pd.notnull(df), None)
+    by_city = {}
+    for row in df.to_dict("records"):
+        doc_id = _doc_id(row)
+        if not doc_id or doc_id == "nan" or doc_id == "None" or not row["city"]:
+            continue
+        specialization = row["specialization"] or "general practitioner (gp)"
+        by_city.setdefault(row["city"], {})[doc_id] = {
             "name"           : row["name"],
-            "hospital_name"  : row["hospital_name"] if row["hospital_name"] else "clinic not specified",
-            "specialization" : row["specialization"] if row["specialization"] else "general practitioner (gp)",
+            "hospital_name"  : row["hospital_name"] or "clinic not specified",
+            "specialization" : specialization,
+            # One entry per listed specialty, so the API can query a cold
+            # city with array-contains instead of reading the whole shard
+            "specialties"    : _specialties(specialization),
             "city"           : row["city"],
             "phone"          : str(row["phone"]) if row["phone"] else None,
             "pmdc"           : str(row["pmdc"])  if row["pmdc"]  else None,
             "emergency_flag" : False,   # default — can be updated later
             "active"         : True,    # for future soft-delete support
         }
+    return by_city
+
+
+def doc_hash(doc: dict) -> str:
+    return hashlib.sha1(json.dumps(doc, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+# ──────────────────────────────────────────────
+# Manifest (doc_id → content hash of what Firestore holds)
+# ──────────────────────────────────────────────
+def load_manifest(path) -> dict:
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
 
-        # ── Use doctor name as document ID ───────
-        # Replace spaces with underscores for clean Firestore doc ID
-        doc_id = str(row["name"]).strip().replace(" ", "_").replace("/", "_")
+def save_manifest(manifest: dict, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, path)
 
-        # If doc_id is empty fallback to auto ID
-        if not doc_id or doc_id == "nan":
-            doc_ref = collection_ref.document()
-        else:
-            doc_ref = collection_ref.document(doc_id)
 
-        batch.set(doc_ref, doc_data)
+def manifest_cities(pattern) -> list:
+    """Cities that have a manifest for `pattern` (e.g. upload_manifest_{city}.json)."""
+    head, tail = pattern.split("{city}", 1)
+    regex = re.compile(re.escape(head) + r"(.+)" + re.escape(tail) + r"$")
+    return sorted(m.group(1) for m in map(regex.match, glob.glob(head + "*" + tail)) if m)
 
-    # ── Commit this batch ────────────────────────
-    try:
-        batch.commit()
-        uploaded += len(batch_df)
-        print(f"   ✅ Uploaded batch: {batch_start + 1} → {min(batch_start + BATCH_SIZE, total)} of {total}")
-    except Exception as e:
-        failed += len(batch_df)
-        print(f"   ❌ Batch failed ({batch_start} → {batch_start + BATCH_SIZE}): {e}")
 
-    # Small delay to avoid rate limiting
-    time.sleep(0.5)
+def plan_changes(docs: dict, manifest: dict, full=False):
+    """full=True upserts every document; deletes always come from the manifest."""
+    hashes  = {doc_id: doc_hash(doc) for doc_id, doc in docs.items()}
+    upserts = [doc_id for doc_id, h in hashes.items() if full or manifest.get(doc_id) != h]
+    deletes = [doc_id for doc_id in manifest if doc_id not in docs]
+    return upserts, deletes, hashes
+
 
 # ──────────────────────────────────────────────
-# STEP 4: Summary
+# Parallel batch commits with backoff
 # ──────────────────────────────────────────────
-print()
-print("=" * 50)
-print("📊 UPLOAD SUMMARY")
-print("=" * 50)
-print(f"  ✅ Successfully uploaded : {uploaded} doctors")
-print(f"  ❌ Failed                : {failed} doctors")
-print(f"  📁 Firestore collection  : 'doctors'")
-print()
-print("🎉 Done! Check your Firebase Console:")
-print("   https://console.firebase.google.com")
-print("   → Firestore Database → doctors collection")
\ No newline at end of file
+def _is_retryable(e: Exception) -> bool:
+    return type(e).__name__ in RETRYABLE_ERRORS or getattr(e, "code", None) in (429, 503)
+
+
+def _commit_batch(db, collection, ops):
+    for attempt in range(MAX_RETRIES):
+        batch = db.batch()
+        col   = db.collection(collection)
+        for op, doc_id, data in ops:
+            if op == "set":
+                batch.set(col.document(doc_id), data)
+            else:
+                batch.delete(col.document(doc_id))
+        try:
+            batch.commit()
+            return
+        except Exception as e:
+            if not _is_retryable(e) or attempt == MAX_RETRIES - 1:
+                raise
+            delay = min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+            print(f"   ⏳ Rate limited ({type(e).__name__}) — retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def sync_doctors(db, docs: dict, manifest_path, collection,
+                 workers=MAX_WORKERS, full=False, dry_run=False) -> dict:
+    # Loaded even with full=True: it is the only record of what to delete
+    manifest = load_manifest(manifest_path)
+    upserts, deletes, hashes = plan_changes(docs, manifest, full)
+
+    print(f"   Documents in CSV : {len(docs)}")
+    print(f"   To upsert        : {len(upserts)}")
+    print(f"   To delete        : {len(deletes)}")
+    print(f"   Unchanged        : {len(docs) - len(upserts)}\n")
+
+    if dry_run or not (upserts or deletes):
+        return {"upserted": 0, "deleted": 0, "failed": 0, "skipped": len(docs) - len(upserts)}
+
+    ops = ([("set", doc_id, docs[doc_id]) for doc_id in upserts]
+           + [("delete", doc_id, None) for doc_id in deletes])
+    batches = [ops[i:i + BATCH_SIZE] for i in range(0, len(ops), BATCH_SIZE)]
+
+    upserted = deleted = failed = 0
+    print(f"⬆️  Committing {len(batches)} batches with {workers} workers...")
+    print("=" * 50)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_commit_batch, db, collection, b): b for b in batches}
+        for fut in as_completed(futures):
+            batch_ops = futures[fut]
+            try:
+                fut.result()
+            except Exception as e:
+                failed += len(batch_ops)
+                print(f"   ❌ Batch failed ({len(batch_ops)} ops): {e}")
+                continue
+            # Only record what Firestore actually accepted
+            for op, doc_id, _ in batch_ops:
+                if op == "set":
+                    manifest[doc_id] = hashes[doc_id]
+                    upserted += 1
+                else:
+                    manifest.pop(doc_id, None)
+                    deleted += 1
+            print(f"   ✅ Batch committed: {len(batch_ops)} ops")
+
+    save_manifest(manifest, manifest_path)
+    return {"upserted": upserted, "deleted": deleted, "failed": failed,
+            "skipped": len(docs) - len(upserts)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync cleaned doctors to Firestore")
+    parser.add_argument("--csv",      default=CSV_FILE)
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="path pattern, {city} is filled in")
+    parser.add_argument("--city",     help="only sync this city")
+    parser.add_argument("--workers",  type=int, default=MAX_WORKERS)
+    parser.add_argument("--full",     action="store_true", help="rewrite every document, not only changed ones")
+    parser.add_argument("--dry-run",  action="store_true", help="only print the diff")
+    args = parser.parse_args()
+
+    print(f"📂 Loading {args.csv}...")
+    by_city = build_documents(pd.read_csv(args.csv, dtype=str))
+    # A city whose rows all disappeared only has its manifest left: sync it
+    # with no documents so everything uploaded for it is deleted
+    for city in manifest_cities(args.manifest):
+        by_city.setdefault(city, {})
+    if args.city:
+        city    = args.city.strip().lower()
+        by_city = {city: by_city.get(city, {})}
+
+    db = None if args.dry_run else connect()
+    t0 = time.time()
+    summary = {"upserted": 0, "deleted": 0, "failed": 0, "skipped": 0}
+    for city, docs in sorted(by_city.items()):
+        print(f"🏙️  {city.title()}")
+        result = sync_doctors(db, docs, args.manifest.format(city=city),
+                              COLLECTION.format(city=city), workers=args.workers,
+                              full=args.full, dry_run=args.dry_run)
+        for k in summary:
+            summary[k] += result[k]
+
+    print()
+    print("=" * 50)
+    print("📊 UPLOAD SUMMARY")
+    print("=" * 50)
+    print(f"  ✅ Upserted   : {summary['upserted']} doctors")
+    print(f"  🗑️  Deleted    : {summary['deleted']} doctors")
+    print(f"  ⏭️  Unchanged  : {summary['skipped']} doctors")
+    print(f"  ❌ Failed     : {summary['failed']} doctors")
+    print(f"  ⏱️  Took       : {time.time() - t0:.1f}s")
+    print(f"  📁 Firestore collections : {', '.join(COLLECTION.format(city=c) for c in sorted(by_city))}")
+
+
+if __name__ == "__main__":
+    main()